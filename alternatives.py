@@ -0,0 +1,259 @@
+import heapq
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from compiled_graph import CompiledGraph, NO_LINE
+
+# Next-best loopless routes (Yen's algorithm) over the interchange-penalised
+# (station, committed line) state graph.
+#
+# Yen finds each further route by branching off an earlier one: for every state
+# along it, a "spur" search looks for the cheapest way on from there that avoids
+# the stations already behind it and the next hops earlier routes took. All of
+# those searches head for the same destination, so one backward Dijkstra from
+# the destination is run up front and shared by all of them. Its distances are
+# exact costs-to-go on the unrestricted graph, so:
+#   - when the tree's own path on from a spur state avoids everything banned, it
+#     is the spur answer as it stands, with no search at all;
+#   - otherwise they serve as A* potentials (bans only make routes dearer, so
+#     the bounds stay admissible and consistent) and the spur search goes
+#     straight for the destination.
+#
+# Routes that ride exactly the same hops and differ only in how they walk
+# between them, or that pass the same stations with a Walk link standing in for
+# a ride, are the same alternative to a passenger; only the cheaper is kept.
+
+
+class AlternativeRoute(NamedTuple):
+    """One of the k cheapest routes: `route` in find_route's (station, line) format
+    and its penalised minutes, the cost find_route minimises."""
+    route: List[Tuple[str, Optional[str]]]
+    minutes: int
+
+
+class _Path(NamedTuple):
+    states: List[int]
+    lines: List[int]  # line of the hop into each state; NO_LINE for the first
+    costs: List[int]  # penalised minutes from the start to each state
+
+
+def backward_tree(compiled: CompiledGraph, target: int, penalty: int) -> Tuple[Dict[int, int], Dict[int, Tuple[int, int]]]:
+    """Cost from every state to station id `target`, and each state's next hop
+    (state, line id) on a cheapest way there; states at `target` have none."""
+    offsets, ends, targets, edge_lines, weights = (compiled.offsets, compiled.ends, compiled.targets,
+                                                   compiled.edge_lines, compiled.weights)
+    line_count, walk_line, state_lines = compiled.line_count, compiled.walk_line, compiled.state_lines
+    dist: Dict[int, int] = {}
+    succ: Dict[int, Tuple[int, int]] = {}
+    frontier: List[Tuple[int, int]] = []
+    for line in sorted(state_lines[target]):
+        dist[target * line_count + line] = 0
+        frontier.append((0, target * line_count + line))
+
+    heappush, heappop, dist_get = heapq.heappush, heapq.heappop, dist.get
+    while frontier:
+        d, current = heappop(frontier)
+        if d > dist[current]:
+            continue
+        station, committed = divmod(current, line_count)
+        # Edges are stored in both directions with the same line and time, so the edges
+        # *into* this station are its own adjacency list read backwards.
+        for e in range(offsets[station], ends[station]):
+            line, neighbor_station = edge_lines[e], targets[e]
+            if line == walk_line:
+                if committed not in state_lines[neighbor_station]:
+                    continue
+                neighbor, new_dist = neighbor_station * line_count + committed, d + weights[e]
+                old = dist_get(neighbor)
+                if old is None or new_dist < old:
+                    dist[neighbor] = new_dist
+                    succ[neighbor] = (current, line)
+                    heappush(frontier, (new_dist, neighbor))
+            elif line == committed:
+                base, ride = neighbor_station * line_count, d + weights[e]
+                for c in state_lines[neighbor_station]:
+                    new_dist = ride + penalty if c != NO_LINE and c != line else ride
+                    neighbor = base + c
+                    old = dist_get(neighbor)
+                    if old is None or new_dist < old:
+                        dist[neighbor] = new_dist
+                        succ[neighbor] = (current, line)
+                        heappush(frontier, (new_dist, neighbor))
+    return dist, succ
+
+
+def _follow_tree(state: int, succ: Dict[int, Tuple[int, int]], dist_b: Dict[int, int], line_count: int,
+                 banned_stations: Set[int], banned_hops: Set[Tuple[int, int]]) -> Optional[Tuple[List[int], List[int], List[int]]]:
+    """The backward tree's own way on from `state` as (states, lines, costs so far),
+    or None if it uses a banned station or starts with a banned hop."""
+    states: List[int] = []
+    lines: List[int] = []
+    costs: List[int] = []
+    current = state
+    while current in succ:
+        current, line = succ[current]
+        if current // line_count in banned_stations or (not states and (current, line) in banned_hops):
+            return None
+        states.append(current)
+        lines.append(line)
+        costs.append(dist_b[state] - dist_b[current])
+    return states, lines, costs
+
+
+def _spur_search(compiled: CompiledGraph, spur: int, target: int, dist_b: Dict[int, int], banned_stations: Set[int],
+                 banned_hops: Set[Tuple[int, int]], penalty: int) -> Optional[Tuple[List[int], List[int], List[int]]]:
+    """A* from `spur` to any state at `target` that avoids the banned stations and
+    first hops, guided by the backward tree's costs-to-go."""
+    offsets, ends, targets, edge_lines, weights = (compiled.offsets, compiled.ends, compiled.targets,
+                                                   compiled.edge_lines, compiled.weights)
+    line_count, walk_line = compiled.line_count, compiled.walk_line
+    dist: Dict[int, int] = {spur: 0}
+    prev: Dict[int, Tuple[int, int]] = {}
+    frontier: List[Tuple[int, int, int]] = [(dist_b[spur], 0, spur)]
+
+    while frontier:
+        _, d, current = heapq.heappop(frontier)
+        if d > dist[current]:
+            continue
+        station, committed = divmod(current, line_count)
+        if station == target:
+            states, lines, costs = [], [], []
+            while current != spur:
+                states.append(current)
+                costs.append(dist[current])
+                current, line = prev[current]
+                lines.append(line)
+            states.reverse()
+            lines.reverse()
+            costs.reverse()
+            return states, lines, costs
+
+        for e in range(offsets[station], ends[station]):
+            to, line = targets[e], edge_lines[e]
+            if to in banned_stations:
+                continue
+            if line == walk_line:
+                new_committed, new_dist = committed, d + weights[e]
+            elif committed != NO_LINE and line != committed:
+                new_committed, new_dist = line, d + weights[e] + penalty
+            else:
+                new_committed, new_dist = line, d + weights[e]
+            neighbor = to * line_count + new_committed
+            if current == spur and (neighbor, line) in banned_hops:
+                continue
+            h = dist_b.get(neighbor)
+            if h is None:
+                continue
+            old = dist.get(neighbor)
+            if old is None or new_dist < old:
+                dist[neighbor] = new_dist
+                prev[neighbor] = (current, line)
+                heapq.heappush(frontier, (new_dist + h, new_dist, neighbor))
+    return None
+
+
+def _to_route(compiled: CompiledGraph, path: _Path) -> List[Tuple[str, Optional[str]]]:
+    line_count = compiled.line_count
+    return [(compiled.stations[state // line_count], compiled.lines[line] if i else None)
+            for i, (state, line) in enumerate(zip(path.states, path.lines))]
+
+
+def _from_route(compiled: CompiledGraph, route: List[Tuple[str, Optional[str]]], penalty: int) -> Optional[_Path]:
+    """A (station, line) route such as find_route returns as a _Path, or None if it
+    rides a connection that isn't open in `compiled`."""
+    offsets, ends, targets, edge_lines, weights = (compiled.offsets, compiled.ends, compiled.targets,
+                                                   compiled.edge_lines, compiled.weights)
+    line_count, walk_line, station_ids = compiled.line_count, compiled.walk_line, compiled.station_ids
+    station = station_ids[route[0][0]]
+    path = _Path([station * line_count + NO_LINE], [NO_LINE], [0])
+    committed = NO_LINE
+    for name, line_name in route[1:]:
+        to, line = station_ids[name], compiled.line_ids[line_name]
+        times = [weights[e] for e in range(offsets[station], ends[station])
+                 if targets[e] == to and edge_lines[e] == line]
+        if not times:
+            return None
+        cost = path.costs[-1] + min(times)
+        if line != walk_line:
+            if committed != NO_LINE and line != committed:
+                cost += penalty
+            committed = line
+        path.states.append(to * line_count + committed)
+        path.lines.append(line)
+        path.costs.append(cost)
+        station = to
+    return path
+
+
+def _walk_variant(compiled: CompiledGraph, a: _Path, b: _Path) -> bool:
+    """Whether two routes differ only in their Walk links: they ride exactly the same
+    hops, or pass the same stations with a walk in place of a ride."""
+    line_count, walk_line = compiled.line_count, compiled.walk_line
+
+    def rides(path: _Path) -> List[Tuple[int, int, int]]:
+        return [(path.states[i - 1] // line_count, path.states[i] // line_count, path.lines[i])
+                for i in range(1, len(path.states)) if path.lines[i] != walk_line]
+
+    if rides(a) == rides(b):
+        return True
+    if len(a.states) != len(b.states):
+        return False
+    return all(x // line_count == y // line_count for x, y in zip(a.states, b.states)) and \
+        all(p == q or walk_line in (p, q) for p, q in zip(a.lines[1:], b.lines[1:]))
+
+
+def k_shortest_routes(compiled: CompiledGraph, source: int, target: int, k: int,
+                      penalty: int = 5, first: Optional[List[Tuple[str, Optional[str]]]] = None) -> List[AlternativeRoute]:
+    """Up to `k` cheapest loopless routes from station id `source` to `target`,
+    cheapest first, leaving out Walk-only variants of routes already listed.
+
+    `first`, a cheapest route found elsewhere (e.g. by find_route), is listed first
+    in place of whichever of the tied cheapest routes the backward tree would pick."""
+    line_count = compiled.line_count
+    dist_b, succ = backward_tree(compiled, target, penalty)
+    start = source * line_count + NO_LINE
+    if start not in dist_b:
+        return []
+
+    given = _from_route(compiled, first, penalty) if first else None
+    if given is not None and given.costs[-1] == dist_b[start] and \
+            len({state // line_count for state in given.states}) == len(given.states):
+        shortest: List[_Path] = [given]
+    else:
+        states, lines, costs = _follow_tree(start, succ, dist_b, line_count, set(), set())
+        shortest = [_Path([start] + states, [NO_LINE] + lines, [0] + costs)]
+    accepted: List[_Path] = []
+    candidates: List[Tuple[int, int, _Path]] = []
+    seen = {(tuple(shortest[0].states), tuple(shortest[0].lines))}
+
+    while True:
+        path = shortest[-1]
+        if not any(_walk_variant(compiled, path, other) for other in accepted):
+            accepted.append(path)
+            if len(accepted) == k:
+                break
+
+        for i in range(len(path.states) - 1):
+            spur = path.states[i]
+            root_states, root_lines = path.states[:i + 1], path.lines[:i + 1]
+            banned_hops = {(p.states[i + 1], p.lines[i + 1]) for p in shortest
+                           if len(p.states) > i + 1 and p.states[:i + 1] == root_states and p.lines[:i + 1] == root_lines}
+            banned_stations = {state // line_count for state in root_states}
+            spur_path = (_follow_tree(spur, succ, dist_b, line_count, banned_stations, banned_hops)
+                         or _spur_search(compiled, spur, target, dist_b, banned_stations, banned_hops, penalty))
+            if spur_path is None:
+                continue
+            states, lines, costs = spur_path
+            candidate = _Path(root_states + states, root_lines + lines,
+                              path.costs[:i + 1] + [path.costs[i] + c for c in costs])
+            if len({state // line_count for state in candidate.states}) < len(candidate.states):
+                continue  # back through a station on another line: not loopless
+            key = (tuple(candidate.states), tuple(candidate.lines))
+            if key not in seen:
+                seen.add(key)
+                heapq.heappush(candidates, (candidate.costs[-1], len(seen), candidate))
+
+        if not candidates:
+            break
+        shortest.append(heapq.heappop(candidates)[2])
+
+    return [AlternativeRoute(_to_route(compiled, p), p.costs[-1]) for p in accepted]
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Streaming JSONL batch router for TubeNetwork
+
+Reads journey queries, one JSON value per line, from the files given or from
+stdin, and writes one JSON result per line to stdout in the same order:
+
+  {"id": 7, "from": "Brixton", "to": "Bank"}       (or just ["Brixton", "Bank"])
+  {"id": 7, "from": "Brixton", "to": "Bank", "minutes": 19,
+   "legs": [{"line": "Victoria", "from": "Brixton", "to": "Stockwell", "stops": 1}, ...]}
+
+A query that can't be answered gets {"line": N, ..., "error": "..."} instead;
+`id` is copied through when present. Input is read --chunk lines at a time and
+each chunk is answered with one search per distinct origin, so memory stays
+bounded however long the input is. With --workers N, chunks are routed by a
+process pool with at most two chunks per worker in flight. A throughput summary
+is printed to stderr at the end.
+
+Only the standard library is imported until the arguments have been read, so
+--help and bad usage return at once; with --network data files, --snapshot
+starts from a prebuilt network snapshot instead of parsing them, and --mapped
+attaches to a file written by mapped_network.py, which worker processes then
+share instead of each receiving a copy of the network.
+
+Usage: python batch_route.py [FILE ...] [--workers N] [--chunk LINES]
+                             [--network FILE]... [--snapshot PATH] [--mapped PATH]
+                             [--engine NAME]
+"""
+
+import argparse
+from collections import deque
+import fileinput
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CHUNK = 10000
+
+
+def read_chunks(lines: Iterable[str], size: int) -> Iterator[List[Tuple[int, str]]]:
+    """(line number, text) for each non-blank input line, `size` lines at a time."""
+    chunk: List[Tuple[int, str]] = []
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            chunk.append((number, line))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_query(number: int, text: str) -> Tuple[Dict, Optional[str], Optional[str]]:
+    """(result skeleton, start, end) for one input line; start is None when the
+    skeleton already carries an error."""
+    try:
+        query = json.loads(text)
+    except json.JSONDecodeError as e:
+        return {'line': number, 'error': f'invalid JSON ({e})'}, None, None
+    if isinstance(query, list) and len(query) == 2:
+        query = {'from': query[0], 'to': query[1]}
+    if not isinstance(query, dict) or not isinstance(query.get('from'), str) or not isinstance(query.get('to'), str):
+        return {'line': number, 'error': "expected {\"from\": ..., \"to\": ...} or [from, to]"}, None, None
+    result = {'id': query['id']} if 'id' in query else {}
+    result.update({'from': query['from'], 'to': query['to']})
+    return result, query['from'], query['to']
+
+
+def route_chunk(network, chunk: List[Tuple[int, str]]) -> Tuple[str, int, int]:
+    """The output text for one chunk of input lines, with how many were routed and
+    how many failed."""
+    results: List[Dict] = []
+    pairs: List[Tuple[str, str]] = []
+    slots: Dict[str, List[int]] = {}
+    for number, text in chunk:
+        result, start, end = parse_query(number, text)
+        results.append(result)
+        if start is None:
+            continue
+        missing = [s for s in (start, end) if not network.has_station(s)]
+        if missing:
+            result.update(line=number, error=f"station '{missing[0]}' not found")
+            continue
+        pairs.append((start, end))
+        slots.setdefault(start, []).append(len(results) - 1)
+
+    # find_routes answers grouped by origin, origins in order of first appearance and
+    # each origin's destinations in input order, so its answers fill `slots` in turn.
+    taken = {start: 0 for start in slots}
+    routed = 0
+    for start, end, route in network.find_routes(pairs):
+        result = results[slots[start][taken[start]]]
+        taken[start] += 1
+        if route is None:
+            result['error'] = 'no route'
+            continue
+        result['minutes'] = network.get_route_minutes(route)
+        result['legs'] = [{'line': line, 'from': a, 'to': b, 'stops': stops}
+                          for line, a, b, stops in network.get_route_legs(route)]
+        routed += 1
+    return ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in results), routed, len(results) - routed
+
+
+# Process-pool state: each worker keeps the network it was initialised with.
+_worker_network = None
+
+
+def _init_worker(network):
+    global _worker_network
+    _worker_network = network
+
+
+def _route_chunk_job(chunk: List[Tuple[int, str]]) -> Tuple[str, int, int]:
+    return route_chunk(_worker_network, chunk)
+
+
+def build_network(args):
+    if args.mapped:
+        from mapped_network import MappedTubeNetwork
+        return MappedTubeNetwork(args.mapped, engine=args.engine)
+    if args.network:
+        from network_loader import FileTubeNetwork
+        network = FileTubeNetwork(*args.network, snapshot_path=args.snapshot, engine=args.engine)
+    else:
+        from tube_network import TubeNetwork
+        network = TubeNetwork(engine=args.engine)
+    network.compiled
+    return network
+
+
+def run(network, chunks: Iterator[List[Tuple[int, str]]], out, workers: int) -> Tuple[int, int]:
+    """Route every chunk and write the results in input order; returns (routed, failed)."""
+    totals = [0, 0]
+
+    def emit(text: str, routed: int, failed: int):
+        out.write(text)
+        out.flush()
+        totals[0] += routed
+        totals[1] += failed
+
+    if workers <= 0:
+        for chunk in chunks:
+            emit(*route_chunk(network, chunk))
+        return totals[0], totals[1]
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(network,)) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(_route_chunk_job, chunk))
+            # Hold back reading until the oldest chunk is written, so memory stays bounded.
+            while len(in_flight) >= workers * 2:
+                emit(*in_flight.popleft().result())
+        while in_flight:
+            emit(*in_flight.popleft().result())
+    return totals[0], totals[1]
+
+
+def main():
+    started = time.perf_counter()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='JSONL query files (default: stdin)')
+    parser.add_argument('--workers', type=int, default=0, help='routing processes (0: route in this process)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help='input lines routed together')
+    parser.add_argument('--network', action='append', metavar='FILE',
+                        help='JSON/CSV network file instead of the built-in network (repeat for several)')
+    parser.add_argument('--snapshot', metavar='PATH', help='network snapshot to load, or write if missing or stale')
+    parser.add_argument('--mapped', metavar='PATH', help='memory-mapped network file (see mapped_network.py)')
+    parser.add_argument('--engine', default='dijkstra',
+                        help="route search engine (see TubeNetwork.ENGINES); all but 'dijkstra' may pick "
+                             "a different route among equally fast ones")
+    args = parser.parse_args()
+    if args.chunk < 1:
+        parser.error('--chunk must be at least 1')
+    if args.snapshot and not args.network:
+        parser.error('--snapshot needs --network')
+    if args.mapped and args.network:
+        parser.error('--mapped and --network are alternatives')
+
+    try:
+        network = build_network(args)
+    except (OSError, ValueError) as e:
+        print(f"batch_route: {e}", file=sys.stderr)
+        sys.exit(2)
+    ready = time.perf_counter()
+
+    try:
+        with fileinput.input(args.files or ('-',)) as lines:
+            routed, failed = run(network, read_chunks(lines, args.chunk), sys.stdout, args.workers)
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly like other filters do, and
+        # point stdout at devnull so the interpreter's own final flush can't fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except OSError as e:
+        print(f"batch_route: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    elapsed = time.perf_counter() - ready
+    queries = routed + failed
+    rate = queries / elapsed if elapsed > 0 else 0.0
+    print(f"batch_route: {queries} queries ({routed} routed, {failed} failed) in {elapsed:.2f} s, "
+          f"{rate:,.0f} queries/s; network ready in {(ready - started) * 1000:.0f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
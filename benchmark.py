@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Routing benchmark for TubeNetwork.find_route
+
+Compares the binary-heap search against the original linear-scan frontier
+on the built-in network and on larger seeded synthetic networks, checks
+that both return identical routes, and compares batched find_routes against
+calling find_route in a loop, the states each search engine settles, and
+walk-link generation from coordinates on a grid against checking every pair.
+
+With --suite it instead measures how the routing core scales: construction
+time, peak memory, walk-link generation time and find_route / get_route_legs
+latency distributions on synthetic networks of 1k, 10k and 100k stations,
+optionally written as JSON (--json) and compared against an earlier run
+(--baseline).
+
+Usage: python benchmark.py [--queries N] [--sizes 1000,5000] [--seed S] [--workers W]
+       python benchmark.py --suite [--suite-sizes 1000,10000,100000] [--json out.json] [--baseline old.json]
+"""
+
+import argparse
+from itertools import combinations
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+from tube_network import TubeNetwork
+from walk_links import DEFAULT_WALK_RADIUS, METRES_PER_DEGREE, distance_metres, nearby_pairs
+
+
+class SyntheticTubeNetwork(TubeNetwork):
+    """A seeded, randomly generated network with the same shape as the real one:
+    lines are chains of stations, some stations are shared between lines
+    (interchanges) and a few nearby stations are joined by walking links.
+    Stations get coordinates around central London, about one per square
+    kilometre, each line heading off roughly straight from its first station."""
+
+    def __init__(self, stations: int, seed: int = 0, line_length: int = 25,
+                 interchange_rate: float = 0.15, walk_links: float = 0.02, **kwargs):
+        self._params = (stations, seed, line_length, interchange_rate, walk_links)
+        super().__init__(**kwargs)
+
+    def _build_network(self):
+        stations, seed, line_length, interchange_rate, walk_links = self._params
+        rnd = random.Random(seed)
+        # Positions draw from their own generator so the network itself is the same as ever.
+        geo = random.Random(f'{seed}:coordinates')
+        side = math.sqrt(stations) * 1000
+        positions: Dict[str, Tuple[float, float]] = {}
+        names: List[str] = []
+        line_no = 0
+        while len(names) < stations:
+            line = f'Line {line_no}'
+            line_no += 1
+            prev = None
+            heading = geo.uniform(0, 2 * math.pi)
+            for _ in range(line_length):
+                if names and rnd.random() < interchange_rate:
+                    station = rnd.choice(names)
+                elif len(names) < stations:
+                    station = f'Station {len(names)}'
+                    names.append(station)
+                    if prev is None:
+                        x, y = geo.uniform(0, side), geo.uniform(0, side)
+                    else:
+                        heading += geo.gauss(0, 0.3)
+                        step = geo.uniform(600, 1400)
+                        x = positions[prev][0] + step * math.cos(heading)
+                        y = positions[prev][1] + step * math.sin(heading)
+                        # Lines reaching the edge of the area turn back into it.
+                        if not 0 <= x <= side:
+                            x, heading = min(side, max(0.0, 2 * positions[prev][0] - x)), math.pi - heading
+                        if not 0 <= y <= side:
+                            y, heading = min(side, max(0.0, 2 * positions[prev][1] - y)), -heading
+                    positions[station] = (x, y)
+                    self.coordinates[station] = (51.5 + y / METRES_PER_DEGREE,
+                                                 -0.13 + x / (METRES_PER_DEGREE * math.cos(math.radians(51.5))))
+                else:
+                    break
+                if prev is not None and station != prev:
+                    self._add_connection(prev, station, line, rnd.choice((1, 2, 2, 3)))
+                prev = station
+        for _ in range(int(stations * walk_links)):
+            a, b = rnd.sample(names, 2)
+            self._add_connection(a, b, 'Walk', rnd.randint(3, 8))
+
+
+def linear_scan_find_route(network: TubeNetwork, start: str, end: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+    """The original O(V²) search, which rescans the whole frontier list for the
+    next state. Kept here only as the "before" baseline."""
+    if start not in network.graph or end not in network.graph:
+        return None
+    if start == end:
+        return [(start, None)]
+
+    dist: Dict[Tuple[str, str], int] = {(start, ''): 0}
+    prev: Dict[Tuple[str, str], Optional[Tuple[Tuple[str, str], str]]] = {(start, ''): None}
+    frontier: List[Tuple[str, str]] = [(start, '')]
+    end_key: Optional[Tuple[str, str]] = None
+
+    while frontier:
+        min_idx = 0
+        for i in range(1, len(frontier)):
+            if dist.get(frontier[i], float('inf')) < dist.get(frontier[min_idx], float('inf')):
+                min_idx = i
+        current_key = frontier.pop(min_idx)
+        current_dist = dist[current_key]
+        current_station, current_committed_line = current_key
+
+        if current_station == end:
+            end_key = current_key
+            break
+
+        for neighbor, line, time in network.graph[current_station]:
+            is_walk = line == 'Walk'
+            new_committed_line = current_committed_line if is_walk else line
+            is_real_change = (not is_walk) and current_committed_line != '' and line != current_committed_line
+            penalty = network.INTERCHANGE_PENALTY if is_real_change else 0
+            new_dist = current_dist + time + penalty
+            neighbor_key = (neighbor, new_committed_line)
+            if new_dist < dist.get(neighbor_key, float('inf')):
+                dist[neighbor_key] = new_dist
+                prev[neighbor_key] = (current_key, line)
+                frontier.append(neighbor_key)
+
+    if end_key is None:
+        return None
+
+    path: List[Tuple[str, Optional[str]]] = []
+    cur_key: Optional[Tuple[str, str]] = end_key
+    while cur_key is not None:
+        entry = prev[cur_key]
+        path.append((cur_key[0], entry[1] if entry is not None else None))
+        cur_key = entry[0] if entry is not None else None
+    path.reverse()
+    return path
+
+
+def sample_pairs(network: TubeNetwork, count: int, seed: int) -> List[Tuple[str, str]]:
+    rnd = random.Random(seed)
+    stations = network.get_all_stations()
+    return [tuple(rnd.sample(stations, 2)) for _ in range(count)]
+
+
+def time_queries(find: Callable, pairs: List[Tuple[str, str]]) -> Tuple[float, list]:
+    results = []
+    t0 = time.perf_counter()
+    for a, b in pairs:
+        results.append(find(a, b))
+    return time.perf_counter() - t0, results
+
+
+def compare(label: str, network: TubeNetwork, queries: int, seed: int):
+    pairs = sample_pairs(network, queries, seed)
+    before, old_routes = time_queries(lambda a, b: linear_scan_find_route(network, a, b), pairs)
+    after, new_routes = time_queries(network.find_route, pairs)
+    status = 'identical' if old_routes == new_routes else 'MISMATCH'
+    print(f"{label:<28} {len(network.graph):>7} {before / len(pairs) * 1000:>12.3f} "
+          f"{after / len(pairs) * 1000:>11.3f} {before / after:>8.1f}x  {status}")
+
+
+def compare_batch(label: str, network: TubeNetwork, queries: int, seed: int, workers: int):
+    rnd = random.Random(seed)
+    stations = network.get_all_stations()
+    origins = rnd.sample(stations, max(1, queries // 50))
+    pairs = [(rnd.choice(origins), rnd.choice(stations)) for _ in range(queries)]
+    looped, expected = time_queries(network.find_route, pairs)
+    t0 = time.perf_counter()
+    batched = {(a, b): route for a, b, route in network.find_routes(pairs, workers=workers)}
+    elapsed = time.perf_counter() - t0
+    status = 'identical' if expected == [batched[pair] for pair in pairs] else 'MISMATCH'
+    print(f"{label:<28} {len(pairs):>7} {looped * 1000:>12.1f} {elapsed * 1000:>11.1f} {looped / elapsed:>8.1f}x  {status}")
+
+
+def compare_engines(label: str, make_network: Callable, queries: int, seed: int):
+    baseline = None
+    reference: List[Optional[List[Tuple[str, Optional[str]]]]] = []
+    for engine in TubeNetwork.ENGINES:
+        network = make_network(cache_size=0, engine=engine)
+        pairs = sample_pairs(network, queries, seed)
+        t0 = time.perf_counter()
+        if engine == 'alt':
+            network.landmarks
+        elif engine == 'ch':
+            network.contraction_hierarchy
+        else:
+            network.compiled
+        preprocess = time.perf_counter() - t0
+        settled = 0
+        routes = []
+        t0 = time.perf_counter()
+        for a, b in pairs:
+            routes.append(network.find_route(a, b))
+            settled += network.last_settled_states
+        elapsed = time.perf_counter() - t0
+        baseline = baseline or settled
+        reference = reference or routes
+        # Every engine finds equally fast routes; only Dijkstra's tie-breaking is fixed.
+        same = sum(route == expected for route, expected in zip(routes, reference))
+        print(f"{label:<28} {engine:<14} {preprocess * 1000:>10.1f} {elapsed / len(pairs) * 1000:>10.3f} "
+              f"{settled / len(pairs):>13.0f} {baseline / max(settled, 1):>9.1f}x {same / len(pairs):>10.1%}")
+    return network
+
+
+def compare_walk_generation(label: str, network: TubeNetwork, radius: float = DEFAULT_WALK_RADIUS):
+    t0 = time.perf_counter()
+    pairs = nearby_pairs(network.coordinates, radius)
+    grid = time.perf_counter() - t0
+    # Checking every pair is quadratic; past a few thousand stations it would dominate the run.
+    if len(network.coordinates) <= 2000:
+        t0 = time.perf_counter()
+        every = []
+        for a, b in combinations(network.coordinates, 2):
+            metres = distance_metres(network.coordinates[a], network.coordinates[b])
+            if metres <= radius:
+                every.append((min(a, b), max(a, b), metres))
+        every.sort()
+        brute = time.perf_counter() - t0
+        status = 'identical' if every == pairs else 'MISMATCH'
+        print(f"{label:<28} {len(network.coordinates):>7} {len(pairs):>7} {brute * 1000:>11.1f} {grid * 1000:>10.1f} "
+              f"{brute / grid:>8.1f}x  {status}")
+    else:
+        print(f"{label:<28} {len(network.coordinates):>7} {len(pairs):>7} {'-':>11} {grid * 1000:>10.1f} {'-':>9}")
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Distribution of per-call times, in milliseconds."""
+    ordered = sorted(samples)
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+    return {'mean': sum(ordered) / len(ordered) * 1000, 'p50': pick(50), 'p90': pick(90),
+            'p99': pick(99), 'max': ordered[-1] * 1000}
+
+
+def scaling_run(size: int, queries: int, seed: int, line_length: int, interchange_rate: float,
+                walk_links: float) -> Dict:
+    """Construction time and peak memory, then find_route / get_route_legs latency
+    distributions, for one synthetic network size."""
+    params = dict(seed=seed, line_length=line_length, interchange_rate=interchange_rate,
+                  walk_links=walk_links, cache_size=0)
+    t0 = time.perf_counter()
+    network = SyntheticTubeNetwork(size, **params)
+    construct = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    network.compiled
+    compile_time = time.perf_counter() - t0
+
+    # A second build under tracemalloc for the peak; tracing slows it down, so it isn't timed.
+    tracemalloc.start()
+    traced = SyntheticTubeNetwork(size, **params)
+    traced.compiled
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced
+
+    t0 = time.perf_counter()
+    walk_pairs = nearby_pairs(network.coordinates, DEFAULT_WALK_RADIUS)
+    walk_time = time.perf_counter() - t0
+
+    route_times, leg_times, routes = [], [], []
+    for a, b in sample_pairs(network, queries, seed):
+        t0 = time.perf_counter()
+        route = network.find_route(a, b)
+        route_times.append(time.perf_counter() - t0)
+        if route is not None:
+            routes.append(route)
+    for route in routes:
+        t0 = time.perf_counter()
+        network.get_route_legs(route)
+        leg_times.append(time.perf_counter() - t0)
+
+    return {
+        'stations': len(network.graph),
+        'edges': len(network.compiled.targets),
+        'construct_ms': construct * 1000,
+        'compile_ms': compile_time * 1000,
+        'peak_memory_mb': peak / 2 ** 20,
+        'walk_links_ms': walk_time * 1000,
+        'walk_links': len(walk_pairs),
+        'queries': queries,
+        'unreachable': queries - len(routes),
+        'find_route_ms': latency_summary(route_times),
+        'get_route_legs_ms': latency_summary(leg_times) if leg_times else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def scaling_suite(sizes: List[int], queries: int, seed: int, line_length: int = 25,
+                  interchange_rate: float = 0.15, walk_links: float = 0.02) -> Dict:
+    print(f"{'Scaling suite':<16} {'Stations':>8} {'Build (ms)':>11} {'Compile (ms)':>13} {'Peak (MB)':>10} "
+          f"{'Walks (ms)':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Legs p50 (ms)':>14}")
+    runs = []
+    for size in sizes:
+        run = scaling_run(size, queries, seed, line_length, interchange_rate, walk_links)
+        runs.append(run)
+        legs = run['get_route_legs_ms']
+        print(f"{f'Synthetic {size}':<16} {run['stations']:>8} {run['construct_ms']:>11.1f} {run['compile_ms']:>13.1f} "
+              f"{run['peak_memory_mb']:>10.1f} {run['walk_links_ms']:>11.1f} {run['find_route_ms']['p50']:>9.3f} {run['find_route_ms']['p99']:>9.3f} "
+              f"{legs['p50'] if legs else float('nan'):>14.4f}")
+    return {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {'queries': queries, 'seed': seed, 'line_length': line_length,
+                   'interchange_rate': interchange_rate, 'walk_links': walk_links},
+        'runs': runs,
+    }
+
+
+def compare_results(old: Dict, new: Dict):
+    """Print new/old ratios for the headline numbers of two scaling-suite result files."""
+    print(f"Comparing {old.get('commit') or '?'} -> {new.get('commit') or '?'} (ratio new/old, lower is better)")
+    print(f"{'Stations':>8} {'Build':>8} {'Compile':>8} {'Peak':>8} {'p50':>8} {'p99':>8}")
+    before = {run['stations']: run for run in old['runs']}
+    for run in new['runs']:
+        prior = before.get(run['stations'])
+        if prior is None:
+            continue
+        ratios = [run['construct_ms'] / prior['construct_ms'], run['compile_ms'] / prior['compile_ms'],
+                  run['peak_memory_mb'] / prior['peak_memory_mb'],
+                  run['find_route_ms']['p50'] / prior['find_route_ms']['p50'],
+                  run['find_route_ms']['p99'] / prior['find_route_ms']['p99']]
+        print(f"{run['stations']:>8} " + ' '.join(f'{r:>7.2f}x' for r in ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=200, help='random station pairs per network')
+    parser.add_argument('--sizes', default='1000,5000', help='comma-separated synthetic network sizes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=0, help='process pool size for the batch comparison')
+    parser.add_argument('--suite', action='store_true', help='run the scaling suite instead of the comparisons')
+    parser.add_argument('--suite-sizes', default='1000,10000,100000', help='network sizes for --suite')
+    parser.add_argument('--line-length', type=int, default=25, help='stations per synthetic line')
+    parser.add_argument('--interchange-rate', type=float, default=0.15, help='chance a line reuses an existing station')
+    parser.add_argument('--walk-links', type=float, default=0.02, help='walking links per station')
+    parser.add_argument('--json', metavar='PATH', help='write --suite results to PATH')
+    parser.add_argument('--baseline', metavar='PATH', help='compare --suite results with an earlier --json file')
+    args = parser.parse_args()
+
+    if args.suite:
+        results = scaling_suite([int(s) for s in args.suite_sizes.split(',') if s], args.queries, args.seed,
+                                args.line_length, args.interchange_rate, args.walk_links)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+        if args.baseline:
+            with open(args.baseline) as f:
+                print()
+                compare_results(json.load(f), results)
+        return
+
+    print(f"{'Network':<28} {'Stations':>7} {'Before (ms)':>12} {'After (ms)':>11} {'Speedup':>9}  Routes")
+    # The route cache is off so repeated pairs measure the search, not a lookup.
+    compare('Built-in', TubeNetwork(cache_size=0), args.queries, args.seed)
+    for size in (int(s) for s in args.sizes.split(',') if s):
+        compare(f'Synthetic {size}', SyntheticTubeNetwork(size, seed=args.seed, cache_size=0), args.queries, args.seed)
+
+    print()
+    print(f"{'Batch (find_routes)':<28} {'Pairs':>7} {'Loop (ms)':>12} {'Batch (ms)':>11} {'Speedup':>9}  Routes")
+    compare_batch('Built-in', TubeNetwork(cache_size=0), args.queries * 10, args.seed, args.workers)
+    for size in (int(s) for s in args.sizes.split(',') if s):
+        compare_batch(f'Synthetic {size}', SyntheticTubeNetwork(size, seed=args.seed, cache_size=0),
+                      args.queries * 10, args.seed, args.workers)
+
+    print()
+    print(f"{'Engine comparison':<28} {'Engine':<14} {'Prep (ms)':>10} {'Query (ms)':>10} "
+          f"{'Settled/query':>13} {'Reduction':>10} {'Same route':>10}")
+    ch_network = compare_engines('Built-in', TubeNetwork, args.queries, args.seed)
+    for size in (int(s) for s in args.sizes.split(',') if s):
+        compare_engines(f'Synthetic {size}', lambda **kw: SyntheticTubeNetwork(size, seed=args.seed, **kw),
+                        args.queries, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, 'network.ch')
+        ch_network.contraction_hierarchy.save(index_path)
+        # Build the network it loads into first, so only the load itself is timed.
+        loading_network = TubeNetwork(engine='ch')
+        loading_network.compiled
+        t0 = time.perf_counter()
+        loading_network.load_contraction_hierarchy(index_path)
+        print(f"Contraction hierarchy: {ch_network.contraction_hierarchy.shortcut_count} shortcuts, "
+              f"{os.path.getsize(index_path) / 1024:.1f} KiB on disk, loaded in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    matrix_network = TubeNetwork(precompute=True, cache_size=0)
+    print()
+    print(matrix_network.route_matrix.report())
+    pairs = sample_pairs(matrix_network, args.queries, args.seed)
+    elapsed, _ = time_queries(matrix_network.find_route, pairs)
+    print(f"Precomputed lookup: {elapsed / len(pairs) * 1000:.4f} ms per query")
+
+    print()
+    print(f"{f'Walk links (<= {DEFAULT_WALK_RADIUS} m)':<28} {'Stations':>7} {'Pairs':>7} {'All pairs (ms)':>11} "
+          f"{'Grid (ms)':>10} {'Speedup':>9}  Pairs")
+    for size in (int(s) for s in args.sizes.split(',') if s):
+        compare_walk_generation(f'Synthetic {size}', SyntheticTubeNetwork(size, seed=args.seed, cache_size=0))
+
+
+if __name__ == "__main__":
+    main()
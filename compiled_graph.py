@@ -0,0 +1,316 @@
+from array import array
+import heapq
+from typing import Dict, FrozenSet, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+# Compressed-sparse-row form of TubeNetwork.graph that the route search runs on.
+# Station and line names are interned to small integers once per graph version;
+# the edges leaving station `u` are targets/lines/weights[offsets[u]:offsets[u+1]],
+# in the same order as graph[u] so searches break ties exactly as before.
+# Searches only follow the open part of that range, offsets[u]:ends[u]; edges
+# closed by a disruption are moved behind ends[u] (see set_station_edges).
+#
+# A search state (station, committed_line) is packed into one int,
+# station * line_count + committed_line, with line id 0 meaning "no line yet".
+#
+# Per-query exclusions (RouteConstraints) never touch the arrays: they compile to
+# an EdgeMask with one flag byte per line id and per station id, and a search
+# given one skips the masked edges as it scans each station's range.
+
+NO_LINE = 0
+
+
+class SearchTree(NamedTuple):
+    """What CompiledGraph.search leaves behind: best known distance per state, the
+    predecessor map `unwind` follows — state -> (previous state, edge line id) —
+    the first state settled at each station, and how many states were settled.
+    The remaining counts describe the work done: edges followed from settled states
+    (not those a mask bars), the largest the frontier heap grew, and how many of the
+    followed edges carried an interchange penalty."""
+    dist: Dict[int, int]
+    prev: Dict[int, Optional[Tuple[int, int]]]
+    reached: Dict[int, int]
+    settled: int
+    relaxed: int = 0
+    frontier_peak: int = 0
+    penalties: int = 0
+
+
+class RouteConstraints(NamedTuple):
+    """What a single route query must avoid; hashable, so it can be part of a cache key."""
+    avoid_lines: FrozenSet[str] = frozenset()
+    avoid_stations: FrozenSet[str] = frozenset()
+    no_walking: bool = False
+
+
+class EdgeMask(NamedTuple):
+    """RouteConstraints compiled for one graph: an edge is skipped when the flag for
+    its line id or for the station id it leads to is set."""
+    lines: bytearray
+    stations: bytearray
+
+
+class CompiledGraph:
+    def __init__(self, graph: Dict[str, List[Tuple[str, str, int]]], graph_version: int = 0):
+        self._set_names(sorted(graph.keys()), [''] + sorted({line for edges in graph.values() for _, line, _ in edges}),
+                        graph_version)
+        self.offsets = array('i', [0])
+        self.targets = array('i')
+        self.edge_lines = array('H')
+        self.weights = array('i')
+        for station in self.stations:
+            for neighbor, line, time in graph[station]:
+                self.targets.append(self.station_ids[neighbor])
+                self.edge_lines.append(self.line_ids[line])
+                self.weights.append(time)
+            self.offsets.append(len(self.targets))
+        self.ends = self.offsets[1:]
+
+    @classmethod
+    def from_arrays(cls, stations: Sequence[str], lines: Sequence[str], offsets: array, targets: array,
+                    edge_lines: array, weights: array, graph_version: int = 0,
+                    station_ids: Optional[Mapping[str, int]] = None,
+                    line_ids: Optional[Mapping[str, int]] = None) -> 'CompiledGraph':
+        """Wrap arrays saved from another CompiledGraph (e.g. a network snapshot) without copying them.
+        The arrays may be read-only memoryviews, and the name lookups any mapping (for a
+        memory-mapped network, see mapped_network); the first disruption then moves
+        the edge arrays into private copies."""
+        compiled = cls.__new__(cls)
+        compiled._set_names(stations, lines, graph_version, station_ids, line_ids)
+        compiled.offsets, compiled.targets, compiled.edge_lines, compiled.weights = offsets, targets, edge_lines, weights
+        compiled.ends = offsets[1:]
+        return compiled
+
+    def _set_names(self, stations: Sequence[str], lines: Sequence[str], graph_version: int,
+                   station_ids: Optional[Mapping[str, int]] = None, line_ids: Optional[Mapping[str, int]] = None):
+        self.graph_version = graph_version
+        self.stations: Sequence[str] = stations
+        self.station_ids: Mapping[str, int] = station_ids if station_ids is not None else {s: i for i, s in enumerate(stations)}
+        self.lines: Sequence[str] = lines
+        self.line_ids: Mapping[str, int] = line_ids if line_ids is not None else {line: i for i, line in enumerate(lines)}
+        self.line_count = len(lines)
+        # -1 when the network has no walking links, so no edge ever matches it.
+        self.walk_line = self.line_ids.get('Walk', -1)
+        self._state_lines: Optional[List[Set[int]]] = None
+        self._line_links: Optional[List[Set[int]]] = None
+        # Copies of targets/edge_lines/weights as compiled, taken before the first disruption.
+        self._base: Optional[Tuple[array, array, array]] = None
+
+    def to_graph(self) -> Dict[str, List[Tuple[str, str, int]]]:
+        """The adjacency lists this graph was compiled from, in the same edge order."""
+        stations, lines = self.stations, self.lines
+        targets, edge_lines, weights = self._base or (self.targets, self.edge_lines, self.weights)
+        return {station: [(stations[targets[e]], lines[edge_lines[e]], weights[e])
+                          for e in range(self.offsets[u], self.offsets[u + 1])]
+                for u, station in enumerate(stations)}
+
+    def base_edges(self, station: int) -> List[Tuple[int, int, int]]:
+        """(target, line id, weight) for every edge of `station` as originally compiled,
+        whatever disruptions have since closed or re-timed."""
+        lo, hi = self.offsets[station], self.offsets[station + 1]
+        targets, edge_lines, weights = self._base or (self.targets, self.edge_lines, self.weights)
+        return list(zip(targets[lo:hi], edge_lines[lo:hi], weights[lo:hi]))
+
+    def set_station_edges(self, station: int, open_edges: List[Tuple[int, int, int]],
+                          closed_edges: List[Tuple[int, int, int]]):
+        """Rewrite `station`'s edge range in place: `open_edges` first, in the order
+        given, then the closed ones, which searches no longer see. Together they must
+        be the station's base edges, so no other station's range moves."""
+        lo = self.offsets[station]
+        if len(open_edges) + len(closed_edges) != self.offsets[station + 1] - lo:
+            raise ValueError(f"edge count for station {self.stations[station]} does not match")
+        if self._base is None:
+            # The edges as compiled stay where they are (possibly a read-only mapping) and
+            # become the base; searches move onto private copies that can be rewritten.
+            self._base = (self.targets, self.edge_lines, self.weights)
+            self.targets, self.edge_lines, self.weights = (array('i', self.targets), array('H', self.edge_lines),
+                                                           array('i', self.weights))
+            if not isinstance(self.ends, array):
+                self.ends = array('i', self.ends)
+        for e, (target, line, weight) in enumerate(open_edges + closed_edges, lo):
+            self.targets[e], self.edge_lines[e], self.weights[e] = target, line, weight
+        self.ends[station] = lo + len(open_edges)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(a) * a.itemsize for a in (self.offsets, self.ends, self.targets, self.edge_lines, self.weights))
+
+    def edge_mask(self, constraints: RouteConstraints) -> EdgeMask:
+        """Compile `constraints` against this graph's ids; unknown names are a ValueError."""
+        lines, stations = bytearray(self.line_count), bytearray(len(self.stations))
+        for name in constraints.avoid_lines:
+            line = self.line_ids.get(name)
+            if line is None or line == NO_LINE:
+                raise ValueError(f"Unknown line '{name}'")
+            lines[line] = 1
+        if constraints.no_walking and self.walk_line >= 0:
+            lines[self.walk_line] = 1
+        for name in constraints.avoid_stations:
+            station = self.station_ids.get(name)
+            if station is None:
+                raise ValueError(f"Unknown station '{name}'")
+            stations[station] = 1
+        return EdgeMask(lines, stations)
+
+    def state_station(self, state: int) -> int:
+        return state // self.line_count
+
+    @property
+    def state_lines(self) -> List[Set[int]]:
+        """For each station, the committed lines any search can be in when standing
+        there: NO_LINE (the start state) and each real line arriving at the station,
+        carried across walking links (which pass the committed line through
+        unchanged) until nothing new appears. Closed edges are included, so this
+        stays a superset however disruptions come and go."""
+        if self._state_lines is None:
+            n = len(self.stations)
+            candidates: List[Set[int]] = [{NO_LINE} for _ in range(n)]
+            walks: List[List[int]] = [[] for _ in range(n)]
+            for station in range(n):
+                for e in range(self.offsets[station], self.offsets[station + 1]):
+                    neighbor, line = self.targets[e], self.edge_lines[e]
+                    if line == self.walk_line:
+                        walks[station].append(neighbor)
+                    else:
+                        candidates[neighbor].add(line)
+
+            pending = [station for station in range(n) if walks[station]]
+            while pending:
+                station = pending.pop()
+                for neighbor in walks[station]:
+                    missing = candidates[station] - candidates[neighbor]
+                    if missing:
+                        candidates[neighbor] |= missing
+                        pending.append(neighbor)
+            self._state_lines = candidates
+        return self._state_lines
+
+    @property
+    def line_links(self) -> List[Set[int]]:
+        """For each line id, the lines a route can change onto from it: lines that can
+        be committed to at a common station (see state_lines). A superset under
+        disruptions, like state_lines itself."""
+        if self._line_links is None:
+            links: List[Set[int]] = [set() for _ in range(self.line_count)]
+            for lines in self.state_lines:
+                for line in lines:
+                    if line != NO_LINE:
+                        links[line].update(lines)
+            for line, linked in enumerate(links):
+                linked.discard(NO_LINE)
+                linked.discard(line)
+            self._line_links = links
+        return self._line_links
+
+    def search(self, source: int, target: int = -1, penalty: int = 5, stop_at: Optional[Set[int]] = None,
+               mask: Optional[EdgeMask] = None) -> SearchTree:
+        """Interchange-penalised Dijkstra from station id `source`, stopping once a state
+        at station id `target` is settled, or once every station id in `stop_at` is
+        (the set is consumed), or exhausting the graph when neither is given. Edges
+        barred by `mask` are not followed.
+        """
+        # The committed line is the last *real* line ridden (never Walk), used only to
+        # decide whether boarding the next real line is a genuine interchange. Walking
+        # edges pass it through unchanged: their own time already prices in the
+        # transfer, so they neither trigger a penalty themselves nor shield a real
+        # line change on either side of them from being charged exactly once.
+        offsets, ends, targets, edge_lines, weights = self.offsets, self.ends, self.targets, self.edge_lines, self.weights
+        line_count, walk_line = self.line_count, self.walk_line
+        blocked_lines, blocked_stations = mask if mask is not None else (None, None)
+
+        start = source * line_count + NO_LINE
+        dist: Dict[int, int] = {start: 0}
+        prev: Dict[int, Optional[Tuple[int, int]]] = {start: None}
+        # Heap of (distance, sequence, state) with lazy deletion. `sequence` is when the
+        # state was first discovered and is kept across improvements, so ties resolve
+        # first-come, first-served like the original linear frontier scan. Improvements
+        # are strict, so an outdated entry always carries a larger distance than the
+        # state's final one and is recognised by that alone when it surfaces.
+        frontier: List[Tuple[int, int, int]] = [(0, 0, start)]
+        sequence: Dict[int, int] = {start: 0}
+        reached: Dict[int, int] = {}
+        # Work counters, kept per settled state (not per edge) so they cost next to nothing.
+        # `relaxed` counts the edges actually followed (after the mask), and the frontier
+        # is measured after each state's pushes, where it is at its largest.
+        settled = relaxed = penalties = 0
+        frontier_peak = 1
+        heappush, heappop, dist_get, sequence_get = heapq.heappush, heapq.heappop, dist.get, sequence.get
+
+        while frontier:
+            current_dist, _, current = heappop(frontier)
+            if current_dist > dist[current]:
+                continue
+            settled += 1
+            station, committed = divmod(current, line_count)
+
+            if station not in reached:
+                reached[station] = current
+                if station == target:
+                    break
+                if stop_at is not None and station in stop_at:
+                    stop_at.discard(station)
+                    if not stop_at:
+                        break
+
+            lo, hi = offsets[station], ends[station]
+            edges = zip(targets[lo:hi], edge_lines[lo:hi], weights[lo:hi])
+            if mask is not None:
+                edges = [edge for edge in edges if not (blocked_lines[edge[1]] or blocked_stations[edge[0]])]
+                relaxed += len(edges)
+            else:
+                relaxed += hi - lo
+            for to, line, weight in edges:
+                if line == walk_line:
+                    new_committed, new_dist = committed, current_dist + weight
+                elif committed != NO_LINE and line != committed:
+                    new_committed, new_dist = line, current_dist + weight + penalty
+                    penalties += 1
+                else:
+                    new_committed, new_dist = line, current_dist + weight
+                neighbor = to * line_count + new_committed
+                old = dist_get(neighbor)
+                if old is None or new_dist < old:
+                    dist[neighbor] = new_dist
+                    prev[neighbor] = (current, line)
+                    seq = sequence_get(neighbor)
+                    if seq is None:
+                        seq = sequence[neighbor] = len(sequence)
+                    heappush(frontier, (new_dist, seq, neighbor))
+            if len(frontier) > frontier_peak:
+                frontier_peak = len(frontier)
+
+        return SearchTree(dist, prev, reached, settled, relaxed, frontier_peak, penalties)
+
+    def unwind(self, prev: Dict[int, Optional[Tuple[int, int]]], state: int) -> List[Tuple[str, Optional[str]]]:
+        """Reconstruct the (station, line) path ending at `state` from a predecessor map."""
+        path: List[Tuple[str, Optional[str]]] = []
+        cur: Optional[int] = state
+        while cur is not None:
+            entry = prev[cur]
+            path.append((self.stations[cur // self.line_count], self.lines[entry[1]] if entry is not None else None))
+            cur = entry[0] if entry is not None else None
+        path.reverse()
+        return path
+
+
+class GraphView(Mapping[str, List[Tuple[str, str, int]]]):
+    """TubeNetwork.graph's station -> [(neighbor, line, minutes)] read straight from a
+    compiled graph's base edges, one station's list at a time, for networks whose
+    arrays were loaded rather than compiled (a snapshot, a mapped file)."""
+
+    def __init__(self, compiled: CompiledGraph):
+        self._compiled = compiled
+
+    def __getitem__(self, station: str) -> List[Tuple[str, str, int]]:
+        compiled = self._compiled
+        stations, lines = compiled.stations, compiled.lines
+        return [(stations[target], lines[line], time)
+                for target, line, time in compiled.base_edges(compiled.station_ids[station])]
+
+    def __contains__(self, station) -> bool:
+        return station in self._compiled.station_ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._compiled.stations)
+
+    def __len__(self) -> int:
+        return len(self._compiled.stations)
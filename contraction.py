@@ -0,0 +1,376 @@
+from array import array
+import hashlib
+import heapq
+import json
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from compiled_graph import NO_LINE, CompiledGraph
+
+# Contraction-hierarchy (CH) index for point-to-point queries on a static network.
+#
+# The hierarchy is built over a line-expanded graph with one node per reachable
+# (station, committed_line) state:
+#   * ride edges    (u, l) -> (v, l)   the line's travel time
+#   * walk edges    (u, c) -> (v, c)   the walk time; the committed line passes through
+#   * transfer edges (u, c) -> (u, l)  INTERCHANGE_PENALTY, or free from the start state
+# Every path here costs at least as much as some route the normal search allows, and
+# every such route exists here at the same cost, so journey times are identical.
+# The routes themselves are not: where several tie on cost, the query's meeting
+# node decides which one comes back, not the discovery order that settles ties in
+# CompiledGraph.search. On the built-in network about an eighth of station pairs
+# get a different, equally fast route, so like the goal-directed engines this is
+# an opt-in for services that accept any fastest route.
+#
+# Nodes are then contracted one at a time, least important first, adding shortcut
+# edges wherever removing a node would lengthen a shortest path. A query runs two
+# small Dijkstra searches that only climb the hierarchy — forwards from the start
+# state, backwards from every state at the destination — and joins them at the
+# cheapest common node. Shortcuts are unpacked back into (station, line) steps.
+
+TRANSFER = -1
+SHORTCUT = -2
+MAGIC = b'TUBECH1\n'
+INFINITY = float('inf')
+
+
+def graph_fingerprint(graph: CompiledGraph) -> str:
+    """Checksum of a compiled graph's names and adjacency arrays."""
+    digest = hashlib.sha256()
+    digest.update('\0'.join(graph.stations).encode())
+    digest.update(b'\1')
+    digest.update('\0'.join(graph.lines).encode())
+    for a in (graph.offsets, graph.ends, graph.targets, graph.edge_lines, graph.weights):
+        digest.update(a.tobytes())
+    return digest.hexdigest()
+
+
+class ContractionHierarchy:
+    # Bounds on each witness search; giving up early only adds a redundant shortcut.
+    WITNESS_SETTLE_LIMIT = 60
+
+    def __init__(self):
+        self.stations: List[str] = []
+        self.lines: List[str] = []
+        self.penalty = 0
+        self.fingerprint = ''
+        # Graph version of the network this index matches; -1 until checked against one.
+        self.graph_version = -1
+        self.build_seconds = 0.0
+        self.node_station = array('i')
+        self.station_nodes: List[List[int]] = []
+        self.start_node = array('i')
+        # Edges, original and shortcut alike. Shortcuts carry the two edges they replace.
+        self.edge_source = array('i')
+        self.edge_target = array('i')
+        self.edge_weight = array('i')
+        self.edge_line = array('i')
+        self.edge_first = array('i')
+        self.edge_second = array('i')
+        # Upward search graphs in CSR form: edges leaving each node towards a higher
+        # rank (forward), and edges arriving at each node from a higher rank (backward).
+        self.up_offsets = array('i')
+        self.up_edges = array('i')
+        self.down_offsets = array('i')
+        self.down_edges = array('i')
+
+    # ------------------------------------------------------------------ build
+
+    @classmethod
+    def build(cls, graph: CompiledGraph, penalty: int = 5) -> 'ContractionHierarchy':
+        t0 = perf_counter()
+        ch = cls()
+        ch.stations, ch.lines, ch.penalty = list(graph.stations), list(graph.lines), penalty
+        ch.fingerprint = graph_fingerprint(graph)
+        ch.graph_version = graph.graph_version
+
+        node_ids: Dict[int, int] = {}
+        ch.station_nodes = []
+        for station, lines in enumerate(graph.state_lines):
+            nodes = []
+            for line in sorted(lines):
+                node_ids[station * graph.line_count + line] = len(node_ids)
+                ch.node_station.append(station)
+                nodes.append(node_ids[station * graph.line_count + line])
+            ch.station_nodes.append(nodes)
+            ch.start_node.append(node_ids[station * graph.line_count + NO_LINE])
+
+        def add_edge(source: int, target: int, weight: int, line: int, first: int = -1, second: int = -1) -> int:
+            ch.edge_source.append(source)
+            ch.edge_target.append(target)
+            ch.edge_weight.append(weight)
+            ch.edge_line.append(line)
+            ch.edge_first.append(first)
+            ch.edge_second.append(second)
+            return len(ch.edge_source) - 1
+
+        # Remaining (uncontracted) graph: node -> {neighbour: (weight, edge id)}, keeping
+        # only the cheapest of any parallel edges.
+        n = len(node_ids)
+        out_adj: List[Dict[int, Tuple[int, int]]] = [{} for _ in range(n)]
+        in_adj: List[Dict[int, Tuple[int, int]]] = [{} for _ in range(n)]
+
+        def link(source: int, target: int, weight: int, line: int):
+            if source == target:
+                return
+            existing = out_adj[source].get(target)
+            if existing is None or weight < existing[0]:
+                edge = add_edge(source, target, weight, line)
+                out_adj[source][target] = (weight, edge)
+                in_adj[target][source] = (weight, edge)
+
+        lc = graph.line_count
+        for u in range(len(graph.stations)):
+            u_lines = sorted(graph.state_lines[u])
+            real_lines = sorted({graph.edge_lines[e] for e in range(graph.offsets[u], graph.ends[u])
+                                 if graph.edge_lines[e] != graph.walk_line})
+            for c in u_lines:
+                for line in real_lines:
+                    if line != c:
+                        link(node_ids[u * lc + c], node_ids[u * lc + line], 0 if c == NO_LINE else penalty, TRANSFER)
+            for e in range(graph.offsets[u], graph.ends[u]):
+                v, line, weight = graph.targets[e], graph.edge_lines[e], graph.weights[e]
+                if line == graph.walk_line:
+                    for c in u_lines:
+                        link(node_ids[u * lc + c], node_ids[v * lc + c], weight, line)
+                else:
+                    link(node_ids[u * lc + line], node_ids[v * lc + line], weight, line)
+
+        deleted_neighbours = [0] * n
+
+        def witness_distances(source: int, skip: int, limit: int) -> Dict[int, int]:
+            """Tentative distances from `source` in the remaining graph without `skip`,
+            searching no further than `limit` minutes or the settle budget. They are
+            upper bounds, so any witness found this way is a real path."""
+            dist = {source: 0}
+            frontier = [(0, source)]
+            settled = 0
+            while frontier and settled < cls.WITNESS_SETTLE_LIMIT:
+                d, node = heapq.heappop(frontier)
+                if d > limit:
+                    break
+                if d > dist[node]:
+                    continue
+                settled += 1
+                for nxt, (w, _) in out_adj[node].items():
+                    if nxt != skip and d + w < dist.get(nxt, INFINITY):
+                        dist[nxt] = d + w
+                        heapq.heappush(frontier, (d + w, nxt))
+            return dist
+
+        def shortcuts_for(v: int) -> List[Tuple[int, int, int, int, int]]:
+            needed = []
+            outs = list(out_adj[v].items())
+            if not outs:
+                return needed
+            max_out = max(w for _, (w, _) in outs)
+            for u, (w_in, e_in) in in_adj[v].items():
+                witness = witness_distances(u, v, w_in + max_out)
+                for x, (w_out, e_out) in outs:
+                    if x != u and witness.get(x, INFINITY) > w_in + w_out:
+                        needed.append((u, x, w_in + w_out, e_in, e_out))
+            return needed
+
+        # Importance of a node: the edge difference (shortcuts added minus edges removed),
+        # plus how many neighbours are already contracted and how deep in the hierarchy
+        # it would sit. The last two spread contraction evenly over the network, which
+        # keeps upward search spaces small.
+        level = [0] * n
+        edge_difference = [0] * n
+
+        def priority(v: int) -> int:
+            edge_difference[v] = len(shortcuts_for(v)) - len(in_adj[v]) - len(out_adj[v])
+            return edge_difference[v] + deleted_neighbours[v] + level[v]
+
+        # Queue entries are (priority, node); `queued` holds each node's latest priority
+        # so superseded entries are dropped when they surface.
+        queued = [priority(v) for v in range(n)]
+        queue = [(p, v) for v, p in enumerate(queued)]
+        heapq.heapify(queue)
+        contracted = [False] * n
+        rank = [0] * n
+        order = 0
+        while queue:
+            p, v = heapq.heappop(queue)
+            if contracted[v] or p != queued[v]:
+                continue
+            # Lazy update: re-evaluate and put back if v is no longer the least important.
+            current = priority(v)
+            if queue and current > queue[0][0]:
+                queued[v] = current
+                heapq.heappush(queue, (current, v))
+                continue
+            for u, x, weight, e_in, e_out in shortcuts_for(v):
+                existing = out_adj[u].get(x)
+                if existing is None or weight < existing[0]:
+                    edge = add_edge(u, x, weight, SHORTCUT, e_in, e_out)
+                    out_adj[u][x] = (weight, edge)
+                    in_adj[x][u] = (weight, edge)
+            neighbours = set(in_adj[v]) | set(out_adj[v])
+            for u in in_adj[v]:
+                del out_adj[u][v]
+            for x in out_adj[v]:
+                del in_adj[x][v]
+            for u in neighbours:
+                # Re-queue with the cheap terms updated; the edge difference is refreshed
+                # by the lazy check when u next reaches the front.
+                deleted_neighbours[u] += 1
+                level[u] = max(level[u], level[v] + 1)
+                if not contracted[u]:
+                    queued[u] = edge_difference[u] + deleted_neighbours[u] + level[u]
+                    heapq.heappush(queue, (queued[u], u))
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+
+        up: List[List[int]] = [[] for _ in range(n)]
+        down: List[List[int]] = [[] for _ in range(n)]
+        for edge in range(len(ch.edge_source)):
+            source, target = ch.edge_source[edge], ch.edge_target[edge]
+            if rank[target] > rank[source]:
+                up[source].append(edge)
+            else:
+                down[target].append(edge)
+        ch.up_offsets, ch.up_edges = _to_csr(up)
+        ch.down_offsets, ch.down_edges = _to_csr(down)
+        ch.build_seconds = perf_counter() - t0
+        return ch
+
+    # ------------------------------------------------------------------ query
+
+    @property
+    def shortcut_count(self) -> int:
+        return sum(1 for line in self.edge_line if line == SHORTCUT)
+
+    def route(self, source: int, target: int) -> Tuple[Optional[List[Tuple[str, Optional[str]]]], int]:
+        """(path, settled) between station ids, in find_route's (station, line) format."""
+        edge_source, edge_target, edge_weight = self.edge_source, self.edge_target, self.edge_weight
+
+        # Backward upward search from every state at the destination.
+        dist_b: Dict[int, int] = {}
+        succ: Dict[int, int] = {}
+        frontier = []
+        for node in self.station_nodes[target]:
+            dist_b[node] = 0
+            succ[node] = -1
+            frontier.append((0, node))
+        settled = 0
+        while frontier:
+            d, node = heapq.heappop(frontier)
+            if d > dist_b[node]:
+                continue
+            settled += 1
+            for i in range(self.down_offsets[node], self.down_offsets[node + 1]):
+                edge = self.down_edges[i]
+                nxt, new_dist = edge_source[edge], d + edge_weight[edge]
+                if new_dist < dist_b.get(nxt, INFINITY):
+                    dist_b[nxt] = new_dist
+                    succ[nxt] = edge
+                    heapq.heappush(frontier, (new_dist, nxt))
+
+        # Forward upward search, stopping once nothing left can beat the best meeting.
+        start = self.start_node[source]
+        dist_f = {start: 0}
+        pred = {start: -1}
+        frontier = [(0, start)]
+        best, meeting = INFINITY, -1
+        while frontier and frontier[0][0] < best:
+            d, node = heapq.heappop(frontier)
+            if d > dist_f[node]:
+                continue
+            settled += 1
+            if node in dist_b and d + dist_b[node] < best:
+                best, meeting = d + dist_b[node], node
+            for i in range(self.up_offsets[node], self.up_offsets[node + 1]):
+                edge = self.up_edges[i]
+                nxt, new_dist = edge_target[edge], d + edge_weight[edge]
+                if new_dist < dist_f.get(nxt, INFINITY):
+                    dist_f[nxt] = new_dist
+                    pred[nxt] = edge
+                    heapq.heappush(frontier, (new_dist, nxt))
+
+        if meeting < 0:
+            return None, settled
+
+        edges: List[int] = []
+        node = meeting
+        while pred[node] >= 0:
+            edges.append(pred[node])
+            node = edge_source[pred[node]]
+        edges.reverse()
+        node = meeting
+        while succ[node] >= 0:
+            edges.append(succ[node])
+            node = edge_target[succ[node]]
+
+        path: List[Tuple[str, Optional[str]]] = [(self.stations[source], None)]
+        for edge in self._unpack(edges):
+            line = self.edge_line[edge]
+            if line != TRANSFER:
+                path.append((self.stations[self.node_station[edge_target[edge]]], self.lines[line]))
+        return path, settled
+
+    def _unpack(self, edges: List[int]) -> List[int]:
+        """Expand shortcuts into the original edges they stand for, in travel order."""
+        result: List[int] = []
+        stack = list(reversed(edges))
+        while stack:
+            edge = stack.pop()
+            if self.edge_line[edge] == SHORTCUT:
+                stack.append(self.edge_second[edge])
+                stack.append(self.edge_first[edge])
+            else:
+                result.append(edge)
+        return result
+
+    # ------------------------------------------------------------ persistence
+
+    _ARRAYS = ('node_station', 'start_node', 'edge_source', 'edge_target', 'edge_weight', 'edge_line',
+               'edge_first', 'edge_second', 'up_offsets', 'up_edges', 'down_offsets', 'down_edges')
+
+    def save(self, path: str):
+        header = {
+            'stations': self.stations,
+            'lines': self.lines,
+            'penalty': self.penalty,
+            'fingerprint': self.fingerprint,
+            'build_seconds': self.build_seconds,
+            'lengths': [len(getattr(self, name)) for name in self._ARRAYS],
+        }
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(json.dumps(header).encode() + b'\n')
+            for name in self._ARRAYS:
+                getattr(self, name).tofile(f)
+
+    @classmethod
+    def load(cls, path: str, graph: Optional[CompiledGraph] = None) -> 'ContractionHierarchy':
+        """Read an index written by `save`. When `graph` is given, refuse an index that
+        was built from a different network."""
+        ch = cls()
+        with open(path, 'rb') as f:
+            if f.readline() != MAGIC:
+                raise ValueError(f"{path} is not a contraction-hierarchy index")
+            header = json.loads(f.readline())
+            for name, length in zip(cls._ARRAYS, header['lengths']):
+                values = array('i')
+                values.fromfile(f, length)
+                setattr(ch, name, values)
+        ch.stations, ch.lines, ch.penalty = header['stations'], header['lines'], header['penalty']
+        ch.fingerprint, ch.build_seconds = header['fingerprint'], header['build_seconds']
+        if graph is not None:
+            if graph_fingerprint(graph) != ch.fingerprint:
+                raise ValueError(f"{path} was built for a different network")
+            ch.graph_version = graph.graph_version
+        ch.station_nodes = [[] for _ in ch.stations]
+        for node, station in enumerate(ch.node_station):
+            ch.station_nodes[station].append(node)
+        return ch
+
+
+def _to_csr(rows: List[List[int]]) -> Tuple[array, array]:
+    offsets, values = array('i', [0]), array('i')
+    for row in rows:
+        values.extend(row)
+        offsets.append(len(values))
+    return offsets, values
@@ -0,0 +1,78 @@
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from compiled_graph import CompiledGraph
+
+# Live service changes layered over a network without rebuilding it.
+# TubeNetwork.graph always holds the full, undisrupted network; a Disruptions
+# records what is currently closed, suspended or re-timed, by name, and `apply`
+# rewrites just the affected stations' edge ranges in the compiled graph. The
+# resulting edge changes drive the incremental updates of everything derived
+# from it (see TubeNetwork._disrupt).
+
+# (from station id, to station id, line id, old weight, new weight); None means closed.
+EdgeChange = Tuple[int, int, int, Optional[int], Optional[int]]
+
+
+class DisruptionReport(NamedTuple):
+    """What one disruption update changed: directed edges closed, reopened or
+    re-timed; cached routes dropped and kept; precomputed shortest-path trees
+    repaired (and the states re-settled in them) rather than recomputed."""
+    edges_changed: int
+    cache_invalidated: int
+    cache_kept: int
+    trees_repaired: int
+    states_repaired: int
+
+
+class Disruptions:
+    def __init__(self):
+        self.closed_stations: Set[str] = set()
+        # Closed connections and re-timings are stored for both directions.
+        self.closed_connections: Set[Tuple[str, str, str]] = set()
+        self.suspended_lines: Set[str] = set()
+        self.travel_times: Dict[Tuple[str, str, str], int] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.closed_stations or self.closed_connections or self.suspended_lines or self.travel_times)
+
+    def weight(self, a: str, b: str, line: str, time: int) -> Optional[int]:
+        """Minutes the a -> b edge on `line` currently takes, or None while it is closed."""
+        if a in self.closed_stations or b in self.closed_stations or line in self.suspended_lines:
+            return None
+        if (a, b, line) in self.closed_connections:
+            return None
+        return self.travel_times.get((a, b, line), time)
+
+    def apply(self, compiled: CompiledGraph, stations: Iterable[int]) -> List[EdgeChange]:
+        """Rewrite the edge ranges of `stations` to match the current disruptions and
+        return the directed edges whose weight (the fastest, if several run in
+        parallel) changed as a result."""
+        names, lines = compiled.stations, compiled.lines
+        changes: List[EdgeChange] = []
+        for u in stations:
+            before = self._fastest(zip(compiled.targets[compiled.offsets[u]:compiled.ends[u]],
+                                       compiled.edge_lines[compiled.offsets[u]:compiled.ends[u]],
+                                       compiled.weights[compiled.offsets[u]:compiled.ends[u]]))
+            open_edges: List[Tuple[int, int, int]] = []
+            closed_edges: List[Tuple[int, int, int]] = []
+            for target, line, time in compiled.base_edges(u):
+                weight = self.weight(names[u], names[target], lines[line], time)
+                if weight is None:
+                    closed_edges.append((target, line, time))
+                else:
+                    open_edges.append((target, line, weight))
+            compiled.set_station_edges(u, open_edges, closed_edges)
+            after = self._fastest(open_edges)
+            for target, line in sorted(before.keys() | after.keys()):
+                old, new = before.get((target, line)), after.get((target, line))
+                if old != new:
+                    changes.append((u, target, line, old, new))
+        return changes
+
+    @staticmethod
+    def _fastest(edges: Iterable[Tuple[int, int, int]]) -> Dict[Tuple[int, int], int]:
+        fastest: Dict[Tuple[int, int], int] = {}
+        for target, line, weight in edges:
+            if weight < fastest.get((target, line), weight + 1):
+                fastest[(target, line)] = weight
+        return fastest
@@ -0,0 +1,222 @@
+from array import array
+import heapq
+from typing import Callable, Dict, List, Optional, Tuple
+
+from compiled_graph import NO_LINE, CompiledGraph, EdgeMask
+
+# Goal-directed alternatives to the plain Dijkstra in CompiledGraph.search, for
+# point-to-point queries. Both run over the same packed (station, committed_line)
+# states and apply the interchange penalty and Walk pass-through rules exactly as
+# the forward search does, so they find a route of the same total cost.
+#
+# They are not drop-in replacements for the default engine, though. When several
+# routes tie on cost, CompiledGraph.search keeps the one whose states it discovered
+# first, and that order depends on every state within the route's cost of the
+# start: exactly the part of the network these engines avoid exploring. So on ties
+# they can return a different, equally fast route (on the built-in network,
+# bidirectional does for about 8% of station pairs and ALT for about 3%). Use them
+# where any fastest route will do, not where answers must match find_route's.
+#
+# Each engine returns (path, settled): the (station, line) path or None, and how
+# many states it settled — the measure of how much of the network it explored.
+# Given an EdgeMask, both skip the edges it bars, in both search directions.
+
+INFINITY = float('inf')
+
+
+def _edge_filter(graph: CompiledGraph, mask: EdgeMask) -> Callable[[int], List[int]]:
+    """station id -> ids of its open edges that `mask` doesn't bar. Edges are stored in
+    both directions alike, so the same filter serves a backward search."""
+    offsets, ends, targets, edge_lines = graph.offsets, graph.ends, graph.targets, graph.edge_lines
+    blocked_lines, blocked_stations = mask
+    return lambda station: [e for e in range(offsets[station], ends[station])
+                            if not (blocked_lines[edge_lines[e]] or blocked_stations[targets[e]])]
+
+
+def bidirectional_search(graph: CompiledGraph, source: int, target: int, penalty: int = 5,
+                         mask: Optional[EdgeMask] = None) -> Tuple[Optional[List[Tuple[str, Optional[str]]]], int]:
+    """Dijkstra from `source` forwards and from every state at `target` backwards,
+    stopping once the two frontiers can no longer improve the best meeting point."""
+    offsets, ends, targets, edge_lines, weights = graph.offsets, graph.ends, graph.targets, graph.edge_lines, graph.weights
+    line_count, walk_line, state_lines = graph.line_count, graph.walk_line, graph.state_lines
+    open_edges = _edge_filter(graph, mask) if mask is not None else None
+
+    start = source * line_count + NO_LINE
+    dist_f: Dict[int, int] = {start: 0}
+    prev: Dict[int, Optional[Tuple[int, int]]] = {start: None}
+    frontier_f: List[Tuple[int, int]] = [(0, start)]
+
+    # Backward distances are "minutes still to go from this state to any state at target";
+    # `succ` is the mirror of `prev`: state -> (next state, edge line id).
+    dist_b: Dict[int, int] = {}
+    succ: Dict[int, Optional[Tuple[int, int]]] = {}
+    frontier_b: List[Tuple[int, int]] = []
+    for line in sorted(state_lines[target]):
+        state = target * line_count + line
+        dist_b[state] = 0
+        succ[state] = None
+        frontier_b.append((0, state))
+
+    best, meeting = INFINITY, -1
+    if start in dist_b:
+        best, meeting = 0, start
+    settled = 0
+
+    while frontier_f and frontier_b and frontier_f[0][0] + frontier_b[0][0] < best:
+        if frontier_f[0][0] <= frontier_b[0][0]:
+            d, current = heapq.heappop(frontier_f)
+            if d > dist_f[current]:
+                continue
+            settled += 1
+            station, committed = divmod(current, line_count)
+            for e in (range(offsets[station], ends[station]) if open_edges is None else open_edges(station)):
+                line = edge_lines[e]
+                if line == walk_line:
+                    new_committed, new_dist = committed, d + weights[e]
+                elif committed != NO_LINE and line != committed:
+                    new_committed, new_dist = line, d + weights[e] + penalty
+                else:
+                    new_committed, new_dist = line, d + weights[e]
+                neighbor = targets[e] * line_count + new_committed
+                if new_dist < dist_f.get(neighbor, INFINITY):
+                    dist_f[neighbor] = new_dist
+                    prev[neighbor] = (current, line)
+                    heapq.heappush(frontier_f, (new_dist, neighbor))
+                    if neighbor in dist_b and new_dist + dist_b[neighbor] < best:
+                        best, meeting = new_dist + dist_b[neighbor], neighbor
+        else:
+            d, current = heapq.heappop(frontier_b)
+            if d > dist_b[current]:
+                continue
+            settled += 1
+            station, committed = divmod(current, line_count)
+            # Edges are stored in both directions with the same line and time, so the
+            # edges *into* this station are its own adjacency list read backwards.
+            for e in (range(offsets[station], ends[station]) if open_edges is None else open_edges(station)):
+                line, neighbor_station, time = edge_lines[e], targets[e], weights[e]
+                if line == walk_line:
+                    if committed not in state_lines[neighbor_station]:
+                        continue
+                    candidates = ((committed, d + time),)
+                elif line == committed:
+                    candidates = tuple((c, d + time + (penalty if c != NO_LINE and c != line else 0))
+                                       for c in state_lines[neighbor_station])
+                else:
+                    continue
+                for c, new_dist in candidates:
+                    neighbor = neighbor_station * line_count + c
+                    if new_dist < dist_b.get(neighbor, INFINITY):
+                        dist_b[neighbor] = new_dist
+                        succ[neighbor] = (current, line)
+                        heapq.heappush(frontier_b, (new_dist, neighbor))
+                        if neighbor in dist_f and dist_f[neighbor] + new_dist < best:
+                            best, meeting = dist_f[neighbor] + new_dist, neighbor
+
+    if meeting < 0:
+        return None, settled
+
+    path = graph.unwind(prev, meeting)
+    entry = succ[meeting]
+    while entry is not None:
+        state, line = entry
+        path.append((graph.stations[state // line_count], graph.lines[line]))
+        entry = succ[state]
+    return path, settled
+
+
+class Landmarks:
+    """Station-level shortest distances from a few far-apart landmark stations,
+    ignoring interchange penalties. For any station v and target t, and any
+    landmark L, |d(L, t) - d(L, v)| never exceeds the true penalised journey time
+    from v to t (the graph is symmetric and penalties only add time), which makes
+    it an admissible, consistent A* heuristic."""
+
+    def __init__(self, graph: CompiledGraph, count: int = 8):
+        self.graph_version = graph.graph_version
+        n = len(graph.stations)
+        self.distances: List[array] = []
+        if n == 0:
+            return
+        # Farthest-point selection: each new landmark is the station farthest from all
+        # landmarks chosen so far, so together they "surround" the network.
+        nearest = [INFINITY] * n
+        row = self._station_distances(graph, 0)
+        candidate = max(range(n), key=lambda s: row[s] if row[s] != INFINITY else -1)
+        for _ in range(min(count, n)):
+            row = self._station_distances(graph, candidate)
+            self.distances.append(array('i', (-1 if d == INFINITY else d for d in row)))
+            nearest = [min(a, b) for a, b in zip(nearest, row)]
+            # Unreachable stations count as far away so other components get a landmark too.
+            candidate = max(range(n), key=lambda s: (nearest[s] if nearest[s] != INFINITY else 1 << 30))
+            if nearest[candidate] == 0:
+                break
+
+    @staticmethod
+    def _station_distances(graph: CompiledGraph, source: int) -> List[float]:
+        dist: List[float] = [INFINITY] * len(graph.stations)
+        dist[source] = 0
+        frontier = [(0, source)]
+        while frontier:
+            d, station = heapq.heappop(frontier)
+            if d > dist[station]:
+                continue
+            for e in range(graph.offsets[station], graph.ends[station]):
+                neighbor, new_dist = graph.targets[e], d + graph.weights[e]
+                if new_dist < dist[neighbor]:
+                    dist[neighbor] = new_dist
+                    heapq.heappush(frontier, (new_dist, neighbor))
+        return dist
+
+    def lower_bound(self, station: int, target: int) -> int:
+        best = 0
+        for row in self.distances:
+            a, b = row[station], row[target]
+            if a >= 0 and b >= 0 and abs(a - b) > best:
+                best = abs(a - b)
+        return best
+
+
+def alt_search(graph: CompiledGraph, landmarks: Landmarks, source: int, target: int, penalty: int = 5,
+               mask: Optional[EdgeMask] = None) -> Tuple[Optional[List[Tuple[str, Optional[str]]]], int]:
+    """A* over the state graph with landmark (ALT) lower bounds on the time left."""
+    offsets, ends, targets, edge_lines, weights = graph.offsets, graph.ends, graph.targets, graph.edge_lines, graph.weights
+    line_count, walk_line = graph.line_count, graph.walk_line
+    open_edges = _edge_filter(graph, mask) if mask is not None else None
+    bounds: Dict[int, int] = {}
+
+    def bound(station: int) -> int:
+        h = bounds.get(station)
+        if h is None:
+            h = bounds[station] = landmarks.lower_bound(station, target)
+        return h
+
+    start = source * line_count + NO_LINE
+    dist: Dict[int, int] = {start: 0}
+    prev: Dict[int, Optional[Tuple[int, int]]] = {start: None}
+    frontier: List[Tuple[int, int, int]] = [(bound(source), 0, start)]
+    settled = 0
+
+    while frontier:
+        _, d, current = heapq.heappop(frontier)
+        if d > dist[current]:
+            continue
+        settled += 1
+        station, committed = divmod(current, line_count)
+        if station == target:
+            return graph.unwind(prev, current), settled
+
+        for e in (range(offsets[station], ends[station]) if open_edges is None else open_edges(station)):
+            line = edge_lines[e]
+            if line == walk_line:
+                new_committed, new_dist = committed, d + weights[e]
+            elif committed != NO_LINE and line != committed:
+                new_committed, new_dist = line, d + weights[e] + penalty
+            else:
+                new_committed, new_dist = line, d + weights[e]
+            neighbor = targets[e] * line_count + new_committed
+            if new_dist < dist.get(neighbor, INFINITY):
+                dist[neighbor] = new_dist
+                prev[neighbor] = (current, line)
+                heapq.heappush(frontier, (new_dist + bound(targets[e]), new_dist, neighbor))
+
+    return None, settled
@@ -0,0 +1,91 @@
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Opt-in per-query statistics for TubeNetwork.find_route.
+# Instrumentation is off unless a SearchInstrumentation is attached to the network
+# (TubeNetwork.enable_instrumentation); when it is off find_route only checks one
+# attribute. When on, every query produces a QueryStats record that is added to
+# running totals and passed to each registered hook, e.g. to forward to a metrics
+# pipeline. A hook that raises is logged and skipped; the query still returns.
+
+
+class QueryStats(NamedTuple):
+    """The work behind one find_route call: `settled` states, `relaxed` edges followed
+    from them (edges a query's exclusions bar are skipped, not counted), the largest
+    the search frontier grew (`frontier_peak`, entries in the heap) and how many of
+    the followed edges carried an interchange `penalties`. Those last three are only
+    counted by the plain Dijkstra engine and are None when another engine searched;
+    every count is 0 when nothing was searched because the answer came from the
+    route cache or the route matrix."""
+    start: str
+    end: str
+    engine: str
+    cached: bool
+    found: bool
+    settled: int
+    relaxed: Optional[int]
+    frontier_peak: Optional[int]
+    penalties: Optional[int]
+    wall_ms: float
+
+
+QueryHook = Callable[[QueryStats], None]
+
+
+class SearchInstrumentation:
+    def __init__(self, hooks: Optional[List[QueryHook]] = None):
+        self.hooks: List[QueryHook] = list(hooks or ())
+        self.last: Optional[QueryStats] = None
+        self.reset()
+
+    def reset(self):
+        self.queries = 0
+        self.cache_hits = 0
+        self.not_found = 0
+        self.settled = 0
+        self.relaxed = 0
+        self.penalties = 0
+        self.frontier_peak = 0
+        self.wall_ms = 0.0
+        self.slowest: Optional[QueryStats] = None
+
+    def add_hook(self, hook: QueryHook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: QueryHook):
+        self.hooks.remove(hook)
+
+    def record(self, stats: QueryStats):
+        self.last = stats
+        self.queries += 1
+        self.cache_hits += stats.cached
+        self.not_found += not stats.found
+        self.settled += stats.settled
+        self.relaxed += stats.relaxed or 0
+        self.penalties += stats.penalties or 0
+        self.frontier_peak = max(self.frontier_peak, stats.frontier_peak or 0)
+        self.wall_ms += stats.wall_ms
+        if self.slowest is None or stats.wall_ms > self.slowest.wall_ms:
+            self.slowest = stats
+        for hook in self.hooks:
+            try:
+                hook(stats)
+            except Exception:
+                # A broken metrics sink must not break routing; logging is imported
+                # only here so enabling instrumentation costs nothing at startup.
+                import logging
+                logging.getLogger(__name__).exception("query hook %r failed", hook)
+
+    def totals(self) -> Dict[str, float]:
+        searched = self.queries - self.cache_hits
+        return {
+            'queries': self.queries,
+            'cache_hits': self.cache_hits,
+            'not_found': self.not_found,
+            'settled': self.settled,
+            'relaxed': self.relaxed,
+            'penalties': self.penalties,
+            'frontier_peak': self.frontier_peak,
+            'wall_ms': self.wall_ms,
+            'mean_ms': self.wall_ms / self.queries if self.queries else 0.0,
+            'settled_per_search': self.settled / searched if searched else 0.0,
+        }
@@ -0,0 +1,82 @@
+from array import array
+import heapq
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from compiled_graph import CompiledGraph, NO_LINE
+
+# "Everywhere reachable within N minutes" from one search instead of one per station.
+# The search is the same interchange-penalised Dijkstra over (station, committed
+# line) states as CompiledGraph.search, but it is seeded from every origin at
+# once, never enqueues a state beyond the budget and keeps no predecessors: all
+# it leaves behind is each station's best time, in one int array indexed like
+# CompiledGraph.stations.
+
+UNREACHED = -1
+
+
+class Isochrone(NamedTuple):
+    """Penalised journey minutes (the cost find_route minimises) from the nearest
+    origin to every station, UNREACHED (-1) where that exceeds `budget`."""
+    origins: Tuple[str, ...]
+    budget: int
+    stations: List[str]
+    station_ids: Dict[str, int]
+    minutes: array
+
+    def minutes_to(self, station: str) -> Optional[int]:
+        """Minutes to `station`, or None if it is not reachable within the budget."""
+        i = self.station_ids.get(station)
+        minutes = self.minutes[i] if i is not None else UNREACHED
+        return minutes if minutes != UNREACHED else None
+
+    def reachable(self) -> Dict[str, int]:
+        """{station: minutes} for every station within the budget, nearest first."""
+        order = sorted((m, i) for i, m in enumerate(self.minutes) if m != UNREACHED)
+        return {self.stations[i]: m for m, i in order}
+
+    @property
+    def station_count(self) -> int:
+        return sum(1 for m in self.minutes if m != UNREACHED)
+
+
+def bounded_search(compiled: CompiledGraph, sources: Iterable[int], budget: int, penalty: int) -> array:
+    """Best penalised time from any of the station ids in `sources` to every station,
+    UNREACHED for stations that cost more than `budget` to reach."""
+    offsets, ends, targets, edge_lines, weights = (compiled.offsets, compiled.ends, compiled.targets,
+                                                   compiled.edge_lines, compiled.weights)
+    line_count, walk_line = compiled.line_count, compiled.walk_line
+    best = array('i', [UNREACHED]) * len(compiled.stations)
+
+    dist: Dict[int, int] = {}
+    frontier: List[Tuple[int, int]] = []
+    for source in sources:
+        state = source * line_count + NO_LINE
+        if state not in dist:
+            dist[state] = 0
+            frontier.append((0, state))
+    heappush, heappop, dist_get = heapq.heappush, heapq.heappop, dist.get
+
+    while frontier:
+        current_dist, current = heappop(frontier)
+        if current_dist > dist[current]:
+            continue
+        station, committed = divmod(current, line_count)
+        if best[station] == UNREACHED:
+            best[station] = current_dist
+
+        lo, hi = offsets[station], ends[station]
+        for to, line, weight in zip(targets[lo:hi], edge_lines[lo:hi], weights[lo:hi]):
+            if line == walk_line:
+                new_committed, new_dist = committed, current_dist + weight
+            elif committed != NO_LINE and line != committed:
+                new_committed, new_dist = line, current_dist + weight + penalty
+            else:
+                new_committed, new_dist = line, current_dist + weight
+            if new_dist > budget:
+                continue
+            neighbor = to * line_count + new_committed
+            old = dist_get(neighbor)
+            if old is None or new_dist < old:
+                dist[neighbor] = new_dist
+                heappush(frontier, (new_dist, neighbor))
+    return best
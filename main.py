@@ -10,8 +10,15 @@ from typing import Dict, List, Tuple, Optional
 import json
 from collections import defaultdict, deque
 import webbrowser
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 class LondonUndergroundApp:
+    # How often (ms) the main loop checks on a route search running in the background.
+    POLL_INTERVAL_MS = 50
+    # Lines of route text display_route inserts at once; longer routes fill in batch by batch.
+    RENDER_BATCH_LINES = 200
+
     def __init__(self, root):
         self.root = root
         self.root.title("London Underground Route Planner")
@@ -20,6 +27,20 @@ class LondonUndergroundApp:
         
         # Initialize data
         self.tube_network = TubeNetwork()
+
+        # Route searches run on a single worker thread so the window stays responsive;
+        # results are picked up from the Tk main loop by polling with root.after.
+        self.route_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='route')
+        self.pending_route = None
+        self.route_request = 0
+        self.route_started = 0.0
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+
+        # Rendering state for display_route: configured line tags by line name, the
+        # reusable summary label, and a counter that stops stale background batches.
+        self.line_tags = {}
+        self.summary_label = None
+        self.render_request = 0
         
         # Setup GUI
         self.setup_styles()
@@ -84,8 +105,9 @@ class LondonUndergroundApp:
         self.from_var = tk.StringVar()
         self.from_combo = ttk.Combobox(route_frame, textvariable=self.from_var, 
                                       style='Custom.TCombobox', width=30)
-        self.from_combo['values'] = sorted(self.tube_network.get_all_stations())
+        self.from_combo['values'] = self.tube_network.station_index.stations
         self.from_combo.pack(fill='x', pady=(0, 10))
+        self.from_combo.bind('<KeyRelease>', self.filter_stations)
         
         # Swap button
         swap_frame = tk.Frame(route_frame, bg='white')
@@ -103,8 +125,9 @@ class LondonUndergroundApp:
         self.to_var = tk.StringVar()
         self.to_combo = ttk.Combobox(route_frame, textvariable=self.to_var, 
                                     style='Custom.TCombobox', width=30)
-        self.to_combo['values'] = sorted(self.tube_network.get_all_stations())
+        self.to_combo['values'] = self.tube_network.station_index.stations
         self.to_combo.pack(fill='x', pady=(0, 15))
+        self.to_combo.bind('<KeyRelease>', self.filter_stations)
         
         # Plan route button
         plan_button = tk.Button(route_frame, text="Plan Route", 
@@ -205,6 +228,17 @@ Ready to plan your journey?"""
         self.route_text.delete(1.0, tk.END)
         self.route_text.insert(1.0, welcome_text)
         
+    def filter_stations(self, event):
+        """Narrow a station dropdown to the names matching what has been typed"""
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        combo = event.widget
+        query = combo.get()
+        if query.strip():
+            combo['values'] = self.tube_network.search_stations(query, limit=50)
+        else:
+            combo['values'] = self.tube_network.station_index.stations
+
     def plan_route(self):
         """Plan route between selected stations"""
         from_station = self.from_var.get().strip()
@@ -220,54 +254,88 @@ Ready to plan your journey?"""
                                "Starting and destination stations are the same!")
             return
         
-        if from_station not in self.tube_network.get_all_stations():
+        if not self.tube_network.has_station(from_station):
             messagebox.showerror("Invalid Station", 
                                f"Starting station '{from_station}' not found.")
             return
             
-        if to_station not in self.tube_network.get_all_stations():
+        if not self.tube_network.has_station(to_station):
             messagebox.showerror("Invalid Station", 
                                f"Destination station '{to_station}' not found.")
             return
         
-        self.status_var.set("Planning route...")
-        self.root.update()
-        
+        # Supersede whatever is still in flight: a queued search is cancelled outright,
+        # and a running one finishes in the background but its result is ignored.
+        if self.pending_route is not None:
+            self.pending_route.cancel()
+        self.route_request += 1
+        self.pending_route = self.route_executor.submit(self._search_route, from_station, to_station)
+        self.route_started = time.perf_counter()
+        self.status_var.set(f"Planning route: {from_station} → {to_station}...")
+        self.root.after(self.POLL_INTERVAL_MS, self._poll_route, self.route_request,
+                        self.pending_route, from_station, to_station)
+
+    def _search_route(self, from_station, to_station):
+        """Runs on the worker thread; returns the route and the search time in seconds"""
+        started = time.perf_counter()
+        route = self.tube_network.find_route(from_station, to_station)
+        return route, time.perf_counter() - started
+
+    def _poll_route(self, request, future, from_station, to_station):
+        """Check on a submitted search from the Tk main loop and show its result when done"""
+        if request != self.route_request:
+            return  # superseded by a newer request or cleared
+        if not future.done():
+            waited = time.perf_counter() - self.route_started
+            self.status_var.set(f"Planning route: {from_station} → {to_station}... {waited:.1f}s")
+            self.root.after(self.POLL_INTERVAL_MS, self._poll_route, request, future, from_station, to_station)
+            return
+
+        self.pending_route = None
         try:
-            route = self.tube_network.find_route(from_station, to_station)
+            route, elapsed = future.result()
             if route:
                 self.display_route(route, from_station, to_station)
-                self.status_var.set(f"Route found: {len(route)} stations")
+                self.status_var.set(f"Route found: {len(route)} stations (searched in {elapsed * 1000:.1f} ms)")
             else:
                 self.route_text.delete(1.0, tk.END)
                 self.route_text.insert(1.0, "No route found between these stations.")
-                self.status_var.set("No route found")
+                self.status_var.set(f"No route found (searched in {elapsed * 1000:.1f} ms)")
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred while planning the route: {str(e)}")
             self.status_var.set("Error planning route")
-            
+
+    def on_close(self):
+        """Stop the route worker without waiting for a search in progress"""
+        self.route_executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
     def display_route(self, route, from_station, to_station):
         """Display the planned route with details"""
+        self.render_request += 1
         self.route_text.delete(1.0, tk.END)
-        
-        # Clear and update summary frame
-        for widget in self.summary_frame.winfo_children():
-            widget.destroy()
-            
+
         # Journey summary
         total_stops = len(route) - 1
-        estimated_time = total_stops * 2  # Rough estimate: 2 minutes per stop
-        
+        travel_minutes = self.tube_network.get_route_minutes(route)
+
         summary_text = f"Journey from {from_station} to {to_station}\n"
-        summary_text += f"Total stops: {total_stops} | Estimated time: {estimated_time} minutes"
-        
-        summary_label = tk.Label(self.summary_frame, text=summary_text, 
-                                font=('Arial', 11, 'bold'), bg='#f0f0f0')
-        summary_label.pack(pady=5)
-        
-        # Detailed route header
-        header = f"🚇 ROUTE DETAILS\n" + ("=" * 50) + "\n\n"
-        self.route_text.insert(tk.END, header)
+        summary_text += f"Total stops: {total_stops} | Travel time: {travel_minutes} minutes"
+        self._show_summary(summary_text)
+
+        # The whole document is built in memory as (text, tag) pieces and handed to Tk
+        # in as few insert calls as possible: one for the first screenful, then the
+        # rest in background batches so a very long route appears immediately.
+        pieces = self._route_document(route)
+        first, rest = pieces[:self.RENDER_BATCH_LINES], pieces[self.RENDER_BATCH_LINES:]
+        self._insert_pieces(first)
+        if rest:
+            self.root.after_idle(self._render_remaining, self.render_request, rest)
+
+    def _route_document(self, route):
+        """Build the route details text as a list of (text, tag) pieces, one per line"""
+        colorize = self.colorize_legs.get()
+        pieces = [(f"🚇 ROUTE DETAILS\n" + ("=" * 50) + "\n\n", '')]
 
         # Structured legs for colorized rendering
         legs = self.tube_network.get_route_legs(route)
@@ -276,42 +344,64 @@ Ready to plan your journey?"""
                 line_text = f"{i}. Walk from {leg_start} to {leg_end} ({stops} stops)\n"
             else:
                 line_text = f"{i}. Take {line_name} Line from {leg_start} to {leg_end} ({stops} stops)\n"
+            pieces.append((line_text, self._ensure_line_tag(line_name) if colorize else ''))
 
-            start_index = self.route_text.index(tk.END)
-            self.route_text.insert(tk.END, line_text)
-            end_index = self.route_text.index(tk.END)
-
-            if self.colorize_legs.get():
-                tag = self._line_to_tag(line_name)
-                self._ensure_line_tag(line_name)
-                self.route_text.tag_add(tag, start_index, end_index)
-            
         if self.show_step_by_step.get():
-            section_header = "\n" + ("=" * 50) + "\n" + "STEP-BY-STEP DIRECTIONS:\n\n"
-            self.route_text.insert(tk.END, section_header)
+            pieces.append(("\n" + ("=" * 50) + "\n" + "STEP-BY-STEP DIRECTIONS:\n\n", ''))
+            show_interchanges = self.show_interchanges.get()
             for i, (station, _line) in enumerate(route):
                 if i == 0:
-                    self.route_text.insert(tk.END, f"🚀 START: Board at {station}\n")
+                    pieces.append((f"🚀 START: Board at {station}\n", ''))
                 elif i == len(route) - 1:
-                    self.route_text.insert(tk.END, f"🎯 END: Alight at {station}\n")
+                    pieces.append((f"🎯 END: Alight at {station}\n", ''))
                 else:
                     lines = self.tube_network.get_station_lines(station)
-                    if len(lines) > 1 and self.show_interchanges.get():
-                        self.route_text.insert(tk.END, f"🔄 INTERCHANGE: {station} (Lines: {', '.join(lines)})\n")
+                    if len(lines) > 1 and show_interchanges:
+                        pieces.append((f"🔄 INTERCHANGE: {station} (Lines: {', '.join(lines)})\n", ''))
                     else:
-                        self.route_text.insert(tk.END, f"   → {station}\n")
+                        pieces.append((f"   → {station}\n", ''))
 
         footer = "\n" + ("=" * 50) + "\n" + "💡 TIP: Check TfL website for live service updates\n" + "🌐 Future version will include live API integration"
-        self.route_text.insert(tk.END, footer)
+        pieces.append((footer, ''))
+        return pieces
+
+    def _insert_pieces(self, pieces):
+        """Append pieces with a single Text.insert call, merging neighbours that share a tag"""
+        args = []
+        for text, tag in pieces:
+            if args and args[-1] == tag:
+                args[-2] += text
+            else:
+                args += [text, tag]
+        if args:
+            self.route_text.insert(tk.END, *args)
+
+    def _render_remaining(self, request, pieces):
+        """Insert the rest of a long route a batch at a time between other Tk events"""
+        if request != self.render_request:
+            return  # a newer route (or a clear) replaced this one
+        batch, rest = pieces[:self.RENDER_BATCH_LINES], pieces[self.RENDER_BATCH_LINES:]
+        self._insert_pieces(batch)
+        if rest:
+            self.root.after_idle(self._render_remaining, request, rest)
+
+    def _show_summary(self, text):
+        """Reuse one summary label rather than rebuilding the summary frame each time"""
+        if self.summary_label is None:
+            self.summary_label = tk.Label(self.summary_frame, font=('Arial', 11, 'bold'), bg='#f0f0f0')
+        self.summary_label.configure(text=text)
+        self.summary_label.pack(pady=5)
 
     def _line_to_tag(self, line_name: str) -> str:
         safe = ''.join(ch if ch.isalnum() else '_' for ch in (line_name or 'Unknown'))
         return f"line_{safe}"
 
-    def _ensure_line_tag(self, line_name: str):
-        tag = self._line_to_tag(line_name)
-        if tag in self.route_text.tag_names():
-            return
+    def _ensure_line_tag(self, line_name: str) -> str:
+        """Return the text tag for a line, configuring its colours the first time it is used"""
+        tag = self.line_tags.get(line_name)
+        if tag is not None:
+            return tag
+        tag = self.line_tags[line_name] = self._line_to_tag(line_name)
         # Choose colors
         if line_name == 'Walk':
             bg = '#888888'
@@ -319,6 +409,7 @@ Ready to plan your journey?"""
             bg = self.tube_network.line_colors.get(line_name, '#666666')
         fg = self._contrast_text_color(bg)
         self.route_text.tag_configure(tag, background=bg, foreground=fg)
+        return tag
 
     def _contrast_text_color(self, hex_color: str) -> str:
         """Return '#000000' or '#FFFFFF' depending on background luminance for contrast."""
@@ -353,12 +444,19 @@ Ready to plan your journey?"""
         
     def clear_route(self):
         """Clear route selection and results"""
+        # Drop any search still in flight so its result doesn't land after the clear.
+        if self.pending_route is not None:
+            self.pending_route.cancel()
+            self.pending_route = None
+        self.route_request += 1
+
         self.from_var.set("")
         self.to_var.set("")
         
-        # Clear summary frame
-        for widget in self.summary_frame.winfo_children():
-            widget.destroy()
+        # Hide the summary and stop any unfinished background rendering
+        if self.summary_label is not None:
+            self.summary_label.pack_forget()
+        self.render_request += 1
             
         self.show_welcome_message()
         self.status_var.set("Route cleared - Ready for new search")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped, read-only TubeNetwork shared between processes
+
+Writes a network as one flat file — station and line name tables plus the
+compiled adjacency arrays — and attaches to it with mmap. Attaching parses and
+copies nothing: names are decoded when asked for, station lookups binary-search
+the sorted name table, and searches index the mapped arrays directly. However
+many processes attach, the operating system keeps one copy of the file in its
+page cache.
+
+Usage: python mapped_network.py OUT [NETWORK_FILE ...]
+       (the built-in network, or one loaded from JSON/CSV files)
+"""
+
+import mmap
+import os
+import struct
+import sys
+from typing import Dict, Iterator, List, Mapping, Sequence, Tuple
+
+from compiled_graph import CompiledGraph, GraphView
+from network_errors import NetworkDataError
+from tube_network import TubeNetwork
+
+# Layout, little-endian throughout, each section starting on an 8-byte boundary
+# so the arrays can be cast in place:
+#
+#   magic   b'TUBEMAP\n'
+#   header  format version, station count, line count, edge count
+#   table   (offset, length) in bytes of each section below
+#   station names   uint32 offsets (stations + 1) and the UTF-8 bytes they index
+#   line names      likewise, line id 0 being the empty "no line" name
+#   line colours    likewise, '' for lines without one
+#   offsets int32, targets int32, edge_lines uint16, weights int32 — CompiledGraph's arrays
+#
+# Station and line names are sorted (CompiledGraph compiles them that way) and
+# UTF-8 keeps code point order, so names are found by binary search on the bytes.
+
+MAPPED_MAGIC = b'TUBEMAP\n'
+MAPPED_VERSION = 1
+_HEADER = struct.Struct('<8sI3Q')
+_SECTIONS = ('station_offsets', 'station_names', 'line_offsets', 'line_names', 'color_offsets', 'color_names',
+             'offsets', 'targets', 'edge_lines', 'weights')
+_TABLE = struct.Struct(f'<{2 * len(_SECTIONS)}Q')
+_ALIGN = 8
+
+
+class StringTable(Sequence[str]):
+    """A read-only list of strings stored as offsets into a UTF-8 buffer."""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self._data[self._offsets[i]:self._offsets[i + 1]])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('string table index out of range')
+        return self.raw(i).decode('utf-8')
+
+
+class NameIndex(Mapping[str, int]):
+    """name -> position in a sorted StringTable, by binary search instead of a dict."""
+
+    def __init__(self, table: StringTable):
+        self._table = table
+
+    def __getitem__(self, name: str) -> int:
+        if not isinstance(name, str):
+            raise KeyError(name)
+        key = name.encode('utf-8')
+        table = self._table
+        lo, hi = 0, len(table)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if table.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(table) and table.raw(lo) == key:
+            return lo
+        raise KeyError(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+def _string_sections(names: Sequence[str]) -> Tuple[bytes, bytes]:
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = [0]
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    return struct.pack(f'<{len(offsets)}I', *offsets), b''.join(encoded)
+
+
+def write_mapped(path: str, compiled: CompiledGraph, colors: Dict[str, str]):
+    """Write `compiled` (as compiled, before any disruption) in the mapped layout."""
+    if sys.byteorder != 'little':
+        raise ValueError("mapped networks are written little-endian; this platform is not")
+    targets, edge_lines, weights = compiled._base or (compiled.targets, compiled.edge_lines, compiled.weights)
+    sections = [*_string_sections(compiled.stations), *_string_sections(compiled.lines),
+                *_string_sections([colors.get(line, '') for line in compiled.lines]),
+                bytes(compiled.offsets), bytes(targets), bytes(edge_lines), bytes(weights)]
+
+    position = _HEADER.size + _TABLE.size
+    table: List[int] = []
+    for data in sections:
+        position += -position % _ALIGN
+        table += [position, len(data)]
+        position += len(data)
+
+    # Write beside the target and rename, so a process attaching never sees half a file.
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAPPED_MAGIC, MAPPED_VERSION, len(compiled.stations), len(compiled.lines),
+                             len(targets)))
+        f.write(_TABLE.pack(*table))
+        for offset, data in zip(table[::2], sections):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+def attach(path: str) -> Tuple[CompiledGraph, Dict[str, str]]:
+    """Map a file written by write_mapped as (compiled graph, line colours)."""
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise NetworkDataError(f"{path}: empty file") from None
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size + _TABLE.size:
+        raise NetworkDataError(f"{path}: not a mapped network")
+    magic, version, station_count, line_count, edge_count = _HEADER.unpack_from(view)
+    if magic != MAPPED_MAGIC:
+        raise NetworkDataError(f"{path}: not a mapped network")
+    if version != MAPPED_VERSION:
+        raise NetworkDataError(f"{path}: mapped network format {version}, expected {MAPPED_VERSION}")
+    if sys.byteorder != 'little':
+        raise NetworkDataError(f"{path}: mapped networks are little-endian; this platform is not")
+
+    table = _TABLE.unpack_from(view, _HEADER.size)
+    expected = {'station_offsets': 4 * (station_count + 1), 'line_offsets': 4 * (line_count + 1),
+                'color_offsets': 4 * (line_count + 1), 'offsets': 4 * (station_count + 1),
+                'targets': 4 * edge_count, 'edge_lines': 2 * edge_count, 'weights': 4 * edge_count}
+    parts: Dict[str, memoryview] = {}
+    for name, offset, length in zip(_SECTIONS, table[::2], table[1::2]):
+        if offset + length > len(view) or expected.get(name, length) != length:
+            raise NetworkDataError(f"{path}: truncated or corrupt section {name}")
+        parts[name] = view[offset:offset + length]
+
+    stations = StringTable(parts['station_offsets'].cast('I'), parts['station_names'])
+    lines = StringTable(parts['line_offsets'].cast('I'), parts['line_names'])
+    colors = StringTable(parts['color_offsets'].cast('I'), parts['color_names'])
+    compiled = CompiledGraph.from_arrays(stations, lines, parts['offsets'].cast('i'), parts['targets'].cast('i'),
+                                         parts['edge_lines'].cast('H'), parts['weights'].cast('i'),
+                                         station_ids=NameIndex(stations), line_ids=NameIndex(lines))
+    return compiled, {line: color for line, color in zip(lines, colors) if color}
+
+
+class MappedTubeNetwork(TubeNetwork):
+    """A TubeNetwork attached to a file written by write_mapped. Its graph is a
+    read-only view of the mapping: disruptions work (on private copies of the
+    edges they touch), adding connections does not. Pickling sends only the path,
+    so process-pool workers attach to the same file rather than copying the graph."""
+
+    def __init__(self, path: str, **kwargs):
+        self.mapped_path = path
+        self._init_kwargs = kwargs
+        super().__init__(**kwargs)
+
+    def _build_network(self):
+        compiled, colors = attach(self.mapped_path)
+        self.graph = GraphView(compiled)
+        self.line_colors.update(colors)
+        self.graph_version += 1
+        compiled.graph_version = self.graph_version
+        self._compiled = compiled
+
+    def _add_connection(self, a: str, b: str, line: str, time: int = 2):
+        raise ValueError(f"{self.mapped_path} is a read-only mapped network")
+
+    def __reduce__(self):
+        return _reattach, (self.mapped_path, self._init_kwargs, self.disruptions)
+
+
+def _reattach(path: str, kwargs: Dict, disruptions) -> MappedTubeNetwork:
+    network = MappedTubeNetwork(path, **kwargs)
+    if disruptions:
+        network.disruptions = disruptions
+        network.disruptions.apply(network.compiled, range(len(network.compiled.stations)))
+    return network
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help'):
+        print(__doc__.strip())
+        sys.exit(0 if len(sys.argv) >= 2 else 2)
+    out, sources = sys.argv[1], sys.argv[2:]
+    if sources:
+        from network_loader import FileTubeNetwork
+        network: TubeNetwork = FileTubeNetwork(*sources)
+    else:
+        network = TubeNetwork()
+    colors = {line: network.line_colors[line] for line in network.compiled.lines if line in network.line_colors}
+    write_mapped(out, network.compiled, colors)
+    print(f"Wrote {len(network.compiled.stations)} stations, {len(network.compiled.targets)} edges to {out}")
+
+
+if __name__ == "__main__":
+    main()
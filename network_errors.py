@@ -0,0 +1,6 @@
+# Errors shared by the modules that read network and timetable data files, kept
+# apart from them so importing one (timetable, say) doesn't pull in the others.
+
+
+class NetworkDataError(ValueError):
+    """A network data file is malformed; the message names the file and entry."""
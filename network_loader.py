@@ -0,0 +1,264 @@
+from array import array
+from collections import defaultdict
+import csv
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from compiled_graph import CompiledGraph, GraphView
+from network_errors import NetworkDataError
+from tube_network import TubeNetwork
+
+# Network definitions read from data files instead of _build_network's lists.
+#
+# JSON files describe lines as ordered station lists, with optional per-segment
+# travel times (one fewer than the stations, default 2 minutes) and a colour.
+# A line may appear more than once, e.g. one entry per branch:
+#
+#   {"lines": [{"name": "Victoria", "color": "#0098D4", "stations": ["Brixton", "Stockwell", ...],
+#               "times": [2, 3, ...]}],
+#    "walks": [["Bank", "Monument", 5]],
+#    "stations": {"Bank": [51.5133, -0.0886], ...}}
+#
+# CSV files list one connection per row under a `line,from,to,minutes` header;
+# use the line name Walk for walking links. A CSV file with a `station,lat,lon`
+# header instead gives station coordinates.
+#
+# Coordinates (latitude, longitude) are optional; with `walk_radius`, Walk links
+# are derived from them for every pair of stations within that many metres (see
+# walk_links), on top of any listed explicitly.
+#
+# Parsing and validating every start is wasteful once the data is settled, so the
+# built graph is also written to a binary snapshot. Its header records a checksum
+# of the source files; later starts whose sources are unchanged load the snapshot's
+# adjacency arrays directly and skip parsing altogether. Nor do they rebuild the
+# string-keyed `graph`: it is a read-only view of those arrays (GraphView) until
+# a connection is added, when it is copied out into ordinary lists once.
+
+SNAPSHOT_MAGIC = b'TUBENET\n'
+SNAPSHOT_VERSION = 2
+DEFAULT_TIME = 2
+
+
+class FileTubeNetwork(TubeNetwork):
+    """A TubeNetwork whose stations and connections come from JSON/CSV data files.
+
+    With `snapshot_path`, a matching snapshot is loaded instead of parsing the
+    sources, and a missing or stale one is rewritten after parsing. With
+    `walk_radius` (metres), Walk links are added between all stations with
+    coordinates that are at most that far apart.
+    """
+
+    def __init__(self, *paths: str, snapshot_path: Optional[str] = None, walk_radius: Optional[float] = None,
+                 **kwargs):
+        if not paths:
+            raise ValueError("At least one network data file is required")
+        self.source_paths = paths
+        self.snapshot_path = snapshot_path
+        self.walk_radius = walk_radius
+        # True when this instance was built from the snapshot rather than the sources.
+        self.loaded_from_snapshot = False
+        super().__init__(**kwargs)
+
+    def _build_network(self):
+        checksum = source_checksum(self.source_paths, self.walk_radius)
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            snapshot = read_snapshot(self.snapshot_path, checksum)
+            if snapshot is not None:
+                compiled, colors, coordinates = snapshot
+                self.graph = GraphView(compiled)
+                self.line_colors.update(colors)
+                self.coordinates.update(coordinates)
+                self.graph_version += 1
+                compiled.graph_version = self.graph_version
+                self._compiled = compiled
+                self.loaded_from_snapshot = True
+                return
+
+        colors: Dict[str, str] = {}
+        coordinates: Dict[str, Tuple[float, float]] = {}
+        for path in self.source_paths:
+            for a, b, line, time in read_connections(path, colors, coordinates):
+                self._add_connection(a, b, line, time)
+        self.line_colors.update(colors)
+        self.coordinates.update(coordinates)
+        if self.walk_radius:
+            self.add_walk_links(self.walk_radius)
+        if self.snapshot_path:
+            write_snapshot(self.snapshot_path, self.compiled, colors, checksum, coordinates)
+
+    def _add_connection(self, a: str, b: str, line: str, time: int = 2):
+        if isinstance(self.graph, GraphView):
+            # The first change to a network loaded from a snapshot needs editable lists.
+            self.graph = defaultdict(list, self.compiled.to_graph())
+        super()._add_connection(a, b, line, time)
+
+
+def read_connections(path: str, colors: Dict[str, str],
+                     coordinates: Optional[Dict[str, Tuple[float, float]]] = None) -> Iterator[Tuple[str, str, str, int]]:
+    """Yield validated (a, b, line, minutes) connections from one data file, recording
+    any line colours it defines into `colors` and station positions into `coordinates`."""
+    if coordinates is None:
+        coordinates = {}
+    if path.lower().endswith('.csv'):
+        return _read_csv(path, coordinates)
+    if path.lower().endswith('.json'):
+        return _read_json(path, colors, coordinates)
+    raise NetworkDataError(f"{path}: unsupported data file type (expected .json or .csv)")
+
+
+def _check_connection(where: str, a, b, line, time) -> Tuple[str, str, str, int]:
+    for label, name in (('station', a), ('station', b), ('line', line)):
+        if not isinstance(name, str) or not name.strip():
+            raise NetworkDataError(f"{where}: {label} name must be a non-empty string, got {name!r}")
+    if a == b:
+        raise NetworkDataError(f"{where}: '{a}' is connected to itself")
+    if isinstance(time, bool) or not isinstance(time, int) or time <= 0:
+        raise NetworkDataError(f"{where}: travel time must be a positive whole number of minutes, got {time!r}")
+    return a, b, line, time
+
+
+def _check_point(where: str, station, lat, lon) -> Tuple[str, Tuple[float, float]]:
+    if not isinstance(station, str) or not station.strip():
+        raise NetworkDataError(f"{where}: station name must be a non-empty string, got {station!r}")
+    for label, value, limit in (('latitude', lat, 90), ('longitude', lon, 180)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not -limit <= value <= limit:
+            raise NetworkDataError(f"{where}: {label} must be a number from -{limit} to {limit}, got {value!r}")
+    return station, (float(lat), float(lon))
+
+
+def _read_json(path: str, colors: Dict[str, str],
+               coordinates: Dict[str, Tuple[float, float]]) -> Iterator[Tuple[str, str, str, int]]:
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise NetworkDataError(f"{path}: invalid JSON ({e})") from None
+    if not isinstance(data, dict):
+        raise NetworkDataError(f"{path}: expected an object with 'lines' and/or 'walks'")
+
+    stations = data.get('stations', {})
+    if not isinstance(stations, dict):
+        raise NetworkDataError(f"{path}: 'stations' must map station names to [latitude, longitude]")
+    for name, point in stations.items():
+        where = f"{path}: stations[{name!r}]"
+        if not isinstance(point, list) or len(point) != 2:
+            raise NetworkDataError(f"{where}: expected [latitude, longitude]")
+        station, point = _check_point(where, name, *point)
+        coordinates[station] = point
+
+    lines, walks = data.get('lines', []), data.get('walks', [])
+    if not isinstance(lines, list):
+        raise NetworkDataError(f"{path}: 'lines' must be a list of line objects, got {type(lines).__name__}")
+    if not isinstance(walks, list):
+        raise NetworkDataError(f"{path}: 'walks' must be a list of [station, station, minutes], "
+                               f"got {type(walks).__name__}")
+
+    for i, entry in enumerate(lines):
+        where = f"{path}: lines[{i}]"
+        if not isinstance(entry, dict):
+            raise NetworkDataError(f"{where}: expected an object")
+        name, stations = entry.get('name'), entry.get('stations')
+        if not isinstance(stations, list) or len(stations) < 2:
+            raise NetworkDataError(f"{where}: 'stations' must list at least two stations")
+        times = entry.get('times', [DEFAULT_TIME] * (len(stations) - 1))
+        if not isinstance(times, list) or len(times) != len(stations) - 1:
+            raise NetworkDataError(f"{where}: 'times' must have one entry per segment ({len(stations) - 1})")
+        if 'color' in entry:
+            color = entry['color']
+            if not (isinstance(color, str) and len(color) == 7 and color.startswith('#')):
+                raise NetworkDataError(f"{where}: 'color' must look like '#RRGGBB', got {color!r}")
+            colors[name] = color
+        for j in range(len(stations) - 1):
+            yield _check_connection(f"{where} segment {j}", stations[j], stations[j + 1], name, times[j])
+
+    for i, entry in enumerate(walks):
+        where = f"{path}: walks[{i}]"
+        if not isinstance(entry, list) or len(entry) != 3:
+            raise NetworkDataError(f"{where}: expected [station, station, minutes]")
+        yield _check_connection(where, entry[0], entry[1], 'Walk', entry[2])
+
+
+def _read_csv(path: str, coordinates: Dict[str, Tuple[float, float]]) -> Iterator[Tuple[str, str, str, int]]:
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if {'station', 'lat', 'lon'} <= set(reader.fieldnames or ()):
+            for row in reader:
+                where = f"{path}:{reader.line_num}"
+                try:
+                    lat, lon = float(row['lat']), float(row['lon'])
+                except (TypeError, ValueError):
+                    raise NetworkDataError(f"{where}: lat and lon must be numbers, "
+                                           f"got {row['lat']!r}, {row['lon']!r}") from None
+                station, point = _check_point(where, row['station'], lat, lon)
+                coordinates[station] = point
+            return
+        missing = {'line', 'from', 'to', 'minutes'} - set(reader.fieldnames or ())
+        if missing:
+            raise NetworkDataError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+        for row in reader:
+            where = f"{path}:{reader.line_num}"
+            try:
+                minutes = int(row['minutes'])
+            except (TypeError, ValueError):
+                raise NetworkDataError(f"{where}: minutes must be a whole number, got {row['minutes']!r}") from None
+            yield _check_connection(where, row['from'], row['to'], row['line'], minutes)
+
+
+def source_checksum(paths: Sequence[str], walk_radius: Optional[float] = None) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    # Derived walks are part of the built graph, so a different radius is a different network.
+    if walk_radius:
+        digest.update(f'walk_radius={walk_radius!r}'.encode())
+    return digest.hexdigest()
+
+
+_SNAPSHOT_ARRAYS = (('offsets', 'i'), ('targets', 'i'), ('edge_lines', 'H'), ('weights', 'i'))
+
+
+def write_snapshot(path: str, compiled: CompiledGraph, colors: Dict[str, str], checksum: str,
+                   coordinates: Optional[Dict[str, Tuple[float, float]]] = None):
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'checksum': checksum,
+        'stations': compiled.stations,
+        'lines': compiled.lines,
+        'colors': colors,
+        'coordinates': coordinates or {},
+        'lengths': [len(getattr(compiled, name)) for name, _ in _SNAPSHOT_ARRAYS],
+    }
+    # Write beside the target and rename, so a concurrent reader never sees half a file.
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(json.dumps(header).encode() + b'\n')
+        for name, _ in _SNAPSHOT_ARRAYS:
+            getattr(compiled, name).tofile(f)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, checksum: Optional[str] = None
+                  ) -> Optional[Tuple[CompiledGraph, Dict[str, str], Dict[str, Tuple[float, float]]]]:
+    """Load a snapshot as (compiled graph, line colours, station coordinates), or None
+    when it is from another format version, does not match `checksum`, or is truncated."""
+    try:
+        with open(path, 'rb') as f:
+            if f.readline() != SNAPSHOT_MAGIC:
+                return None
+            header = json.loads(f.readline())
+            if header.get('version') != SNAPSHOT_VERSION or (checksum is not None and header.get('checksum') != checksum):
+                return None
+            arrays: List[array] = []
+            for (_, typecode), length in zip(_SNAPSHOT_ARRAYS, header['lengths']):
+                values = array(typecode)
+                values.fromfile(f, length)
+                arrays.append(values)
+    except (EOFError, ValueError, KeyError):
+        return None
+    coordinates = {station: (lat, lon) for station, (lat, lon) in header['coordinates'].items()}
+    return CompiledGraph.from_arrays(header['stations'], header['lines'], *arrays), header['colors'], coordinates
@@ -0,0 +1,176 @@
+from collections import deque
+import heapq
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from compiled_graph import CompiledGraph, NO_LINE
+from goal_directed import Landmarks
+
+# Multi-criteria routing: instead of folding line changes into one penalised cost,
+# keep every route that no other route beats on all criteria at once.
+#
+# The search is a label-setting Dijkstra over the same (station, committed line)
+# states as CompiledGraph.search. Each label carries travel minutes plus the
+# chosen extra criteria, and labels are settled in lexicographic order of that
+# vector (minutes plus an ALT lower bound, when landmarks are given), so
+# everything already settled at a state is no slower than anything still
+# waiting. A new label is therefore dropped as soon as a settled label at its
+# state, or at the destination, is no worse on every extra criterion — or a
+# settled label on any line at its station is, even after paying one more change
+# to switch lines.
+#
+# Labels are also dropped when even the fewest changes still needed to reach the
+# destination (a breadth-first search over the line links) leaves them no better
+# than an option already found.
+#
+# Interchange counts are small integers, so each of those sets of settled labels
+# is kept as a prefix minimum: entry c is the fewest walk minutes of any label
+# with at most c changes. A dominance test is then one index and one compare.
+#
+# Travel minutes are raw edge times: the interchange penalty is exactly the
+# trade-off this mode lets the caller see instead of fixing in advance.
+
+# Extra criteria a Pareto query can trade against travel minutes.
+CRITERIA = ('interchanges', 'walk')
+
+INFINITY = 1 << 40
+
+
+class ParetoRoute(NamedTuple):
+    """One non-dominated option, `route` in find_route's (station, line) format."""
+    route: List[Tuple[str, Optional[str]]]
+    minutes: int
+    interchanges: int
+    walk_minutes: int
+
+
+def _settle(prefix: List[int], changes: int, walked: int):
+    """Record a settled (changes, walk minutes) label in a prefix-minimum list."""
+    if len(prefix) <= changes:
+        prefix.extend([prefix[-1] if prefix else INFINITY] * (changes + 1 - len(prefix)))
+    for c in range(changes, len(prefix)):
+        if walked < prefix[c]:
+            prefix[c] = walked
+
+
+def _changes_left(compiled: CompiledGraph, target: int) -> List[int]:
+    """Per committed line, the fewest line changes any route to `target` still needs
+    (INFINITY if none can get there); 0 for NO_LINE."""
+    left = [INFINITY] * compiled.line_count
+    left[NO_LINE] = 0
+    queue = deque()
+    for line in compiled.state_lines[target]:
+        if line != NO_LINE:
+            left[line] = 0
+            queue.append(line)
+    links = compiled.line_links
+    while queue:
+        line = queue.popleft()
+        for other in links[line]:
+            if left[other] == INFINITY:
+                left[other] = left[line] + 1
+                queue.append(other)
+    return left
+
+
+def pareto_search(compiled: CompiledGraph, source: int, target: int, criteria: Sequence[str] = ('interchanges',),
+                  landmarks: Optional[Landmarks] = None) -> List[ParetoRoute]:
+    """The Pareto set of routes from station id `source` to `target` over travel
+    minutes and `criteria`, fastest first. With `landmarks`, labels are settled
+    in order of minutes plus an ALT lower bound on the minutes still to go."""
+    unknown = [c for c in criteria if c not in CRITERIA]
+    if unknown or not criteria:
+        raise ValueError(f"Pareto criteria must be chosen from {', '.join(CRITERIA)}, got {list(criteria)!r}")
+    use_changes, use_walk = 'interchanges' in criteria, 'walk' in criteria
+    offsets, ends, targets, edge_lines, weights = (compiled.offsets, compiled.ends, compiled.targets,
+                                                   compiled.edge_lines, compiled.weights)
+    line_count, walk_line = compiled.line_count, compiled.walk_line
+    # From any line at a station, doing what a label committed to another line there
+    # can do costs at most one extra change: the slack for station-wide comparisons.
+    slack = 1 if use_changes else 0
+
+    # Labels live in parallel lists and refer to their parent by index; label_cost is
+    # the true (minutes, changes, walk minutes). Dominance is tested on (changes,
+    # walk minutes) with any criterion that wasn't asked for held at 0.
+    label_state: List[int] = [source * line_count + NO_LINE]
+    label_parent: List[int] = [-1]
+    label_line: List[int] = [NO_LINE]
+    label_cost: List[Tuple[int, int, int]] = [(0, 0, 0)]
+    by_state: Dict[int, List[int]] = {}
+    by_station: Dict[int, List[int]] = {}
+    found: List[int] = []
+    results: List[int] = []
+    frontier: List[Tuple[int, int, int, int]] = [(0, 0, 0, 0)]
+    heappush, heappop, state_get, station_get = heapq.heappush, heapq.heappop, by_state.get, by_station.get
+    bounds: Dict[int, int] = {}
+    changes_left = _changes_left(compiled, target) if use_changes else [0] * line_count
+
+    def bound(station: int) -> int:
+        if landmarks is None:
+            return 0
+        h = bounds.get(station)
+        if h is None:
+            h = bounds[station] = landmarks.lower_bound(station, target)
+        return h
+
+    while frontier:
+        _, changes, walked, label = heappop(frontier)
+        state = label_state[label]
+        station, committed = divmod(state, line_count)
+        if found and found[min(changes, len(found) - 1)] <= walked:
+            continue
+        settled = state_get(state)
+        if settled is not None and settled[min(changes, len(settled) - 1)] <= walked:
+            continue
+        nearby = station_get(station)
+        if nearby is not None and changes >= slack and nearby[min(changes - slack, len(nearby) - 1)] <= walked:
+            continue
+        if settled is None:
+            settled = by_state[state] = []
+        _settle(settled, changes, walked)
+        if nearby is None:
+            nearby = by_station[station] = []
+        _settle(nearby, changes, walked)
+        if station == target:
+            _settle(found, changes, walked)
+            results.append(label)
+            continue
+
+        minutes, true_changes, true_walked = label_cost[label]
+        for e in range(offsets[station], ends[station]):
+            line, weight = edge_lines[e], weights[e]
+            if line == walk_line:
+                new_committed, new_true_changes, new_true_walked = committed, true_changes, true_walked + weight
+            else:
+                new_committed, new_true_walked = line, true_walked
+                new_true_changes = true_changes + (committed != NO_LINE and line != committed)
+            new_changes, new_walked = new_true_changes * use_changes, new_true_walked * use_walk
+            left = changes_left[new_committed]
+            if left == INFINITY or (found and found[min(new_changes + left, len(found) - 1)] <= new_walked):
+                continue
+            to = targets[e]
+            neighbor = to * line_count + new_committed
+            settled = state_get(neighbor)
+            if settled is not None and settled[min(new_changes, len(settled) - 1)] <= new_walked:
+                continue
+            nearby = station_get(to)
+            if (nearby is not None and new_changes >= slack
+                    and nearby[min(new_changes - slack, len(nearby) - 1)] <= new_walked):
+                continue
+            label_state.append(neighbor)
+            label_parent.append(label)
+            label_line.append(line)
+            label_cost.append((minutes + weight, new_true_changes, new_true_walked))
+            heappush(frontier, (minutes + weight + bound(to), new_changes, new_walked, len(label_state) - 1))
+
+    options = []
+    for label in results:
+        path: List[Tuple[str, Optional[str]]] = []
+        cur = label
+        while cur >= 0:
+            parent = label_parent[cur]
+            path.append((compiled.stations[label_state[cur] // line_count],
+                         compiled.lines[label_line[cur]] if parent >= 0 else None))
+            cur = parent
+        path.reverse()
+        options.append(ParetoRoute(path, *label_cost[label]))
+    return options
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Compact routing artifact for the PWA client
+
+Builds a TubeNetwork (the built-in one, or --network data files) and writes it
+as one small binary file for the web client to precache and route from without
+rebuilding the graph in the browser: interned station and line tables, the
+adjacency in compressed-sparse-row form and, with --next-hops, a precomputed
+next-hop table per destination, so answering a query is a walk along the route
+instead of a search. Prints a size and lookup-speed report. The client does not
+load the file yet; RouteArtifact below reads it the way it is meant to.
+
+Usage: python pwa_artifact.py OUT [--network FILE]... [--next-hops] [--queries N]
+"""
+
+import argparse
+import gzip
+import random
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from alternatives import backward_tree
+from compiled_graph import CompiledGraph, NO_LINE
+from tube_network import TubeNetwork
+
+# Layout, little-endian, every section starting on a 4-byte boundary so the
+# client can view it in place as a typed array (Uint8Array / Uint16Array /
+# Uint32Array over the fetched ArrayBuffer):
+#
+#   magic    b'TUBEPWA\0'
+#   header   u32 × 10: format version, flags (bit 0: next hops present), station
+#            count, line count, edge count, state count, then the byte width (1,
+#            2 or 4) of station ids, line ids, minutes and next-hop entries
+#   table    u32 (offset, length) in bytes of each section below
+#   station_offsets u32[stations + 1] into station_names, UTF-8, sorted by name
+#   line_offsets    u32[lines + 1] into line_names; line id 0 is "" (no line yet)
+#   line_colors     u32 0xRRGGBB per line id, 0xFFFFFFFF where there is none
+#   edge_offsets    u32[stations + 1]: station u's edges are edge_offsets[u]..[u + 1]
+#   targets, edge_lines, weights   per edge: station id, line id, minutes
+#   state_offsets   u32[stations + 1] into state_lines
+#   state_lines     per station, the committed lines a journey can hold there,
+#                   ascending (NO_LINE first); a (station, line) state's index is
+#                   state_offsets[station] + its position in that list
+#   next_hops       [destination][state]: which of the state's station's edges a
+#                   fastest route to the destination takes next, counted from
+#                   edge_offsets[station]; all ones (0xFF / 0xFFFF) where there is
+#                   no next hop (at the destination, or it is unreachable)
+#
+# A route from `a` to `b` starts in state (a, NO_LINE). At each state, take edge
+# edge_offsets[station] + next_hops[b][state]; its target is the next station,
+# and the committed line becomes the edge's line unless that is Walk, which
+# keeps it. Stop on reaching `b`. Routes cost exactly what find_route's do: the
+# table is built with the same interchange penalty and Walk rules.
+#
+# Without --next-hops the file holds only the tables and adjacency, and the
+# client runs the interchange-penalised Dijkstra itself on the integer arrays.
+
+PWA_MAGIC = b'TUBEPWA\0'
+PWA_VERSION = 1
+FLAG_NEXT_HOPS = 1
+_HEADER = struct.Struct('<8s10I')
+_SECTIONS = ('station_offsets', 'station_names', 'line_offsets', 'line_names', 'line_colors', 'edge_offsets',
+             'targets', 'edge_lines', 'weights', 'state_offsets', 'state_lines', 'next_hops')
+_TABLE = struct.Struct(f'<{2 * len(_SECTIONS)}I')
+_ALIGN = 4
+_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}
+NO_COLOR = 0xFFFFFFFF
+
+# Beyond this the next-hop table stops being something to precache on a phone.
+MAX_NEXT_HOP_BYTES = 16 * 2 ** 20
+
+
+def _width(largest: int) -> int:
+    """Bytes per entry for values up to `largest`."""
+    return 1 if largest < 0xFF else 2 if largest < 0xFFFF else 4
+
+
+def _strings(names: Sequence[str]) -> Tuple[bytes, bytes]:
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = array('I', [0])
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    return offsets.tobytes(), b''.join(encoded)
+
+
+def _next_hops(compiled: CompiledGraph, state_ids: Dict[int, int], penalty: int, hop_width: int) -> bytes:
+    """One row per destination: for each state, the index within its station's open
+    edges of the next hop on a fastest route there."""
+    line_count, none = compiled.line_count, (1 << (8 * hop_width)) - 1
+    # The tree names each hop by station and line; index the edge that is (the quickest,
+    # if the same line links two stations twice) by (station, next station, line).
+    hop_index: Dict[Tuple[int, int, int], int] = {}
+    for station in range(len(compiled.stations)):
+        lo = compiled.offsets[station]
+        for e in range(lo, compiled.ends[station]):
+            key = (station, compiled.targets[e], compiled.edge_lines[e])
+            best = hop_index.get(key)
+            if best is None or compiled.weights[e] < compiled.weights[lo + best]:
+                hop_index[key] = e - lo
+
+    table = array(_TYPECODES[hop_width])
+    for destination in range(len(compiled.stations)):
+        row = array(_TYPECODES[hop_width], [none]) * len(state_ids)
+        _, succ = backward_tree(compiled, destination, penalty)
+        for state, (next_state, line) in succ.items():
+            row[state_ids[state]] = hop_index[state // line_count, next_state // line_count, line]
+        table.extend(row)
+    return table.tobytes()
+
+
+def build_artifact(network: TubeNetwork, next_hops: bool = False) -> bytes:
+    """The artifact for `network` as built, with next-hop tables if asked for. Live
+    disruptions are left out: the client has no way to lift them again."""
+    compiled = network.compiled
+    if compiled._base is not None:
+        # Disrupted at some point: start over from the edges as compiled, as write_mapped does.
+        compiled = CompiledGraph.from_arrays(compiled.stations, compiled.lines, compiled.offsets, *compiled._base)
+    stations, lines, line_count = compiled.stations, compiled.lines, compiled.line_count
+    if sys.byteorder != 'little':
+        raise ValueError("PWA artifacts are written little-endian; this platform is not")
+
+    edge_offsets, targets, edge_lines, weights = array('I', [0]), [], [], []
+    for u in range(len(stations)):
+        lo, hi = compiled.offsets[u], compiled.ends[u]
+        targets.extend(compiled.targets[lo:hi])
+        edge_lines.extend(compiled.edge_lines[lo:hi])
+        weights.extend(compiled.weights[lo:hi])
+        edge_offsets.append(len(targets))
+    state_offsets, state_lines, state_ids = array('I', [0]), [], {}
+    for u, held in enumerate(compiled.state_lines):
+        for line in sorted(held):
+            state_ids[u * line_count + line] = len(state_lines)
+            state_lines.append(line)
+        state_offsets.append(len(state_lines))
+
+    station_width, line_width = _width(len(stations)), _width(line_count)
+    weight_width = _width(max(weights, default=0))
+    degree = max((edge_offsets[u + 1] - edge_offsets[u] for u in range(len(stations))), default=0)
+    hop_width = _width(degree)
+    hops = b''
+    if next_hops:
+        size = len(stations) * len(state_ids) * hop_width
+        if size > MAX_NEXT_HOP_BYTES:
+            raise ValueError(f"next-hop tables would take {size / 2 ** 20:.1f} MiB "
+                             f"(limit {MAX_NEXT_HOP_BYTES / 2 ** 20:.0f} MiB); build without them")
+        hops = _next_hops(compiled, state_ids, network.INTERCHANGE_PENALTY, hop_width)
+
+    colors = array('I', [int(network.line_colors[line][1:], 16) if line in network.line_colors else NO_COLOR
+                         for line in lines])
+    sections = [*_strings(stations), *_strings(lines), colors.tobytes(), edge_offsets.tobytes(),
+                array(_TYPECODES[station_width], targets).tobytes(), array(_TYPECODES[line_width], edge_lines).tobytes(),
+                array(_TYPECODES[weight_width], weights).tobytes(), state_offsets.tobytes(),
+                array(_TYPECODES[line_width], state_lines).tobytes(), hops]
+
+    position = _HEADER.size + _TABLE.size
+    table: List[int] = []
+    for data in sections:
+        position += -position % _ALIGN
+        table += [position, len(data)]
+        position += len(data)
+    header = _HEADER.pack(PWA_MAGIC, PWA_VERSION, FLAG_NEXT_HOPS if next_hops else 0, len(stations), line_count,
+                          len(targets), len(state_lines), station_width, line_width, weight_width, hop_width)
+    out = bytearray(header + _TABLE.pack(*table))
+    for offset, data in zip(table[::2], sections):
+        out += b'\0' * (offset - len(out))
+        out += data
+    return bytes(out)
+
+
+class RouteArtifact:
+    """Reads an artifact the way the web client does, to check and time it."""
+
+    def __init__(self, data: bytes):
+        view = memoryview(data)
+        if len(view) < _HEADER.size + _TABLE.size or bytes(view[:8]) != PWA_MAGIC:
+            raise ValueError("not a PWA routing artifact")
+        (_, version, flags, station_count, self.line_count, _, _,
+         station_width, line_width, weight_width, hop_width) = _HEADER.unpack_from(view)
+        if version != PWA_VERSION:
+            raise ValueError(f"PWA artifact format {version}, expected {PWA_VERSION}")
+        table = _TABLE.unpack_from(view, _HEADER.size)
+        parts = {name: view[offset:offset + length]
+                 for name, offset, length in zip(_SECTIONS, table[::2], table[1::2])}
+        widths = {'targets': station_width, 'edge_lines': line_width, 'weights': weight_width,
+                  'state_lines': line_width, 'next_hops': hop_width}
+        arrays = {name: part.cast(_TYPECODES[widths.get(name, 4)]) for name, part in parts.items()
+                  if not name.endswith('_names')}
+
+        def strings(offsets, blob) -> List[str]:
+            return [bytes(blob[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in range(len(offsets) - 1)]
+
+        self.stations = strings(arrays['station_offsets'], parts['station_names'])
+        self.lines = strings(arrays['line_offsets'], parts['line_names'])
+        self.station_ids = {name: i for i, name in enumerate(self.stations)}
+        self.walk_line = self.lines.index('Walk') if 'Walk' in self.lines else -1
+        self.edge_offsets, self.targets = arrays['edge_offsets'], arrays['targets']
+        self.edge_lines, self.weights = arrays['edge_lines'], arrays['weights']
+        self.state_offsets, self.state_lines = arrays['state_offsets'], arrays['state_lines']
+        self.next_hops = arrays['next_hops'] if flags & FLAG_NEXT_HOPS else None
+        self.state_count = len(self.state_lines)
+        self._none = (1 << (8 * hop_width)) - 1
+        if len(self.stations) != station_count:
+            raise ValueError("PWA artifact station table does not match its header")
+        # Without next hops, routes are searched for on the packed arrays as they are.
+        self._compiled = None if self.next_hops is not None else CompiledGraph.from_arrays(
+            self.stations, self.lines, self.edge_offsets, self.targets, self.edge_lines, self.weights)
+
+    def route(self, start: str, end: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+        """find_route's answer for two station names, from the next-hop tables when
+        present and otherwise by searching the packed adjacency."""
+        source, target = self.station_ids.get(start), self.station_ids.get(end)
+        if source is None or target is None:
+            return None
+        if self._compiled is not None:
+            compiled = self._compiled
+            tree = compiled.search(source, target, TubeNetwork.INTERCHANGE_PENALTY)
+            end_state = tree.reached.get(target)
+            return compiled.unwind(tree.prev, end_state) if end_state is not None else None
+
+        row = target * self.state_count
+        station, committed = source, NO_LINE
+        path: List[Tuple[str, Optional[str]]] = [(start, None)]
+        while station != target:
+            lo = self.state_offsets[station]
+            state = lo
+            while self.state_lines[state] != committed:
+                state += 1
+            hop = self.next_hops[row + state]
+            if hop == self._none:
+                return None
+            edge = self.edge_offsets[station] + hop
+            station, line = self.targets[edge], self.edge_lines[edge]
+            if line != self.walk_line:
+                committed = line
+            path.append((self.stations[station], self.lines[line]))
+        return path
+
+
+def penalised_minutes(network: TubeNetwork, route: List[Tuple[str, Optional[str]]]) -> int:
+    """The cost find_route minimises: travel minutes plus the interchange penalty per line change."""
+    committed, changes = None, 0
+    for _, line in route[1:]:
+        if line != 'Walk':
+            changes += committed is not None and line != committed
+            committed = line
+    return network.get_route_minutes(route) + changes * network.INTERCHANGE_PENALTY
+
+
+def report(network: TubeNetwork, data: bytes, queries: int, seed: int = 42):
+    """Print section sizes, the compressed size and lookup speed against find_route."""
+    artifact = RouteArtifact(data)
+    table = _TABLE.unpack_from(data, _HEADER.size)
+    print(f"{len(artifact.stations)} stations, {len(artifact.lines) - 1} lines, {len(artifact.targets)} edges, "
+          f"{artifact.state_count} states")
+    for name, length in zip(_SECTIONS, table[1::2]):
+        if length:
+            print(f"  {name:<16} {length:>10,} bytes")
+    print(f"  {'total':<16} {len(data):>10,} bytes, {len(gzip.compress(data, 9)):,} gzipped")
+
+    rnd = random.Random(seed)
+    pairs = [tuple(rnd.sample(artifact.stations, 2)) for _ in range(queries)]
+    network.route_cache.resize(0)
+    t0 = time.perf_counter()
+    expected = [network.find_route(a, b) for a, b in pairs]
+    searched = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    answers = [artifact.route(a, b) for a, b in pairs]
+    looked_up = time.perf_counter() - t0
+    mismatches = sum((want is None) != (got is None)
+                     or (want is not None and penalised_minutes(network, want) != penalised_minutes(network, got))
+                     for want, got in zip(expected, answers))
+    mode = 'next-hop walk' if artifact.next_hops is not None else 'search on packed arrays'
+    print(f"{queries} lookups ({mode}): {looked_up / queries * 1e6:.1f} µs each, "
+          f"find_route {searched / queries * 1e6:.1f} µs each, {searched / looked_up:.1f}x; "
+          f"{'all routes equally fast' if not mismatches else f'{mismatches} MISMATCHES'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('out', help='artifact file to write (e.g. public/routes.bin)')
+    parser.add_argument('--network', action='append', metavar='FILE',
+                        help='JSON/CSV network file instead of the built-in network (repeat for several)')
+    parser.add_argument('--next-hops', action='store_true', help='include precomputed next-hop tables')
+    parser.add_argument('--queries', type=int, default=2000, help='random lookups for the speed report (0: none)')
+    args = parser.parse_args()
+
+    try:
+        if args.network:
+            from network_loader import FileTubeNetwork
+            network: TubeNetwork = FileTubeNetwork(*args.network)
+        else:
+            network = TubeNetwork()
+        t0 = time.perf_counter()
+        data = build_artifact(network, args.next_hops)
+        built = time.perf_counter() - t0
+        with open(args.out, 'wb') as f:
+            f.write(data)
+    except (OSError, ValueError) as e:
+        print(f"pwa_artifact: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(f"Wrote {args.out} in {built * 1000:.0f} ms")
+    if args.queries > 0:
+        report(network, data, args.queries)
+
+
+if __name__ == "__main__":
+    main()
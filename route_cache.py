@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+# Bounded least-recently-used cache for route queries.
+# Entries belong to one graph version; as soon as the network reports a different
+# version the whole cache is dropped, so a route computed before a graph change
+# can never be served after it.
+
+MISSING = object()
+
+
+class RouteCache:
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.graph_version = None
+        self._entries: 'OrderedDict[Hashable, object]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _check_version(self, graph_version: int):
+        if graph_version != self.graph_version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self.graph_version = graph_version
+
+    def get(self, key: Hashable, graph_version: int):
+        """Return the cached value for `key`, or MISSING."""
+        self._check_version(graph_version)
+        value = self._entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value, graph_version: int):
+        if not self.enabled:
+            return
+        self._check_version(graph_version)
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, capacity: int):
+        """Change the capacity; 0 turns the cache off and empties it."""
+        self.capacity = capacity
+        while len(self._entries) > max(capacity, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def discard_where(self, predicate: Callable[[Hashable, object], bool]) -> int:
+        """Drop the entries for which predicate(key, value) is true; returns how many."""
+        stale = [key for key, value in self._entries.items() if predicate(key, value)]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'capacity': self.capacity,
+        }
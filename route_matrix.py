@@ -0,0 +1,231 @@
+from array import array
+import heapq
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from compiled_graph import NO_LINE
+
+# All-pairs journey table for a static TubeNetwork.
+# Runs the interchange-penalised search once from every station and keeps only
+# compact integer arrays, so a route query becomes a table lookup plus a walk
+# back along the stored predecessors — no graph search at query time.
+#
+# Disruptions (closures, re-timings) don't have to rebuild the table: `repair`
+# updates each source's shortest-path tree in place, re-settling only the
+# states whose best path the change can affect.
+
+
+class RouteMatrix:
+    def __init__(self, network):
+        t0 = perf_counter()
+        compiled = network.compiled
+        self.graph_version = network.graph_version
+        self.stations: List[str] = compiled.stations
+        self.station_ids: Dict[str, int] = compiled.station_ids
+        self.lines: List[str] = compiled.lines
+
+        # Search states are packed ints over every (station, line) pair; most never
+        # occur, so renumber the reachable ones densely to keep the tables small.
+        state_ids = self._enumerate_states(compiled)
+        self.state_ids = state_ids
+        self.state_count = len(state_ids)
+        self.state_station = array('i', [0]) * self.state_count
+        # The committed line of each state and (committed line, state) per station, for repair.
+        self.state_line = array('H', [0]) * self.state_count
+        self.station_states: List[List[Tuple[int, int]]] = [[] for _ in self.stations]
+        for packed, state in state_ids.items():
+            station, committed = divmod(packed, compiled.line_count)
+            self.state_station[state], self.state_line[state] = station, committed
+            self.station_states[station].append((committed, state))
+
+        n, s = len(self.stations), self.state_count
+        # distance / end_state are indexed [source * n + target]; pred_state / pred_line
+        # are indexed [source * s + state] and describe each source's shortest-path tree.
+        self.distance = array('i', [-1]) * (n * n)
+        self.end_state = array('i', [-1]) * (n * n)
+        self.pred_state = array('i', [-1]) * (n * s)
+        self.pred_line = array('H', [0]) * (n * s)
+        self.state_distance = array('i', [-1]) * (n * s)
+
+        for source in range(n):
+            dist, prev, reached = compiled.search(source, penalty=network.INTERCHANGE_PENALTY)[:3]
+            row, base = source * n, source * s
+            for target, packed in reached.items():
+                self.distance[row + target] = dist[packed]
+                self.end_state[row + target] = state_ids[packed]
+            for packed, entry in prev.items():
+                state = state_ids[packed]
+                self.state_distance[base + state] = dist[packed]
+                if entry is not None:
+                    self.pred_state[base + state] = state_ids[entry[0]]
+                    self.pred_line[base + state] = entry[1]
+
+        self.build_seconds = perf_counter() - t0
+
+    @staticmethod
+    def _enumerate_states(compiled) -> Dict[int, int]:
+        """Dense ids for every packed state some search can reach."""
+        state_ids: Dict[int, int] = {}
+        for station, lines in enumerate(compiled.state_lines):
+            for line in sorted(lines):
+                state_ids[station * compiled.line_count + line] = len(state_ids)
+        return state_ids
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the lookup arrays (excluding the small station/line name tables)."""
+        return sum(len(a) * a.itemsize for a in (self.state_station, self.state_line, self.distance, self.end_state,
+                                                  self.pred_state, self.pred_line, self.state_distance))
+
+    def distance_between(self, start: str, end: str) -> Optional[int]:
+        """Penalised journey minutes from `start` to `end`, or None if unreachable."""
+        minutes = self.distance[self.station_ids[start] * len(self.stations) + self.station_ids[end]]
+        return minutes if minutes >= 0 else None
+
+    def route(self, start: str, end: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+        """Same (station, line) path `TubeNetwork.find_route` returns, read from the table."""
+        source_id = self.station_ids[start]
+        state = self.end_state[source_id * len(self.stations) + self.station_ids[end]]
+        if state < 0:
+            return None
+
+        base = source_id * self.state_count
+        path: List[Tuple[str, Optional[str]]] = []
+        while state >= 0:
+            pred = self.pred_state[base + state]
+            line = self.lines[self.pred_line[base + state]] if pred >= 0 else None
+            path.append((self.stations[self.state_station[state]], line))
+            state = pred
+        path.reverse()
+        return path
+
+    def repair(self, compiled, changes: Iterable[Tuple[int, int, int, Optional[int], Optional[int]]],
+               penalty: int) -> Tuple[int, int, Set[Tuple[int, int]]]:
+        """Bring every source's tree up to date after edge changes already applied to
+        `compiled`. Each change is (from station, to station, line id, old weight,
+        new weight), with None for a closed edge.
+
+        Worsened edges (closed or slower) only hurt the states below them in a
+        tree: those are detached, then re-settled by a Dijkstra seeded from their
+        best remaining in-edges. Improved edges (reopened or faster) seed a
+        Dijkstra from the states they now reach more cheaply, which spreads only
+        as far as distances actually drop. Returns (trees changed, states
+        re-settled, (source, target) pairs whose distance changed).
+        """
+        changes = list(changes)
+        worse = [(u, v, line) for u, v, line, old, new in changes if new is None or (old is not None and new > old)]
+        better = [(u, v, line, new) for u, v, line, old, new in changes if new is not None and (old is None or new < old)]
+        n, s = len(self.stations), self.state_count
+        trees = states = 0
+        changed_pairs: Set[Tuple[int, int]] = set()
+        for source in range(n):
+            touched = self._repair_tree(compiled, source, worse, better, penalty)
+            if not touched:
+                continue
+            trees += 1
+            states += len(touched)
+            base, row = source * s, source * n
+            for station in {self.state_station[x] for x in touched}:
+                best, best_state = -1, -1
+                for _, x in self.station_states[station]:
+                    d = self.state_distance[base + x]
+                    if d >= 0 and (best < 0 or d < best or (d == best and x == self.end_state[row + station])):
+                        best, best_state = d, x
+                if best != self.distance[row + station]:
+                    changed_pairs.add((source, station))
+                self.distance[row + station], self.end_state[row + station] = best, best_state
+        return trees, states, changed_pairs
+
+    def _transition(self, compiled, committed: int, line: int, weight: int, penalty: int) -> Tuple[int, int]:
+        """(new committed line, cost) of taking an edge, as CompiledGraph.search prices it."""
+        if line == compiled.walk_line:
+            return committed, weight
+        if committed != NO_LINE and line != committed:
+            return line, weight + penalty
+        return line, weight
+
+    def _repair_tree(self, compiled, source: int, worse, better, penalty: int) -> Set[int]:
+        base, s = source * self.state_count, self.state_count
+        dist, pred_state, pred_line = self.state_distance, self.pred_state, self.pred_line
+        offsets, ends, targets, edge_lines, weights = (compiled.offsets, compiled.ends, compiled.targets,
+                                                       compiled.edge_lines, compiled.weights)
+        state_ids, line_count, walk_line = self.state_ids, compiled.line_count, compiled.walk_line
+        touched: Set[int] = set()
+        frontier: List[Tuple[int, int, int, int]] = []
+
+        def settle_from(state: int, d: int, allowed: Optional[Set[int]]):
+            station, committed = self.state_station[state], self.state_line[state]
+            for e in range(offsets[station], ends[station]):
+                new_committed, cost = self._transition(compiled, committed, edge_lines[e], weights[e], penalty)
+                y = state_ids[targets[e] * line_count + new_committed]
+                if allowed is not None and y not in allowed:
+                    continue
+                if dist[base + y] < 0 or d + cost < dist[base + y]:
+                    heapq.heappush(frontier, (d + cost, y, state, edge_lines[e]))
+
+        # Edges that got worse: detach every state whose tree path used one, then
+        # re-settle just those states from the rest of the (still optimal) tree.
+        roots = [x for u, v, line in worse for _, x in self.station_states[v]
+                 if pred_state[base + x] >= 0 and self.state_station[pred_state[base + x]] == u
+                 and pred_line[base + x] == line]
+        if roots:
+            children: Dict[int, List[int]] = {}
+            for x in range(s):
+                p = pred_state[base + x]
+                if p >= 0:
+                    children.setdefault(p, []).append(x)
+            detached: Set[int] = set()
+            stack = roots
+            while stack:
+                x = stack.pop()
+                if x not in detached:
+                    detached.add(x)
+                    stack.extend(children.get(x, ()))
+            for x in detached:
+                dist[base + x], pred_state[base + x] = -1, -1
+            touched |= detached
+
+            for x in detached:
+                station, committed = self.state_station[x], self.state_line[x]
+                # Edges are stored both ways with the same line and time, so the edges into
+                # a station are its own open edges read backwards.
+                for e in range(offsets[station], ends[station]):
+                    u, line, weight = targets[e], edge_lines[e], weights[e]
+                    if line != walk_line and line != committed:
+                        continue
+                    for c, p in self.station_states[u]:
+                        if dist[base + p] < 0:
+                            continue
+                        new_committed, cost = self._transition(compiled, c, line, weight, penalty)
+                        if new_committed != committed:
+                            continue
+                        heapq.heappush(frontier, (dist[base + p] + cost, x, p, line))
+            while frontier:
+                d, x, p, line = heapq.heappop(frontier)
+                if dist[base + x] >= 0:
+                    continue
+                dist[base + x], pred_state[base + x], pred_line[base + x] = d, p, line
+                settle_from(x, d, detached)
+
+        # Edges that got better: push the cheaper arrivals they create and let the
+        # improvement spread for as long as it keeps lowering distances.
+        for u, v, line, weight in better:
+            for c, p in self.station_states[u]:
+                if dist[base + p] < 0:
+                    continue
+                new_committed, cost = self._transition(compiled, c, line, weight, penalty)
+                y = state_ids[v * line_count + new_committed]
+                if dist[base + y] < 0 or dist[base + p] + cost < dist[base + y]:
+                    heapq.heappush(frontier, (dist[base + p] + cost, y, p, line))
+        while frontier:
+            d, y, p, line = heapq.heappop(frontier)
+            if 0 <= dist[base + y] <= d:
+                continue
+            dist[base + y], pred_state[base + y], pred_line[base + y] = d, p, line
+            touched.add(y)
+            settle_from(y, d, None)
+        return touched
+
+    def report(self) -> str:
+        return (f"Route matrix: {len(self.stations)} stations, {self.state_count} states, "
+                f"built in {self.build_seconds * 1000:.1f} ms, {self.nbytes / 1024:.1f} KiB")
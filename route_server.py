@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Headless JSON route service for TubeNetwork
+
+A small HTTP/1.1 server on asyncio (standard library only, no tkinter) so other
+systems can ask for routes without embedding the desktop app:
+
+  GET /route?from=Brixton&to=Bank   route, legs and step lines for one journey
+      [&avoid_lines=Central,Jubilee][&avoid_stations=Bank][&no_walking=1]
+  GET /stations[?q=ki&limit=20]     all stations, or typeahead matches for q,
+                                    each as {name, lines}
+  GET /stats                        request counts and p50/p99 latency
+  GET /health                       liveness check
+
+One TubeNetwork is built at startup and only ever read. Searches run off the
+event loop, in a process pool (--workers N, each process holds its own copy of
+the network, or with --mapped all of them share one memory-mapped file) or on
+a single background thread (--workers 0). At most
+--max-concurrency searches run at once; beyond --max-pending outstanding
+requests the server answers 503 with Retry-After instead of queueing without
+bound.
+
+Usage: python route_server.py [--host 127.0.0.1] [--port 8080] [--workers N]
+                              [--max-concurrency C] [--max-pending P] [--mapped PATH]
+"""
+
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import time
+from typing import Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from compiled_graph import RouteConstraints
+from tube_network import TubeNetwork
+
+MAX_HEADER_BYTES = 16 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class LatencyStats:
+    """Request latencies over a sliding window of the most recent requests."""
+
+    def __init__(self, window: int = 10000):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    def report(self) -> Dict[str, Optional[float]]:
+        def ms(value):
+            return round(value * 1000, 3) if value is not None else None
+        return {'p50': ms(self.percentile(50)), 'p99': ms(self.percentile(99)),
+                'max': ms(max(self.samples) if self.samples else None)}
+
+
+# Process-pool state: each worker process keeps the network it was initialised with.
+_worker_network: Optional[TubeNetwork] = None
+
+
+def _init_worker(network: TubeNetwork):
+    global _worker_network
+    _worker_network = network
+
+
+def _route_job(start: str, end: str, constraints: RouteConstraints) -> Optional[Dict]:
+    return route_payload(_worker_network, start, end, constraints)
+
+
+def route_payload(network: TubeNetwork, start: str, end: str,
+                  constraints: RouteConstraints = RouteConstraints()) -> Optional[Dict]:
+    """The JSON body for one journey, or None when the stations aren't connected."""
+    route = network.find_route(start, end, *constraints)
+    if route is None:
+        return None
+    return {
+        'from': start,
+        'to': end,
+        'route': [{'station': station, 'line': line} for station, line in route],
+        'legs': [{'line': line, 'from': a, 'to': b, 'stops': stops}
+                 for line, a, b, stops in network.get_route_legs(route)],
+        'details': network.get_route_details(route),
+    }
+
+
+class RouteServer:
+    def __init__(self, network: TubeNetwork, workers: int = 0, max_concurrency: int = 8, max_pending: int = 256):
+        self.network = network
+        # Build the shared read-only structures once, before any worker copies the network.
+        network.compiled
+        network.station_index
+        if workers > 0:
+            self.executor: Executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(network,))
+            self._job = _route_job
+            # Start the worker processes now, before any socket exists: children forked
+            # later would inherit open client connections and keep them from closing.
+            self.executor.submit(len, ()).result()
+        else:
+            # One thread: the network's route cache is not safe to update from several at once.
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='route')
+            self._job = lambda start, end, constraints: route_payload(network, start, end, constraints)
+        self.max_pending = max_pending
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.rejected = 0
+        self.latency = LatencyStats()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> Tuple[str, int]:
+        # Created here so it belongs to the running loop (Python 3.9 binds it on creation).
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ValueError as e:
+                    # Framing is lost after a malformed head, so answer and hang up.
+                    self._write_response(writer, 400, {'error': str(e)}, {}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers = request
+                started = time.perf_counter()
+                status, body, extra = await self._dispatch(method, target)
+                if status != 503:
+                    self.latency.record(time.perf_counter() - started)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, body, extra, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3:
+            raise ValueError('malformed request line')
+        headers: Dict[str, str] = {}
+        size = len(line)
+        while True:
+            line = await reader.readline()
+            size += len(line)
+            if size > MAX_HEADER_BYTES:
+                raise ValueError('headers too large')
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return parts[0], parts[1], headers
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, body: Dict, extra: Dict[str, str],
+                        keep_alive: bool):
+        payload = json.dumps(body).encode()
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                'Content-Type: application/json',
+                f'Content-Length: {len(payload)}',
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f'{name}: {value}' for name, value in extra.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+
+    async def _dispatch(self, method: str, target: str) -> Tuple[int, Dict, Dict[str, str]]:
+        # A request that fails still gets an answer; only a broken connection goes unanswered.
+        try:
+            return await self._endpoint(method, target)
+        except Exception as e:
+            return 500, {'error': f'request failed: {e}'}, {}
+
+    async def _endpoint(self, method: str, target: str) -> Tuple[int, Dict, Dict[str, str]]:
+        if method != 'GET':
+            return 405, {'error': f'{method} not supported'}, {'Allow': 'GET'}
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == '/route':
+            return await self._route(params)
+        if url.path == '/stations':
+            return self._stations(params)
+        if url.path == '/stats':
+            return 200, self.stats(), {}
+        if url.path == '/health':
+            return 200, {'status': 'ok', 'stations': len(self.network.station_index)}, {}
+        return 404, {'error': f'no such endpoint {url.path}'}, {}
+
+    def _stations(self, params: Dict[str, str]) -> Tuple[int, Dict, Dict[str, str]]:
+        query = params.get('q', '')
+        try:
+            limit = int(params.get('limit', 20))
+        except ValueError:
+            return 400, {'error': 'limit must be an integer'}, {}
+        if limit < 1:
+            return 400, {'error': 'limit must be at least 1'}, {}
+        stations = self.network.search_stations(query, limit) if query else self.network.get_all_stations()
+        return 200, {'stations': [{'name': s, 'lines': self.network.get_station_lines(s)} for s in stations]}, {}
+
+    async def _route(self, params: Dict[str, str]) -> Tuple[int, Dict, Dict[str, str]]:
+        start, end = params.get('from', '').strip(), params.get('to', '').strip()
+        if not start or not end:
+            return 400, {'error': "both 'from' and 'to' are required"}, {}
+        for station in (start, end):
+            if not self.network.has_station(station):
+                return 404, {'error': f"station '{station}' not found"}, {}
+
+        def names(key: str) -> frozenset:
+            return frozenset(name.strip() for name in params.get(key, '').split(',') if name.strip())
+
+        constraints = RouteConstraints(names('avoid_lines'), names('avoid_stations'),
+                                       params.get('no_walking', '') in ('1', 'true', 'yes'))
+
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return 503, {'error': 'server busy, retry shortly'}, {'Retry-After': '1'}
+        self.pending += 1
+        try:
+            async with self._slots:
+                loop = asyncio.get_running_loop()
+                payload = await loop.run_in_executor(self.executor, self._job, start, end, constraints)
+        except ValueError as e:
+            # An unknown line or station among the exclusions.
+            return 400, {'error': str(e)}, {}
+        except Exception as e:
+            return 500, {'error': f'route search failed: {e}'}, {}
+        finally:
+            self.pending -= 1
+        if payload is None:
+            return 404, {'error': f"no route from '{start}' to '{end}'"}, {}
+        return 200, payload, {}
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.latency.count,
+            'rejected': self.rejected,
+            'pending': self.pending,
+            'latency_ms': self.latency.report(),
+        }
+
+
+async def serve(network: TubeNetwork, host: str, port: int, workers: int, max_concurrency: int, max_pending: int):
+    server = RouteServer(network, workers, max_concurrency, max_pending)
+    bound_host, bound_port = await server.start(host, port)
+    print(f"Serving {len(network.station_index)} stations on http://{bound_host}:{bound_port}/")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=0, help='route search processes (0: one background thread)')
+    parser.add_argument('--max-concurrency', type=int, default=8, help='searches allowed to run at once')
+    parser.add_argument('--max-pending', type=int, default=256, help='outstanding route requests before 503')
+    parser.add_argument('--engine', default='dijkstra', choices=TubeNetwork.ENGINES,
+                        help="search engine; all but 'dijkstra' may pick a different route among equally fast ones")
+    parser.add_argument('--mapped', metavar='PATH', help='serve a network file written by mapped_network.py')
+    args = parser.parse_args()
+
+    if args.mapped:
+        from mapped_network import MappedTubeNetwork
+        network: TubeNetwork = MappedTubeNetwork(args.mapped, engine=args.engine)
+    else:
+        network = TubeNetwork(engine=args.engine)
+    try:
+        asyncio.run(serve(network, args.host, args.port, args.workers, args.max_concurrency, args.max_pending))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from bisect import bisect_left
+from typing import Dict, FrozenSet, List, Tuple
+
+# Read-only lookups over a network's stations, built once per graph version:
+# the sorted station list, membership, the lines serving each station, and a
+# typeahead index for the From/To boxes.
+#
+# Typeahead works on casefolded names and on each word within a name, kept as one
+# sorted list of (key, station) pairs: every key starting with a prefix sits in a
+# single contiguous run, found with a binary search, so a lookup costs
+# O(log n + matches) however large the network is. Only when nothing matches by
+# prefix do we fall back to fuzzy matching, to forgive typos.
+#
+# Apostrophes are dropped rather than spaced out, so "kings" and "king's" both
+# find King's Cross; other punctuation separates words.
+
+_APOSTROPHES = str.maketrans('', '', "'\u2019")
+
+
+def _normalise(text: str) -> str:
+    return ''.join(ch if ch.isalnum() else ' ' for ch in text.casefold().translate(_APOSTROPHES)).strip()
+
+
+class StationIndex:
+    def __init__(self, graph: Dict[str, List[Tuple[str, str, int]]], graph_version: int = 0):
+        self.graph_version = graph_version
+        self.stations: Tuple[str, ...] = tuple(sorted(graph.keys()))
+        self.station_set: FrozenSet[str] = frozenset(self.stations)
+        self.station_lines: Dict[str, Tuple[str, ...]] = {
+            station: tuple(sorted({line for _, line, _ in graph[station] if line != 'Walk'}))
+            for station in self.stations
+        }
+
+        # Rank 0 keys are whole names, rank 1 keys start at a later word, so "cross"
+        # finds "King's Cross St. Pancras" and "Charing Cross" as well.
+        keys: List[Tuple[str, int, str]] = []
+        for station in self.stations:
+            name = _normalise(station)
+            keys.append((name, 0, station))
+            words = name.split()
+            for i in range(1, len(words)):
+                keys.append((' '.join(words[i:]), 1, station))
+        keys.sort()
+        self._keys: List[str] = [key for key, _, _ in keys]
+        self._key_rank: List[int] = [rank for _, rank, _ in keys]
+        self._key_stations: List[str] = [station for _, _, station in keys]
+        self._normalised: Dict[str, str] = {_normalise(s): s for s in self.stations}
+
+    def __contains__(self, station: str) -> bool:
+        return station in self.station_set
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+    def lines_at(self, station: str) -> Tuple[str, ...]:
+        return self.station_lines.get(station, ())
+
+    def prefix_matches(self, query: str, limit: int = 20) -> List[str]:
+        """Stations whose name, or any word-suffix of it, starts with `query`
+        (case and punctuation ignored); whole-name matches first, each group A-Z."""
+        if limit <= 0:
+            return []
+        prefix = _normalise(query)
+        if not prefix:
+            return list(self.stations[:limit])
+        keys = self._keys
+        whole: List[str] = []
+        partial: List[str] = []
+        seen = set()
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            station = self._key_stations[i]
+            if station not in seen:
+                seen.add(station)
+                (whole if self._key_rank[i] == 0 else partial).append(station)
+            i += 1
+        whole.sort()
+        partial.sort()
+        return (whole + partial)[:limit]
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """Typeahead candidates for `query`: prefix matches, or the closest names
+        when there are none."""
+        if limit <= 0:
+            return []
+        matches = self.prefix_matches(query, limit)
+        if matches or not query.strip():
+            return matches
+        import difflib  # only typos get this far; keeps it off the import path
+        close = difflib.get_close_matches(_normalise(query), self._normalised.keys(), n=limit, cutoff=0.75)
+        return [self._normalised[name] for name in close]
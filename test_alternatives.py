@@ -0,0 +1,57 @@
+from itertools import permutations
+import random
+
+import pytest
+
+from benchmark import SyntheticTubeNetwork
+from test_engines import is_connected_route, penalised_cost
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module', params=['built-in', 'synthetic'])
+def network_pairs(request):
+    network = TubeNetwork() if request.param == 'built-in' else SyntheticTubeNetwork(300, seed=11)
+    pairs = random.Random(5).sample(list(permutations(network.get_all_stations(), 2)), 60)
+    return network, pairs
+
+
+def test_first_alternative_is_find_routes_route(network_pairs):
+    network, pairs = network_pairs
+    for start, end in pairs:
+        alternatives = network.find_alternative_routes(start, end, k=3)
+        if network.find_route(start, end) is None:
+            assert alternatives == []
+            continue
+        assert alternatives[0].route == network.find_route(start, end)
+        assert alternatives[0].minutes == penalised_cost(network, alternatives[0].route)
+
+
+def test_alternatives_are_distinct_loopless_and_cheapest_first(network_pairs):
+    network, pairs = network_pairs
+    for start, end in pairs:
+        alternatives = network.find_alternative_routes(start, end, k=4)
+        costs = [a.minutes for a in alternatives]
+        assert costs == sorted(costs)
+        assert len({tuple(a.route) for a in alternatives}) == len(alternatives)
+        for alternative in alternatives:
+            stations = [station for station, _ in alternative.route]
+            assert len(set(stations)) == len(stations)
+            assert is_connected_route(network, alternative.route, start, end)
+            assert alternative.minutes == penalised_cost(network, alternative.route)
+
+
+def test_trivial_and_invalid_queries():
+    network = TubeNetwork()
+    assert network.find_alternative_routes('Bank', 'Bank') == [(([('Bank', None)]), 0)]
+    assert network.find_alternative_routes('Bank', 'Nowhere') == []
+    with pytest.raises(ValueError):
+        network.find_alternative_routes('Bank', 'Brixton', k=0)
+
+
+def test_alternatives_follow_disruptions():
+    network = TubeNetwork()
+    usual = network.find_alternative_routes('Brixton', 'Oxford Circus', k=2)
+    network.suspend_line('Victoria')
+    for alternative in network.find_alternative_routes('Brixton', 'Oxford Circus', k=2):
+        assert all(line != 'Victoria' for _, line in alternative.route)
+        assert alternative.minutes >= usual[0].minutes
@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from batch_route import read_chunks, route_chunk
+from tube_network import TubeNetwork
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_cli(*args, stdin=''):
+    return subprocess.run([sys.executable, os.path.join(HERE, 'batch_route.py'), *args], input=stdin,
+                          capture_output=True, text=True, cwd=HERE, timeout=120)
+
+
+@pytest.fixture(scope='module')
+def network():
+    return TubeNetwork()
+
+
+def test_route_chunk_answers_in_input_order(network):
+    lines = ['{"id": 1, "from": "Brixton", "to": "Bank"}\n', '["Bank", "Brixton"]\n',
+             '{"from": "Brixton", "to": "Oval"}\n']
+    text, routed, failed = route_chunk(network, list(enumerate(lines, 1)))
+    results = [json.loads(line) for line in text.splitlines()]
+    assert (routed, failed) == (3, 0)
+    assert [(r.get('id'), r['from'], r['to']) for r in results] == [
+        (1, 'Brixton', 'Bank'), (None, 'Bank', 'Brixton'), (None, 'Brixton', 'Oval')]
+    route = network.find_route('Brixton', 'Bank')
+    assert results[0]['minutes'] == network.get_route_minutes(route)
+    assert [leg['line'] for leg in results[0]['legs']] == [leg[0] for leg in network.get_route_legs(route)]
+
+
+@pytest.mark.parametrize('line, error', [
+    ('{"from": "Brixton"', 'invalid JSON'),
+    ('{"from": "Brixton"}', 'expected'),
+    ('["Brixton", "Bank", "Oval"]', 'expected'),
+    ('{"id": 9, "from": "Brixton", "to": "Nowhere"}', "station 'Nowhere' not found"),
+])
+def test_bad_queries_report_their_line(network, line, error):
+    text, routed, failed = route_chunk(network, [(5, line)])
+    result = json.loads(text)
+    assert (routed, failed) == (0, 1)
+    assert result['line'] == 5 and error in result['error']
+
+
+def test_read_chunks_skips_blank_lines_and_keeps_numbers():
+    chunks = list(read_chunks(['a\n', '\n', 'b\n', 'c\n'], 2))
+    assert chunks == [[(1, 'a\n'), (3, 'b\n')], [(4, 'c\n')]]
+
+
+def test_cli_routes_stdin_with_and_without_workers():
+    queries = ''.join(json.dumps([a, b]) + '\n' for a, b in
+                      [('Brixton', 'Bank'), ('Bank', 'Oval'), ('Oval', 'Nowhere'), ('Bank', 'Brixton')])
+    single = run_cli('--chunk', '2', stdin=queries)
+    pooled = run_cli('--chunk', '1', '--workers', '2', stdin=queries)
+    assert single.returncode == 0 and pooled.returncode == 0
+    assert single.stdout == pooled.stdout
+    assert len(single.stdout.splitlines()) == 4
+    assert '3 routed, 1 failed' in single.stderr
+
+
+@pytest.mark.parametrize('args, message', [
+    (['--chunk', '0'], '--chunk must be at least 1'),
+    (['--snapshot', 'x.snap'], '--snapshot needs --network'),
+    (['--engine', 'teleport'], "Unknown engine 'teleport'"),
+    (['--network', 'missing.json'], 'batch_route:'),
+    (['missing-queries.jsonl'], 'batch_route:'),
+])
+def test_cli_usage_errors_exit_2(args, message):
+    result = run_cli(*args)
+    assert result.returncode == 2
+    assert message in result.stderr
+
+
+def test_route_minutes_of_a_route_no_longer_open():
+    network = TubeNetwork()
+    route = network.find_route('Brixton', 'Bank')
+    assert network.get_route_minutes(route) > 0
+    network.suspend_line('Victoria')
+    with pytest.raises(ValueError, match='No open Victoria connection from Brixton to Stockwell'):
+        network.get_route_minutes(route)
+    with pytest.raises(ValueError, match="Unknown station 'Nowhere'"):
+        network.get_route_minutes([('Nowhere', None), ('Bank', 'Northern')])
+    with pytest.raises(ValueError, match="Unknown line 'Hovercraft'"):
+        network.get_route_minutes([('Bank', None), ('Monument', 'Hovercraft')])
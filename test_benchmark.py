@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from benchmark import SyntheticTubeNetwork, compare_results, latency_summary, sample_pairs, scaling_run
+
+
+def test_synthetic_networks_are_reproducible():
+    a, b = SyntheticTubeNetwork(300, seed=4), SyntheticTubeNetwork(300, seed=4)
+    assert dict(a.graph) == dict(b.graph) and a.coordinates == b.coordinates
+    assert dict(SyntheticTubeNetwork(300, seed=5).graph) != dict(a.graph)
+    assert sample_pairs(a, 20, 1) == sample_pairs(b, 20, 1)
+
+
+def test_synthetic_network_shape():
+    network = SyntheticTubeNetwork(500, seed=2, line_length=20)
+    assert len(network.graph) == 500
+    assert set(network.coordinates) == set(network.graph)
+    lines = {line for edges in network.graph.values() for _, line, _ in edges}
+    assert 'Walk' in lines and len(lines) > 500 // 20
+    interchanges = sum(1 for s in network.graph if len(network.get_station_lines(s)) > 1)
+    assert interchanges > 0
+
+
+def test_latency_summary():
+    summary = latency_summary([0.001 * i for i in range(1, 101)])
+    assert summary['p50'] == pytest.approx(51.0) and summary['p99'] == pytest.approx(100.0)
+    assert summary['mean'] == pytest.approx(50.5) and summary['max'] == pytest.approx(100.0)
+
+
+def test_scaling_run_reports_and_compares(capsys):
+    run = scaling_run(200, 20, 3, 25, 0.15, 0.02)
+    assert run['stations'] == 200 and run['queries'] == 20
+    assert set(run['find_route_ms']) == {'mean', 'p50', 'p90', 'p99', 'max'}
+    json.dumps(run)
+    compare_results({'runs': [run]}, {'runs': [run]})
+    assert '1.00x' in capsys.readouterr().out
@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+import pytest
+
+from compiled_graph import CompiledGraph, GraphView, NO_LINE
+from tube_network import TubeNetwork
+
+
+def small_graph():
+    graph = defaultdict(list)
+    for a, b, line, time in [('A', 'B', 'Red', 2), ('B', 'C', 'Red', 2), ('C', 'D', 'Blue', 3),
+                             ('B', 'E', 'Blue', 4), ('D', 'F', 'Walk', 5), ('F', 'G', 'Green', 1)]:
+        graph[a].append((b, line, time))
+        graph[b].append((a, line, time))
+    return graph
+
+
+def test_arrays_hold_the_graph():
+    graph = small_graph()
+    compiled = CompiledGraph(graph, graph_version=3)
+    assert compiled.stations == sorted(graph) and compiled.lines == ['', 'Blue', 'Green', 'Red', 'Walk']
+    assert compiled.graph_version == 3 and compiled.walk_line == compiled.line_ids['Walk']
+    assert compiled.to_graph() == dict(graph)
+    assert len(compiled.offsets) == len(compiled.stations) + 1 and compiled.offsets[-1] == len(compiled.targets)
+    copy = CompiledGraph.from_arrays(compiled.stations, compiled.lines, compiled.offsets, compiled.targets,
+                                     compiled.edge_lines, compiled.weights)
+    assert copy.to_graph() == dict(graph) and dict(GraphView(copy)) == dict(graph)
+
+
+def test_state_lines_carry_committed_lines_across_walks():
+    compiled = CompiledGraph(small_graph())
+    lines_at = {station: {compiled.lines[line] for line in compiled.state_lines[i]}
+                for i, station in enumerate(compiled.stations)}
+    assert lines_at['A'] == {'', 'Red'}
+    assert lines_at['B'] == {'', 'Red', 'Blue'}
+    # F is reached from D only by walking, still committed to Blue; G only by Green.
+    assert lines_at['F'] == {'', 'Blue', 'Green'}
+    assert lines_at['G'] == {'', 'Green'}
+
+
+def test_search_charges_one_penalty_per_real_line_change():
+    compiled = CompiledGraph(small_graph())
+    ids = compiled.station_ids
+    tree = compiled.search(ids['A'], ids['G'], penalty=5)
+    path = compiled.unwind(tree.prev, tree.reached[ids['G']])
+    assert path == [('A', None), ('B', 'Red'), ('C', 'Red'), ('D', 'Blue'), ('F', 'Walk'), ('G', 'Green')]
+    # 2 + 2 + 3 + 5 + 1 minutes, and Red -> Blue -> Green is two changes; the walk adds none.
+    assert tree.dist[tree.reached[ids['G']]] == 13 + 2 * 5
+
+
+def test_rewriting_a_station_must_keep_its_edge_count():
+    compiled = CompiledGraph(small_graph())
+    b = compiled.station_ids['B']
+    with pytest.raises(ValueError):
+        compiled.set_station_edges(b, compiled.base_edges(b)[1:], [])
+    edges = compiled.base_edges(b)
+    compiled.set_station_edges(b, edges[1:], edges[:1])
+    assert compiled.ends[b] - compiled.offsets[b] == len(edges) - 1
+    assert compiled.base_edges(b) == edges and compiled.to_graph() == dict(small_graph())
+
+
+def test_network_compiles_once_per_graph_version():
+    network = TubeNetwork()
+    compiled = network.compiled
+    assert network.compiled is compiled
+    network._add_connection('Brixton', 'Bank', 'Victoria', 1)
+    assert network.compiled is not compiled and network.compiled.graph_version == network.graph_version
+    assert network.compiled.state_lines[network.compiled.station_ids['Bank']] >= {NO_LINE}
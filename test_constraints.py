@@ -0,0 +1,74 @@
+from collections import defaultdict
+from itertools import permutations
+import random
+
+import pytest
+
+from test_engines import penalised_cost
+from tube_network import TubeNetwork
+
+CONSTRAINTS = [
+    dict(avoid_lines=['Victoria']),
+    dict(avoid_lines=['Central', 'Jubilee'], avoid_stations=['Green Park']),
+    dict(avoid_stations=["King's Cross St Pancras", 'Bank']),
+    dict(no_walking=True),
+]
+
+
+def without(network: TubeNetwork, avoid_lines=(), avoid_stations=(), no_walking=False) -> TubeNetwork:
+    """A copy of `network` with the excluded lines, stations and walks taken out of its graph."""
+    banned = set(avoid_lines) | ({'Walk'} if no_walking else set())
+    reduced = TubeNetwork(cache_size=0)
+    reduced.graph = defaultdict(list)
+    for a, edges in network.graph.items():
+        reduced.graph[a] = [(b, line, time) for b, line, time in edges
+                            if line not in banned and b not in avoid_stations and a not in avoid_stations]
+    reduced.graph_version += 1
+    return reduced
+
+
+@pytest.fixture(scope='module')
+def network():
+    return TubeNetwork(cache_size=4096)
+
+
+@pytest.mark.parametrize('constraints', CONSTRAINTS)
+def test_constrained_routes_are_fastest_on_the_reduced_network(network, constraints):
+    reduced = without(network, **constraints)
+    avoided = set(constraints.get('avoid_stations', ()))
+    stations = [s for s in network.get_all_stations() if s not in avoided]
+    for start, end in random.Random(1).sample(list(permutations(stations, 2)), 200):
+        route, expected = network.find_route(start, end, **constraints), reduced.find_route(start, end)
+        assert (route is None) == (expected is None)
+        if route is not None:
+            assert all(line not in constraints.get('avoid_lines', ()) for _, line in route)
+            assert all(station not in avoided for station, _ in route)
+            assert not constraints.get('no_walking') or all(line != 'Walk' for _, line in route)
+            assert penalised_cost(network, route) == penalised_cost(reduced, expected)
+
+
+def test_constrained_and_plain_answers_are_cached_apart(network):
+    plain = network.find_route('Stockwell', 'Oxford Circus')
+    avoiding = network.find_route('Stockwell', 'Oxford Circus', avoid_lines=['Victoria'])
+    assert plain != avoiding
+    assert network.find_route('Stockwell', 'Oxford Circus') == plain
+    assert network.find_route('Stockwell', 'Oxford Circus', avoid_lines='Victoria') == avoiding
+
+
+@pytest.mark.parametrize('setting', [dict(precompute=True), dict(engine='ch')])
+def test_whole_network_engines_fall_back_to_dijkstra(network, setting):
+    other = TubeNetwork(**setting)
+    for constraints in CONSTRAINTS:
+        assert other.find_route('Stockwell', 'Oxford Circus', **constraints) == \
+            network.find_route('Stockwell', 'Oxford Circus', **constraints)
+
+
+@pytest.mark.parametrize('constraints', [
+    dict(avoid_lines=['Nope']),
+    dict(avoid_stations=['Nowhere']),
+    dict(avoid_stations=['Brixton']),
+    dict(avoid_stations='Bank'),
+])
+def test_invalid_constraints_are_value_errors(network, constraints):
+    with pytest.raises(ValueError):
+        network.find_route('Brixton', 'Bank', **constraints)
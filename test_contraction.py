@@ -0,0 +1,48 @@
+from itertools import permutations
+import random
+
+import pytest
+
+from contraction import ContractionHierarchy
+from test_engines import is_connected_route, penalised_cost
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module')
+def network():
+    return TubeNetwork(engine='ch', cache_size=0)
+
+
+def test_saved_index_answers_like_the_built_one(network, tmp_path):
+    path = str(tmp_path / 'network.ch')
+    network.contraction_hierarchy.save(path)
+    loaded = TubeNetwork(engine='ch', cache_size=0)
+    loaded.load_contraction_hierarchy(path)
+    for start, end in random.Random(7).sample(list(permutations(network.get_all_stations(), 2)), 200):
+        route = loaded.find_route(start, end)
+        assert route == network.find_route(start, end)
+        assert is_connected_route(network, route, start, end)
+
+
+def test_index_for_another_network_is_refused(network, tmp_path):
+    path = str(tmp_path / 'network.ch')
+    network.contraction_hierarchy.save(path)
+    other = TubeNetwork(engine='ch')
+    other._add_connection('Brixton', 'Bank', 'Victoria', 1)
+    with pytest.raises(ValueError, match='different network'):
+        other.load_contraction_hierarchy(path)
+    (tmp_path / 'junk.ch').write_bytes(b'junk\n')
+    with pytest.raises(ValueError, match='not a contraction-hierarchy index'):
+        ContractionHierarchy.load(str(tmp_path / 'junk.ch'))
+
+
+def test_index_is_rebuilt_after_changes():
+    network = TubeNetwork(engine='ch', cache_size=0)
+    before = network.contraction_hierarchy
+    network.suspend_line('Victoria')
+    route = network.find_route('Stockwell', 'Oxford Circus')
+    assert network.contraction_hierarchy is not before
+    assert all(line != 'Victoria' for _, line in route)
+    reference = TubeNetwork(cache_size=0)
+    reference.suspend_line('Victoria')
+    assert penalised_cost(network, route) == penalised_cost(reference, reference.find_route('Stockwell', 'Oxford Circus'))
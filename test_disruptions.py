@@ -0,0 +1,92 @@
+from collections import defaultdict
+from itertools import permutations
+import random
+
+import pytest
+
+from test_engines import is_connected_route, penalised_cost
+from tube_network import TubeNetwork
+
+
+def rebuilt(network: TubeNetwork) -> TubeNetwork:
+    """A fresh network whose graph simply leaves out what `network` has closed."""
+    fresh = TubeNetwork(cache_size=0)
+    fresh.graph = defaultdict(list)
+    for a, edges in network.graph.items():
+        fresh.graph[a]  # keep stations that lose every edge
+        for b, line, time in edges:
+            weight = network.disruptions.weight(a, b, line, time)
+            if weight is not None:
+                fresh.graph[a].append((b, line, weight))
+    fresh.graph_version += 1
+    return fresh
+
+
+def retimed_cost(network: TubeNetwork, route) -> int:
+    """penalised_cost with each hop at its current, disrupted minutes."""
+    minutes = 0
+    for (a, _), (b, line) in zip(route, route[1:]):
+        minutes += min(network.disruptions.weight(a, b, line, time)
+                       for neighbor, edge_line, time in network.graph[a] if neighbor == b and edge_line == line)
+    return penalised_cost(network, route) - network.get_route_minutes(route) + minutes
+
+
+STEPS = [
+    lambda n: n.suspend_line('Victoria'),
+    lambda n: n.close_station('Bank'),
+    lambda n: n.set_travel_time('Oxford Circus', 'Bond Street', 'Central', 9),
+    lambda n: n.set_travel_time('Green Park', 'Westminster', 'Jubilee', 1),
+    lambda n: n.close_connection("King's Cross St Pancras", 'Euston'),
+    lambda n: n.resume_line('Victoria'),
+    lambda n: n.reopen_station('Bank'),
+    lambda n: n.clear_disruptions(),
+]
+
+
+@pytest.mark.parametrize('precompute', [False, True])
+def test_incremental_updates_match_a_rebuilt_network(precompute):
+    network = TubeNetwork(precompute=precompute, cache_size=4096)
+    pairs = random.Random(2).sample(list(permutations(network.get_all_stations(), 2)), 150)
+    for start, end in pairs:
+        network.find_route(start, end)  # warm the cache (and build the matrix)
+
+    for step in STEPS:
+        step(network)
+        reference = rebuilt(network)
+        for start, end in pairs:
+            route, expected = network.find_route(start, end), reference.find_route(start, end)
+            if expected is None:
+                assert route is None
+                continue
+            assert is_connected_route(reference, route, start, end)
+            assert retimed_cost(network, route) == penalised_cost(reference, expected)
+
+
+def test_disruptions_drop_only_affected_cached_routes():
+    network = TubeNetwork(cache_size=8)
+    on_victoria = network.find_route('Stockwell', 'Oxford Circus')
+    elsewhere = network.find_route('Upminster', 'Barking')
+    assert any(line == 'Victoria' for _, line in on_victoria)
+    report = network.suspend_line('Victoria')
+    assert (report.cache_invalidated, report.cache_kept) == (1, 1)
+    assert all(line != 'Victoria' for _, line in network.find_route('Stockwell', 'Oxford Circus'))
+    hits = network.route_cache.hits
+    assert network.find_route('Upminster', 'Barking') == elsewhere
+    assert network.route_cache.hits == hits + 1
+
+
+def test_matrix_trees_are_repaired_not_rebuilt():
+    network = TubeNetwork(precompute=True)
+    matrix = network.route_matrix
+    report = network.close_connection('Stockwell', 'Oval', 'Northern')
+    assert report.trees_repaired > 0 and network.route_matrix is matrix
+
+
+def test_bad_disruptions_are_value_errors():
+    network = TubeNetwork()
+    with pytest.raises(ValueError):
+        network.close_station('Nowhere')
+    with pytest.raises(ValueError):
+        network.set_travel_time('Brixton', 'Stockwell', 'Victoria', 0)
+    with pytest.raises(ValueError):
+        network.close_connection('Brixton', 'Bank')
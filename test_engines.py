@@ -0,0 +1,71 @@
+from itertools import permutations
+import random
+
+import pytest
+
+from benchmark import SyntheticTubeNetwork, linear_scan_find_route
+from tube_network import TubeNetwork
+
+
+def penalised_cost(network: TubeNetwork, route) -> int:
+    """What find_route minimises: minutes plus the penalty for each change of real line."""
+    committed, changes = None, 0
+    for _, line in route[1:]:
+        if line != 'Walk':
+            changes += committed is not None and line != committed
+            committed = line
+    return network.get_route_minutes(route) + changes * network.INTERCHANGE_PENALTY
+
+
+def is_connected_route(network: TubeNetwork, route, start: str, end: str) -> bool:
+    if route[0] != (start, None) or route[-1][0] != end:
+        return False
+    return all(any(neighbor == b and edge_line == line for neighbor, edge_line, _ in network.graph[a])
+               for (a, _), (b, line) in zip(route, route[1:]))
+
+
+@pytest.fixture(scope='module', params=['built-in', 'synthetic'])
+def networks(request):
+    make = TubeNetwork if request.param == 'built-in' else (lambda **kw: SyntheticTubeNetwork(400, seed=7, **kw))
+    nets = {engine: make(cache_size=0, engine=engine) for engine in TubeNetwork.ENGINES}
+    stations = nets['dijkstra'].get_all_stations()
+    pairs = random.Random(3).sample(list(permutations(stations, 2)), 400)
+    return nets, pairs
+
+
+@pytest.mark.parametrize('engine', [e for e in TubeNetwork.ENGINES if e != 'dijkstra'])
+def test_engines_match_dijkstra_cost(networks, engine):
+    nets, pairs = networks
+    reference, network = nets['dijkstra'], nets[engine]
+    for start, end in pairs:
+        expected, route = reference.find_route(start, end), network.find_route(start, end)
+        assert (route is None) == (expected is None)
+        if route is not None:
+            assert is_connected_route(network, route, start, end)
+            assert penalised_cost(network, route) == penalised_cost(reference, expected)
+
+
+@pytest.mark.parametrize('engine', TubeNetwork.ENGINES)
+def test_engines_handle_trivial_and_unknown_queries(engine):
+    network = TubeNetwork(engine=engine)
+    assert network.find_route('Bank', 'Bank') == [('Bank', None)]
+    assert network.find_route('Bank', 'Nowhere') is None
+
+
+def test_dijkstra_matches_the_original_search_ties_included(networks):
+    nets, pairs = networks
+    network = nets['dijkstra']
+    for start, end in pairs:
+        assert network.find_route(start, end) == linear_scan_find_route(network, start, end)
+
+
+@pytest.mark.parametrize('engine', ['dijkstra', 'bidirectional', 'alt'])
+def test_constrained_routes_respect_exclusions(engine):
+    network = TubeNetwork(engine=engine)
+    route = network.find_route('Brixton', 'Bank', avoid_lines=['Northern'], avoid_stations=['Oval'], no_walking=True)
+    assert route is not None
+    assert all(line not in ('Northern', 'Walk') for _, line in route[1:])
+    assert all(station != 'Oval' for station, _ in route)
+    reference = TubeNetwork().find_route('Brixton', 'Bank', avoid_lines=['Northern'], avoid_stations=['Oval'],
+                                         no_walking=True)
+    assert penalised_cost(network, route) == penalised_cost(network, reference)
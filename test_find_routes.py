@@ -0,0 +1,56 @@
+import concurrent.futures
+from functools import partial
+from itertools import permutations
+import multiprocessing
+import pickle
+import random
+
+import pytest
+
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module')
+def network():
+    return TubeNetwork()
+
+
+@pytest.fixture(scope='module')
+def pairs(network):
+    return random.Random(9).sample(list(permutations(network.get_all_stations(), 2)), 200)
+
+
+def test_find_routes_matches_find_route(network, pairs):
+    reference = TubeNetwork(cache_size=0)
+    routes = list(network.find_routes(pairs))
+    assert sorted((start, end) for start, end, _ in routes) == sorted(pairs)
+    for start, end, route in routes:
+        assert route == reference.find_route(start, end)
+
+
+def test_copies_leave_out_cache_matrix_and_hooks():
+    network = TubeNetwork(precompute=True, cache_size=16)
+    network.enable_instrumentation(lambda stats: None)
+    network.find_route('Brixton', 'Bank')
+    network.route_matrix
+    copy = pickle.loads(pickle.dumps(network))
+    assert copy.instrumentation is None
+    assert copy._route_matrix is None
+    assert copy.route_cache.capacity == 16 and len(copy.route_cache) == 0
+    assert copy.find_route('Brixton', 'Bank') == network.find_route('Brixton', 'Bank')
+    assert network.instrumentation is not None and len(network.route_cache) == 1
+
+
+def test_workers_with_unpicklable_hook(pairs, monkeypatch):
+    # Spawned workers receive the network pickled, as on macOS and Windows.
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor',
+                        partial(concurrent.futures.ProcessPoolExecutor, mp_context=multiprocessing.get_context('spawn')))
+    network = TubeNetwork()
+    seen = []
+    network.enable_instrumentation(lambda stats: seen.append(stats))
+    serial = list(network.find_routes(pairs))
+    assert list(network.find_routes(pairs, workers=2)) == serial
+
+    origins = sorted({start for start, _ in pairs})[:12]
+    pooled = [(origin, iso.reachable()) for origin, iso in network.isochrones(origins, 20, workers=2)]
+    assert pooled == [(origin, iso.reachable()) for origin, iso in network.isochrones(origins, 20)]
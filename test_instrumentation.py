@@ -0,0 +1,82 @@
+import heapq
+
+import pytest
+
+import compiled_graph
+from tube_network import TubeNetwork
+
+
+@pytest.fixture
+def network():
+    network = TubeNetwork(cache_size=16)
+    network.enable_instrumentation()
+    return network
+
+
+def true_frontier_peak(monkeypatch, run):
+    """Largest heap CompiledGraph.search builds during `run`, watched push by push."""
+    peak, push = [0], heapq.heappush
+
+    def heappush(heap, item):
+        push(heap, item)
+        peak[0] = max(peak[0], len(heap))
+
+    monkeypatch.setattr(compiled_graph.heapq, 'heappush', heappush)
+    run()
+    monkeypatch.undo()
+    return peak[0]
+
+
+@pytest.mark.parametrize('start, end, constraints', [
+    ('Brixton', 'Bank', {}),
+    ('Heathrow Terminals 2 & 3', 'Upminster', {}),
+    ('Brixton', 'Bank', {'avoid_lines': ['Northern'], 'no_walking': True}),
+])
+def test_frontier_peak_is_the_largest_heap(network, monkeypatch, start, end, constraints):
+    peak = true_frontier_peak(monkeypatch, lambda: network.find_route(start, end, **constraints))
+    assert network.instrumentation.last.frontier_peak == max(peak, 1)
+
+
+def test_relaxed_counts_only_edges_the_mask_allows(network):
+    network.find_route('Brixton', 'Bank')
+    unconstrained = network.instrumentation.last
+    compiled = network.compiled
+    tree = compiled.search(compiled.station_ids['Brixton'], compiled.station_ids['Bank'],
+                           mask=compiled.edge_mask(compiled_graph.RouteConstraints(frozenset(['Victoria']))))
+    # Brixton is only on the Victoria line: with it barred nothing can be followed.
+    assert tree.relaxed == 0 and tree.settled == 1
+    assert unconstrained.relaxed > 0
+
+
+def test_cache_and_matrix_answers_count_nothing():
+    network = TubeNetwork(precompute=True)
+    network.enable_instrumentation()
+    network.find_route('Brixton', 'Bank')
+    stats = network.instrumentation.last
+    assert stats.engine == 'matrix'
+    assert (stats.settled, stats.relaxed, stats.frontier_peak, stats.penalties) == (0, 0, 0, 0)
+
+    network = TubeNetwork()
+    network.enable_instrumentation()
+    network.find_route('Brixton', 'Bank')
+    network.find_route('Brixton', 'Bank')
+    stats = network.instrumentation.last
+    assert stats.cached and (stats.settled, stats.relaxed) == (0, 0)
+
+
+def test_other_engines_leave_dijkstra_counts_unset():
+    network = TubeNetwork(engine='alt')
+    network.enable_instrumentation()
+    network.find_route('Brixton', 'Bank')
+    stats = network.instrumentation.last
+    assert stats.settled > 0
+    assert (stats.relaxed, stats.frontier_peak, stats.penalties) == (None, None, None)
+
+
+def test_failing_hook_does_not_break_routing(network, caplog):
+    seen = []
+    network.instrumentation.add_hook(lambda stats: 1 / 0)
+    network.instrumentation.add_hook(seen.append)
+    assert network.find_route('Brixton', 'Bank') is not None
+    assert len(seen) == 1
+    assert 'query hook' in caplog.text
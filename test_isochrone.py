@@ -0,0 +1,56 @@
+import pytest
+
+from benchmark import SyntheticTubeNetwork
+from test_engines import penalised_cost
+from tube_network import TubeNetwork
+
+
+def cost(network: TubeNetwork, start: str, end: str):
+    route = network.find_route(start, end)
+    return penalised_cost(network, route) if route is not None else None
+
+
+@pytest.fixture(scope='module', params=['built-in', 'synthetic'])
+def network(request):
+    return TubeNetwork() if request.param == 'built-in' else SyntheticTubeNetwork(200, seed=3)
+
+
+@pytest.mark.parametrize('budget', [0, 12, 40])
+def test_isochrone_is_find_routes_cost_within_the_budget(network, budget):
+    origin = network.get_all_stations()[len(network.get_all_stations()) // 2]
+    isochrone = network.isochrone(origin, budget)
+    for station in network.get_all_stations():
+        minutes = cost(network, origin, station)
+        expected = minutes if minutes is not None and minutes <= budget else None
+        assert isochrone.minutes_to(station) == expected
+    assert list(isochrone.reachable().values()) == sorted(isochrone.reachable().values())
+    assert isochrone.station_count == len(isochrone.reachable())
+
+
+def test_several_origins_take_the_nearest(network):
+    origins = network.get_all_stations()[:3]
+    combined = network.isochrone(origins, 30)
+    singles = [network.isochrone(origin, 30) for origin in origins]
+    for station in network.get_all_stations():
+        reached = [m for m in (s.minutes_to(station) for s in singles) if m is not None]
+        assert combined.minutes_to(station) == (min(reached) if reached else None)
+
+
+def test_matrix_and_batches_agree():
+    network, precomputed = TubeNetwork(), TubeNetwork(precompute=True)
+    origins = network.get_all_stations()[::40]
+    for (origin, isochrone), (_, matrix_isochrone) in zip(network.isochrones(origins, 25),
+                                                          precomputed.isochrones(origins, 25)):
+        assert isochrone.reachable() == matrix_isochrone.reachable() == network.isochrone(origin, 25).reachable()
+
+
+def test_bad_queries_are_value_errors():
+    network = TubeNetwork()
+    with pytest.raises(ValueError):
+        network.isochrone('Bank', -1)
+    with pytest.raises(ValueError):
+        network.isochrone([], 10)
+    with pytest.raises(ValueError):
+        network.isochrone('Nowhere', 10)
+    with pytest.raises(ValueError):
+        list(network.isochrones(['Bank', 'Nowhere'], 10))
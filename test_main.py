@@ -0,0 +1,164 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from main import LondonUndergroundApp
+from tube_network import TubeNetwork
+
+# The app's logic driven headlessly: Tk widgets and variables are replaced by
+# small fakes that record what the app asks of them.
+
+
+class FakeVar:
+    def __init__(self, value=''):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeRoot:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback, *args):
+        self.scheduled.append((callback, args))
+
+    def after_idle(self, callback, *args):
+        self.scheduled.append((callback, args))
+
+    def run_scheduled(self):
+        while self.scheduled:
+            callback, args = self.scheduled.pop(0)
+            callback(*args)
+
+
+class FakeText:
+    def __init__(self):
+        self.inserts = []
+
+    def insert(self, index, *args):
+        self.inserts.append(args)
+
+    def delete(self, *args):
+        self.inserts.clear()
+
+    def tag_configure(self, *args, **kwargs):
+        pass
+
+    @property
+    def text(self) -> str:
+        return ''.join(text for args in self.inserts for text in args[::2])
+
+
+@pytest.fixture
+def app():
+    app = object.__new__(LondonUndergroundApp)
+    app.root, app.route_text = FakeRoot(), FakeText()
+    app.tube_network = TubeNetwork()
+    app.route_executor = ThreadPoolExecutor(max_workers=1)
+    app.pending_route, app.route_request, app.route_started = None, 0, 0.0
+    app.line_tags, app.summary_label, app.render_request = {}, None, 0
+    app.from_var, app.to_var, app.status_var = FakeVar(), FakeVar(), FakeVar()
+    app.colorize_legs, app.show_step_by_step, app.show_interchanges = FakeVar(True), FakeVar(True), FakeVar(True)
+    app.summaries = []
+    app._show_summary = app.summaries.append
+    yield app
+    app.route_executor.shutdown()
+
+
+def plan(app, start: str, end: str):
+    app.from_var.set(start)
+    app.to_var.set(end)
+    app.plan_route()
+
+
+def test_search_runs_off_the_main_loop_and_is_picked_up_by_polling(app):
+    plan(app, 'Brixton', 'Bank')
+    assert app.status_var.get().startswith('Planning route')
+    app.pending_route.result()
+    app.root.run_scheduled()
+    assert app.pending_route is None
+    assert app.status_var.get().startswith('Route found')
+    assert app.summaries and 'Journey from Brixton to Bank' in app.summaries[-1]
+
+
+def test_unfinished_search_is_polled_again(app):
+    app.route_request = 1
+    future = Future()
+    app._poll_route(1, future, 'Brixton', 'Bank')
+    assert len(app.root.scheduled) == 1 and 'Planning route' in app.status_var.get()
+
+
+def test_superseded_search_is_ignored(app):
+    plan(app, 'Brixton', 'Bank')
+    first = app.pending_route
+    plan(app, 'Upminster', 'Barking')
+    first.result()
+    app.pending_route.result()
+    app.root.run_scheduled()
+    assert len(app.summaries) == 1 and 'Upminster to Barking' in app.summaries[0]
+
+
+def test_clear_drops_a_search_in_flight(app):
+    plan(app, 'Brixton', 'Bank')
+    app.pending_route.result()
+    app.show_welcome_message = lambda: None
+    app.clear_route()
+    app.root.run_scheduled()
+    assert app.summaries == []
+
+
+def long_route(app, hops: int):
+    """A made-up route along the Central line, long enough to need several batches."""
+    stations = app.tube_network.get_all_stations()
+    return [(stations[0], None)] + [(station, 'Central') for station in stations[1:hops + 1]]
+
+
+def test_short_route_is_inserted_in_one_call(app):
+    route = app.tube_network.find_route('Brixton', 'Bank')
+    app.display_route(route, 'Brixton', 'Bank')
+    assert len(app.route_text.inserts) == 1 and app.root.scheduled == []
+    document = app._route_document(route)
+    assert app.route_text.text == ''.join(text for text, _ in document)
+
+
+def test_long_route_fills_in_batch_by_batch(app, monkeypatch):
+    monkeypatch.setattr(app.tube_network, 'get_route_minutes', lambda route: 0)
+    monkeypatch.setattr(app.tube_network, 'get_route_legs', lambda route: [])
+    app.RENDER_BATCH_LINES = 10
+    route = long_route(app, 45)
+    app.display_route(route, route[0][0], route[-1][0])
+    assert len(app.route_text.inserts) == 1 and len(app.root.scheduled) == 1
+    app.root.run_scheduled()
+    assert len(app.route_text.inserts) == 5
+    assert app.route_text.text == ''.join(text for text, _ in app._route_document(route))
+
+
+def test_a_new_route_stops_the_old_ones_batches(app, monkeypatch):
+    monkeypatch.setattr(app.tube_network, 'get_route_minutes', lambda route: 0)
+    monkeypatch.setattr(app.tube_network, 'get_route_legs', lambda route: [])
+    app.RENDER_BATCH_LINES = 10
+    route = long_route(app, 45)
+    app.display_route(route, route[0][0], route[-1][0])
+    short = app.tube_network.find_route('Brixton', 'Stockwell')
+    app.display_route(short, 'Brixton', 'Stockwell')
+    app.root.run_scheduled()
+    assert route[5][0] not in app.route_text.text
+    assert app.route_text.text.count('ROUTE DETAILS') == 1
+
+
+def test_neighbouring_pieces_with_one_tag_are_merged(app):
+    app._insert_pieces([('a', ''), ('b', ''), ('c', 'line_Victoria'), ('d', 'line_Victoria'), ('e', '')])
+    assert app.route_text.inserts == [('ab', '', 'cd', 'line_Victoria', 'e', '')]
+
+
+def test_line_tags_are_configured_once(app):
+    configured = []
+    app.route_text.tag_configure = lambda tag, **colors: configured.append(tag)
+    assert app._ensure_line_tag('Victoria') == app._ensure_line_tag('Victoria') == 'line_Victoria'
+    assert app._ensure_line_tag('Hammersmith & City') == 'line_Hammersmith___City'
+    assert configured == ['line_Victoria', 'line_Hammersmith___City']
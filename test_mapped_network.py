@@ -0,0 +1,93 @@
+from itertools import permutations
+import pickle
+import random
+
+import pytest
+
+from mapped_network import MappedTubeNetwork, attach, write_mapped
+from network_errors import NetworkDataError
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module')
+def network():
+    return TubeNetwork()
+
+
+@pytest.fixture(scope='module')
+def mapped_path(network, tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('mapped') / 'network.map')
+    write_mapped(path, network.compiled, network.line_colors)
+    return path
+
+
+@pytest.fixture(scope='module')
+def pairs(network):
+    return random.Random(12).sample(list(permutations(network.get_all_stations(), 2)), 200)
+
+
+def test_round_trip(network, mapped_path, pairs):
+    mapped = MappedTubeNetwork(mapped_path)
+    assert mapped.get_all_stations() == network.get_all_stations()
+    assert {s: mapped.graph[s] for s in mapped.graph} == dict(network.graph)
+    assert all(mapped.line_colors[line] == network.line_colors[line] for line in mapped.compiled.lines[1:]
+               if line in network.line_colors)
+    for start, end in pairs:
+        assert mapped.find_route(start, end) == network.find_route(start, end)
+
+
+def test_name_lookups(mapped_path):
+    compiled, _ = attach(mapped_path)
+    assert compiled.stations[compiled.station_ids["King's Cross St Pancras"]] == "King's Cross St Pancras"
+    assert 'Nowhere' not in compiled.station_ids
+    assert compiled.stations[-1] == compiled.stations[len(compiled.stations) - 1]
+
+
+def test_pickling_sends_the_path_and_disruptions(mapped_path):
+    mapped = MappedTubeNetwork(mapped_path, cache_size=16)
+    mapped.suspend_line('Victoria')
+    payload = pickle.dumps(mapped)
+    assert len(payload) < 1000
+    copy = pickle.loads(payload)
+    assert copy.disruptions.suspended_lines == {'Victoria'}
+    assert copy.route_cache.capacity == 16
+    assert all(line != 'Victoria' for _, line in copy.find_route('Stockwell', 'Oxford Circus'))
+
+
+def test_disruptions_use_private_copies(mapped_path, network):
+    mapped = MappedTubeNetwork(mapped_path)
+    mapped.close_station('Bank')
+    assert mapped.find_route('Monument', 'Bank') is None
+    assert MappedTubeNetwork(mapped_path).find_route('Monument', 'Bank') == network.find_route('Monument', 'Bank')
+
+
+def test_disrupted_network_is_written_undisrupted(network, tmp_path):
+    disrupted = TubeNetwork()
+    disrupted.suspend_line('Victoria')
+    path = str(tmp_path / 'network.map')
+    write_mapped(path, disrupted.compiled, disrupted.line_colors)
+    assert MappedTubeNetwork(path).find_route('Brixton', 'Bank') == network.find_route('Brixton', 'Bank')
+
+
+def test_read_only(mapped_path):
+    with pytest.raises(ValueError):
+        MappedTubeNetwork(mapped_path)._add_connection('Bank', 'Brixton', 'Victoria')
+
+
+@pytest.mark.parametrize('content, message', [
+    (b'', 'empty file'),
+    (b'not a mapped network' * 20, 'not a mapped network'),
+])
+def test_other_files_are_rejected(tmp_path, content, message):
+    path = tmp_path / 'bad.map'
+    path.write_bytes(content)
+    with pytest.raises(NetworkDataError, match=message):
+        attach(str(path))
+
+
+def test_truncated_file_is_rejected(mapped_path, tmp_path):
+    path = tmp_path / 'truncated.map'
+    with open(mapped_path, 'rb') as f:
+        path.write_bytes(f.read()[:-100])
+    with pytest.raises(NetworkDataError, match='truncated or corrupt'):
+        attach(str(path))
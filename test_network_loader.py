@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from compiled_graph import GraphView
+from network_errors import NetworkDataError
+from network_loader import FileTubeNetwork, read_connections
+
+NETWORK = {
+    'lines': [{'name': 'Victoria', 'color': '#0098D4', 'stations': ['Brixton', 'Stockwell', 'Vauxhall', 'Pimlico'],
+               'times': [2, 2, 2]},
+              {'name': 'Northern', 'stations': ['Kennington', 'Stockwell', 'Clapham North']}],
+    'walks': [['Pimlico', 'Vauxhall', 10]],
+    'stations': {'Brixton': [51.4627, -0.1145]},
+}
+
+
+def write(tmp_path, name, content) -> str:
+    path = tmp_path / name
+    path.write_text(content if isinstance(content, str) else json.dumps(content), encoding='utf-8')
+    return str(path)
+
+
+def read(path):
+    return list(read_connections(path, {}, {}))
+
+
+def with_changes(**changes):
+    data = json.loads(json.dumps(NETWORK))
+    data.update(changes)
+    return data
+
+
+@pytest.mark.parametrize('content, message', [
+    ('{"lines": [', 'invalid JSON'),
+    ([], "expected an object"),
+    (with_changes(lines={'name': 'Victoria'}), "'lines' must be a list"),
+    (with_changes(walks={'Bank': 'Monument'}), "'walks' must be a list"),
+    (with_changes(lines=['Victoria']), 'lines[0]: expected an object'),
+    (with_changes(lines=[{'name': 'Victoria', 'stations': ['Brixton']}]), 'at least two stations'),
+    (with_changes(lines=[{'name': 'Victoria', 'stations': ['Brixton', 'Stockwell'], 'times': [2, 2]}]),
+     "'times' must have one entry per segment"),
+    (with_changes(lines=[{'name': 'Victoria', 'stations': ['Brixton', 'Stockwell'], 'color': 'blue'}]), "'color'"),
+    (with_changes(lines=[{'name': 'Victoria', 'stations': ['Brixton', 'Stockwell'], 'times': [0]}]), 'travel time'),
+    (with_changes(lines=[{'name': 'Victoria', 'stations': ['Brixton', 'Stockwell'], 'times': [True]}]), 'travel time'),
+    (with_changes(lines=[{'name': 'Victoria', 'stations': ['Brixton', 'Brixton']}]), 'connected to itself'),
+    (with_changes(lines=[{'name': '', 'stations': ['Brixton', 'Stockwell']}]), 'line name'),
+    (with_changes(walks=[['Bank', 'Monument']]), 'walks[0]: expected [station, station, minutes]'),
+    (with_changes(walks=[['Bank', 'Monument', '5']]), 'travel time'),
+    (with_changes(stations=[['Bank', 51.5, -0.09]]), "'stations' must map"),
+    (with_changes(stations={'Bank': [51.5]}), 'expected [latitude, longitude]'),
+    (with_changes(stations={'Bank': [95, -0.09]}), 'latitude'),
+])
+def test_json_errors(tmp_path, content, message):
+    path = write(tmp_path, 'network.json', content)
+    with pytest.raises(NetworkDataError, match=message.replace('[', r'\[').replace(']', r'\]')) as info:
+        read(path)
+    assert str(info.value).startswith(path)
+
+
+@pytest.mark.parametrize('content, message', [
+    ('line,from\nVictoria,Brixton\n', 'missing column'),
+    ('line,from,to,minutes\nVictoria,Brixton,Stockwell,two\n', ':2: minutes must be a whole number'),
+    ('line,from,to,minutes\nVictoria,Brixton,Stockwell,2\nVictoria,,Vauxhall,2\n', ':3: station name'),
+    ('line,from,to,minutes\nVictoria,Brixton,Stockwell,-1\n', 'travel time'),
+    ('station,lat,lon\nBrixton,north,-0.11\n', 'lat and lon must be numbers'),
+    ('station,lat,lon\nBrixton,51.46,200\n', 'longitude'),
+])
+def test_csv_errors(tmp_path, content, message):
+    with pytest.raises(NetworkDataError, match=message):
+        read(write(tmp_path, 'network.csv', content))
+
+
+def test_unsupported_file_type(tmp_path):
+    with pytest.raises(NetworkDataError, match='unsupported data file type'):
+        read(write(tmp_path, 'network.txt', ''))
+
+
+def test_errors_are_value_errors(tmp_path):
+    with pytest.raises(ValueError):
+        FileTubeNetwork(write(tmp_path, 'network.json', with_changes(lines={})))
+
+
+def test_json_and_csv_build_the_same_network(tmp_path):
+    from_json = FileTubeNetwork(write(tmp_path, 'network.json', NETWORK))
+    rows = ['line,from,to,minutes'] + [f'{line},{a},{b},{time}' for a, b, line, time in read(write(
+        tmp_path, 'again.json', NETWORK))]
+    from_csv = FileTubeNetwork(write(tmp_path, 'network.csv', '\n'.join(rows) + '\n'))
+    assert dict(from_csv.graph) == dict(from_json.graph)
+    assert from_json.line_colors['Victoria'] == '#0098D4'
+    assert from_json.coordinates['Brixton'] == (51.4627, -0.1145)
+
+
+def test_snapshot_round_trip(tmp_path):
+    source = write(tmp_path, 'network.json', NETWORK)
+    snapshot = str(tmp_path / 'network.snapshot')
+    parsed = FileTubeNetwork(source, snapshot_path=snapshot)
+    loaded = FileTubeNetwork(source, snapshot_path=snapshot)
+    assert not parsed.loaded_from_snapshot and loaded.loaded_from_snapshot
+    assert isinstance(loaded.graph, GraphView)
+    assert {s: loaded.graph[s] for s in loaded.graph} == dict(parsed.graph)
+    assert loaded.line_colors == parsed.line_colors and loaded.coordinates == parsed.coordinates
+    for start in parsed.get_all_stations():
+        for end in parsed.get_all_stations():
+            assert loaded.find_route(start, end) == parsed.find_route(start, end)
+
+    # A changed source makes the snapshot stale, so it is parsed and rewritten.
+    write(tmp_path, 'network.json', with_changes(walks=[]))
+    assert not FileTubeNetwork(source, snapshot_path=snapshot).loaded_from_snapshot
+    assert FileTubeNetwork(source, snapshot_path=snapshot).loaded_from_snapshot
+
+
+def test_adding_to_a_snapshot_network_copies_the_graph_out(tmp_path):
+    source = write(tmp_path, 'network.json', NETWORK)
+    snapshot = str(tmp_path / 'network.snapshot')
+    FileTubeNetwork(source, snapshot_path=snapshot)
+    network = FileTubeNetwork(source, snapshot_path=snapshot)
+    network.find_route('Brixton', 'Pimlico')
+    network._add_connection('Pimlico', 'Green Park', 'Victoria', 3)
+    assert not isinstance(network.graph, GraphView)
+    assert ('Green Park', 'Victoria', 3) in network.graph['Pimlico']
+    assert network.find_route('Brixton', 'Green Park')[-1] == ('Green Park', 'Victoria')
@@ -0,0 +1,64 @@
+from itertools import permutations
+import random
+
+import pytest
+
+from benchmark import SyntheticTubeNetwork
+from test_engines import is_connected_route
+from tube_network import TubeNetwork
+
+
+def measures(network: TubeNetwork, route):
+    """(minutes, interchanges, walk minutes) counted straight off a route."""
+    committed, changes, walked = None, 0, 0
+    for (a, _), (b, line) in zip(route, route[1:]):
+        if line == 'Walk':
+            walked += min(time for neighbor, edge_line, time in network.graph[a] if neighbor == b and edge_line == line)
+        else:
+            changes += committed is not None and line != committed
+            committed = line
+    return network.get_route_minutes(route), changes, walked
+
+
+def dominates(a, b) -> bool:
+    return all(x <= y for x, y in zip(a, b)) and a != b
+
+
+@pytest.fixture(scope='module', params=['built-in', 'synthetic'])
+def network_pairs(request):
+    network = TubeNetwork() if request.param == 'built-in' else SyntheticTubeNetwork(200, seed=13)
+    pairs = random.Random(6).sample(list(permutations(network.get_all_stations(), 2)), 60)
+    return network, pairs
+
+
+@pytest.mark.parametrize('criteria', [('interchanges',), ('interchanges', 'walk')])
+def test_options_are_non_dominated_and_cover_find_route(network_pairs, criteria):
+    network, pairs = network_pairs
+    keep = slice(0, 2) if criteria == ('interchanges',) else slice(0, 3)
+    for start, end in pairs:
+        options = network.find_pareto_routes(start, end, criteria)
+        fastest = network.find_route(start, end)
+        if fastest is None:
+            assert options == []
+            continue
+        vectors = []
+        for option in options:
+            assert is_connected_route(network, option.route, start, end)
+            counted = measures(network, option.route)
+            assert counted == (option.minutes, option.interchanges, option.walk_minutes)
+            vectors.append(counted[keep])
+        assert [v[0] for v in vectors] == sorted(v[0] for v in vectors)
+        assert not any(dominates(a, b) for a in vectors for b in vectors)
+        # find_route's answer is one trade-off; some option must be at least as good on every count.
+        reference = measures(network, fastest)[keep]
+        assert any(all(x <= y for x, y in zip(v, reference)) for v in vectors)
+
+
+def test_trivial_and_invalid_queries():
+    network = TubeNetwork()
+    assert network.find_pareto_routes('Bank', 'Bank') == [([('Bank', None)], 0, 0, 0)]
+    assert network.find_pareto_routes('Bank', 'Nowhere') == []
+    with pytest.raises(ValueError):
+        network.find_pareto_routes('Bank', 'Brixton', ('price',))
+    with pytest.raises(ValueError):
+        network.find_pareto_routes('Bank', 'Brixton', ())
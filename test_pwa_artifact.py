@@ -0,0 +1,40 @@
+from itertools import permutations
+import random
+
+import pytest
+
+from pwa_artifact import RouteArtifact, build_artifact, penalised_minutes
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module')
+def network():
+    return TubeNetwork()
+
+
+@pytest.fixture(scope='module')
+def pairs(network):
+    return random.Random(4).sample(list(permutations(network.get_all_stations(), 2)), 150)
+
+
+@pytest.mark.parametrize('next_hops', [False, True])
+def test_routes_cost_what_find_route_costs(network, pairs, next_hops):
+    artifact = RouteArtifact(build_artifact(network, next_hops))
+    assert artifact.stations == network.get_all_stations()
+    assert (artifact.next_hops is not None) == next_hops
+    for start, end in pairs:
+        route = artifact.route(start, end)
+        assert route[0] == (start, None) and route[-1][0] == end
+        assert penalised_minutes(network, route) == penalised_minutes(network, network.find_route(start, end))
+
+
+def test_disruptions_are_left_out(network):
+    disrupted = TubeNetwork()
+    disrupted.suspend_line('Victoria')
+    disrupted.close_station('Bank')
+    assert build_artifact(disrupted, next_hops=True) == build_artifact(network, next_hops=True)
+
+
+def test_rejects_other_files():
+    with pytest.raises(ValueError):
+        RouteArtifact(b'not an artifact at all, just some bytes here to fill the header space' * 4)
@@ -0,0 +1,56 @@
+from route_cache import MISSING, RouteCache
+from tube_network import TubeNetwork
+
+
+def test_least_recently_used_entries_go_first():
+    cache = RouteCache(2)
+    cache.put('a', 1, 0)
+    cache.put('b', 2, 0)
+    assert cache.get('a', 0) == 1
+    cache.put('c', 3, 0)
+    assert cache.get('b', 0) is MISSING
+    assert cache.get('a', 0) == 1 and cache.get('c', 0) == 3
+    assert cache.stats() == {'hits': 3, 'misses': 1, 'evictions': 1, 'invalidations': 0, 'size': 2, 'capacity': 2}
+
+
+def test_a_new_graph_version_empties_the_cache():
+    cache = RouteCache(4)
+    cache.put('a', 1, 0)
+    assert cache.get('a', 1) is MISSING
+    assert len(cache) == 0 and cache.invalidations == 1
+
+
+def test_resize_and_disable():
+    cache = RouteCache(3)
+    for key in 'abc':
+        cache.put(key, key, 0)
+    cache.resize(1)
+    assert len(cache) == 1 and cache.get('c', 0) == 'c'
+    cache.resize(0)
+    cache.put('d', 'd', 0)
+    assert not cache.enabled and len(cache) == 0
+
+
+def test_find_route_answers_from_the_cache_until_the_graph_changes():
+    network = TubeNetwork(cache_size=8)
+    route = network.find_route('Brixton', 'Bank')
+    assert network.find_route('Brixton', 'Bank') == route
+    assert network.route_cache.hits == 1
+
+    # Callers may edit what they get back without touching the cached copy.
+    expected = list(route)
+    route.append(('Nowhere', None))
+    assert network.find_route('Brixton', 'Bank') == expected
+
+    network._add_connection('Brixton', 'Bank', 'Victoria', 1)
+    assert network.find_route('Brixton', 'Bank') == [('Brixton', None), ('Bank', 'Victoria')]
+    assert network.route_cache.invalidations == 1
+
+
+def test_missing_routes_are_cached_too():
+    network = TubeNetwork(cache_size=8)
+    network._add_connection('Island', 'Lagoon', 'Ferry', 3)
+    assert network.find_route('Bank', 'Island') is None
+    assert network.find_route('Bank', 'Island') is None
+    assert network.route_cache.hits == 1
+
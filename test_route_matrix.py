@@ -0,0 +1,40 @@
+from itertools import permutations
+import random
+
+import pytest
+
+from benchmark import SyntheticTubeNetwork
+from test_engines import penalised_cost
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module', params=['built-in', 'synthetic'])
+def networks(request):
+    make = TubeNetwork if request.param == 'built-in' else (lambda **kw: SyntheticTubeNetwork(200, seed=5, **kw))
+    searched, precomputed = make(cache_size=0), make(precompute=True, cache_size=0)
+    pairs = random.Random(8).sample(list(permutations(searched.get_all_stations(), 2)), 500)
+    return searched, precomputed, pairs
+
+
+def test_matrix_answers_are_find_routes(networks):
+    searched, precomputed, pairs = networks
+    matrix = precomputed.route_matrix
+    for start, end in pairs:
+        route = searched.find_route(start, end)
+        assert precomputed.find_route(start, end) == route
+        assert matrix.distance_between(start, end) == (penalised_cost(searched, route) if route else None)
+
+
+def test_matrix_answers_for_trivial_and_unknown_queries():
+    network = TubeNetwork(precompute=True)
+    assert network.find_route('Bank', 'Bank') == [('Bank', None)]
+    assert network.find_route('Bank', 'Nowhere') is None
+
+
+def test_matrix_is_rebuilt_after_a_new_connection():
+    network = TubeNetwork(precompute=True)
+    before = network.route_matrix
+    network._add_connection('Brixton', 'Bank', 'Victoria', 1)
+    assert network.find_route('Brixton', 'Bank') == [('Brixton', None), ('Bank', 'Victoria')]
+    assert network.route_matrix is not before
+    assert network.route_matrix.distance_between('Brixton', 'Bank') == 1
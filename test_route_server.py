@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+from route_server import RouteServer
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module')
+def network():
+    return TubeNetwork()
+
+
+async def request(port: int, raw: bytes):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, json.loads(body)
+
+
+def get(server: RouteServer, *targets: str, method: str = 'GET'):
+    """(status, headers, body) for each target, each on its own connection."""
+    async def run():
+        _, port = await server.start('127.0.0.1', 0)
+        try:
+            return [await request(port, f'{method} {t} HTTP/1.1\r\nConnection: close\r\n\r\n'.encode())
+                    for t in targets]
+        finally:
+            await server.close()
+    return asyncio.run(run())
+
+
+def test_route(network):
+    [(status, _, body)] = get(RouteServer(network), '/route?from=Brixton&to=Bank')
+    assert status == 200
+    assert [(step['station'], step['line']) for step in body['route']] == network.find_route('Brixton', 'Bank')
+    assert body['legs'][0]['from'] == 'Brixton' and body['legs'][-1]['to'] == 'Bank'
+
+
+def test_constrained_route(network):
+    [(status, _, body)] = get(RouteServer(network), '/route?from=Stockwell&to=Oxford%20Circus&avoid_lines=Victoria')
+    assert status == 200
+    assert all(step['line'] != 'Victoria' for step in body['route'])
+
+
+@pytest.mark.parametrize('target, status, message', [
+    ('/route?from=Brixton', 400, "both 'from' and 'to'"),
+    ('/route?from=Brixton&to=Nowhere', 404, "station 'Nowhere' not found"),
+    ('/route?from=Brixton&to=Bank&avoid_lines=Nope', 400, "Unknown line 'Nope'"),
+    ('/route?from=Brixton&to=Bank&avoid_stations=Bank', 400, 'own start or end'),
+    ('/route?from=Brixton&to=Stockwell&avoid_lines=Victoria', 404, 'no route'),
+    ('/stations?limit=x', 400, 'limit must be an integer'),
+    ('/stations?limit=0', 400, 'limit must be at least 1'),
+    ('/nowhere', 404, 'no such endpoint'),
+])
+def test_error_responses(network, target, status, message):
+    [(got, _, body)] = get(RouteServer(network), target)
+    assert got == status and message in body['error']
+
+
+def test_other_methods_are_refused(network):
+    [(status, headers, _)] = get(RouteServer(network), '/route', method='POST')
+    assert status == 405 and headers['Allow'] == 'GET'
+
+
+def test_malformed_request_gets_400(network):
+    async def run():
+        server = RouteServer(network)
+        _, port = await server.start('127.0.0.1', 0)
+        try:
+            return await request(port, b'garbage\r\n\r\n')
+        finally:
+            await server.close()
+    status, headers, _ = asyncio.run(run())
+    assert status == 400 and headers['Connection'] == 'close'
+
+
+def test_failures_inside_a_handler_are_500():
+    server = RouteServer(TubeNetwork())
+    server.network.search_stations = lambda *args: 1 / 0
+    [(status, _, body)] = get(server, '/stations?q=ban')
+    assert status == 500 and 'request failed' in body['error']
+
+
+def test_busy_server_answers_503(network):
+    server = RouteServer(network, max_pending=0)
+    [(status, headers, _), (_, _, stats)] = get(server, '/route?from=Brixton&to=Bank', '/stats')
+    assert status == 503 and headers['Retry-After'] == '1'
+    assert stats['rejected'] == 1
+
+
+def test_stations_health_and_stats(network):
+    (s1, _, stations), (s2, _, health), (s3, _, stats) = get(RouteServer(network), '/stations?q=kings&limit=3',
+                                                              '/health', '/stats')
+    assert s1 == s2 == s3 == 200
+    assert stations['stations'][0]['name'] == "King's Cross St Pancras"
+    assert health == {'status': 'ok', 'stations': len(network.get_all_stations())}
+    assert stats['requests'] == 2
+
+
+def test_worker_processes_answer_like_the_thread(network):
+    [(_, _, threaded)] = get(RouteServer(network), '/route?from=Brixton&to=Bank')
+    [(_, _, pooled)] = get(RouteServer(network, workers=1), '/route?from=Brixton&to=Bank')
+    assert pooled == threaded
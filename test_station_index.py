@@ -0,0 +1,38 @@
+import pytest
+
+from station_index import StationIndex
+from tube_network import TubeNetwork
+
+
+@pytest.fixture(scope='module')
+def index() -> StationIndex:
+    return TubeNetwork().station_index
+
+
+@pytest.mark.parametrize('query, station', [
+    ('kings', "King's Cross St Pancras"),
+    ("king's", "King's Cross St Pancras"),
+    ('king’s', "King's Cross St Pancras"),
+    ('kings cross', "King's Cross St Pancras"),
+    ('earls', "Earl's Court"),
+    ('regents', "Regent's Park"),
+    ('queens', "Queen's Park"),
+    ('queens', 'Queensway'),
+])
+def test_apostrophes_are_optional(index, query, station):
+    assert station in index.search(query)
+
+
+def test_spellings_with_and_without_apostrophe_agree(index):
+    assert index.search('kings') == index.search("king's") == index.search('king’s')
+
+
+def test_other_punctuation_separates_words(index):
+    assert "King's Cross St Pancras" in index.search('cross')
+
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_non_positive_limit_returns_nothing(index, limit):
+    assert index.search('ban', limit) == []
+    assert index.search('bnak', limit) == []
+    assert index.prefix_matches('', limit) == []
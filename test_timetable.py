@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+from network_errors import NetworkDataError
+from timetable import Timetable, parse_time
+
+SERVICES = {
+    'services': [{'line': 'Victoria', 'stations': ['Brixton', 'Stockwell', 'Vauxhall'], 'times': [2, 3],
+                  'first': '05:30', 'last': '06:30', 'headway': 5}],
+    'walks': [['Vauxhall', 'Nine Elms', 6]],
+    'min_change': 3,
+    'change_times': {'Stockwell': 4},
+}
+
+STOP_TIMES = """trip,line,station,arrival,departure
+t1,Victoria,Brixton,08:00,08:00
+t1,Victoria,Stockwell,08:02,08:03
+t1,Victoria,Vauxhall,08:05,08:05
+"""
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content if isinstance(content, str) else json.dumps(content), encoding='utf-8')
+    return str(path)
+
+
+def test_services_load_and_route(tmp_path):
+    timetable = Timetable.load(write(tmp_path, 'services.json', SERVICES))
+    journey = timetable.earliest_arrival('Brixton', 'Nine Elms', parse_time('05:31'))
+    assert journey is not None
+    # The 05:35 train, 5 minutes to Vauxhall, then a 6 minute walk.
+    assert journey.departure == parse_time('05:35')
+    assert [leg[0] for leg in journey.legs] == ['Victoria', 'Walk']
+    assert journey.arrival == parse_time('05:46')
+
+
+def test_stop_times_load_and_route(tmp_path):
+    timetable = Timetable.load(write(tmp_path, 'stops.csv', STOP_TIMES))
+    journey = timetable.earliest_arrival('Brixton', 'Vauxhall', parse_time('07:59'))
+    assert journey.arrival == parse_time('08:05')
+    assert timetable.earliest_arrival('Brixton', 'Vauxhall', parse_time('08:01')) is None
+
+
+def with_change(**changes):
+    data = json.loads(json.dumps(SERVICES))
+    for key, value in changes.items():
+        if key.startswith('service_'):
+            data['services'][0][key[len('service_'):]] = value
+        else:
+            data[key] = value
+    return data
+
+
+@pytest.mark.parametrize('data, where', [
+    ([1, 2], 'expected an object'),
+    (with_change(services={'line': 'Victoria'}), "'services' must be a list"),
+    (with_change(walks={'a': 'b'}), "'walks' must be a list"),
+    (with_change(walks=[['Vauxhall', 'Nine Elms']]), 'walks[0]'),
+    (with_change(walks=[['Vauxhall', 'Nine Elms', 'six']]), 'walks[0]'),
+    (with_change(walks=[['Vauxhall', 'Nine Elms', True]]), 'walks[0]'),
+    (with_change(change_times=[['Stockwell', 4]]), "'change_times' must be"),
+    (with_change(change_times={'Stockwell': 'four'}), "change_times['Stockwell']"),
+    (with_change(min_change='3'), 'min_change'),
+    (with_change(min_change=-1), 'min_change'),
+    (with_change(service_headway='3'), 'services[0] headway'),
+    (with_change(service_headway=True), 'services[0] headway'),
+    (with_change(service_headway=0), 'services[0] headway'),
+    (with_change(service_times=[2, '3']), 'services[0] times[1]'),
+    (with_change(service_times=[2]), 'services[0]'),
+    (with_change(service_first=530), 'services[0]'),
+    (with_change(service_last='late'), 'services[0]'),
+    (with_change(service_stations=['Brixton']), 'services[0]'),
+    (with_change(service_line=''), 'services[0]'),
+])
+def test_malformed_services_name_the_entry(tmp_path, data, where):
+    with pytest.raises(NetworkDataError) as excinfo:
+        Timetable.load(write(tmp_path, 'services.json', data))
+    assert where in str(excinfo.value)
+
+
+def test_invalid_json(tmp_path):
+    with pytest.raises(NetworkDataError, match='invalid JSON'):
+        Timetable.load(write(tmp_path, 'services.json', '{"services": ['))
+
+
+@pytest.mark.parametrize('rows, message', [
+    ('t1,Victoria,Brixton,08:00,08:00\nt1,Victoria,Stockwell,07:59,08:00\n', ':3: .*arrives at Stockwell before leaving'),
+    ('t1,Victoria,Brixton,08:00,07:58\n', ':2: .*leaves Brixton before arriving'),
+    ('t1,Victoria,Brixton,08:00,08:00\nt1,Northern,Stockwell,08:02,08:02\n', ':3: trip t1 is on Victoria, not Northern'),
+    ('t1,Victoria,Brixton,8am,08:00\n', ':2: invalid time'),
+    ('t1,Victoria,Brixton\n', ':2: invalid time'),
+    ('t1,Victoria,,08:00,08:00\n', ':2: station must not be empty'),
+])
+def test_malformed_stop_times_name_the_row(tmp_path, rows, message):
+    path = write(tmp_path, 'stops.csv', 'trip,line,station,arrival,departure\n' + rows)
+    with pytest.raises(NetworkDataError, match=message):
+        Timetable.load(path)
+
+
+def test_missing_columns_and_unknown_type(tmp_path):
+    with pytest.raises(NetworkDataError, match='missing column'):
+        Timetable.load(write(tmp_path, 'stops.csv', 'trip,line,station\n'))
+    with pytest.raises(NetworkDataError, match='unsupported'):
+        Timetable.load(write(tmp_path, 'stops.txt', ''))
+
+
+def test_trip_arriving_before_departing_in_code():
+    with pytest.raises(NetworkDataError, match='trip 0'):
+        Timetable([('Victoria', [('Brixton', 0, 60), ('Stockwell', 30, 30)])])
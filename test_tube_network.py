@@ -0,0 +1,62 @@
+import pytest
+
+from tube_network import TubeNetwork
+
+
+class ToyNetwork(TubeNetwork):
+    """Red runs A-B-C-D-E direct; Blue and Green cut the corner with two changes."""
+
+    def _build_network(self):
+        for a, b in [('A', 'B'), ('B', 'C'), ('C', 'D'), ('D', 'E')]:
+            self._add_connection(a, b, 'Red', 2)
+        self._add_connection('A', 'X', 'Blue', 1)
+        self._add_connection('X', 'Y', 'Green', 1)
+        self._add_connection('Y', 'E', 'Blue', 1)
+        self._add_connection('D', 'W', 'Walk', 1)
+
+
+def test_interchanges_are_paid_for():
+    network = ToyNetwork()
+    # Blue-Green-Blue takes 3 minutes plus two changes at 5 each; Red takes 8 with none.
+    assert network.find_route('A', 'E') == [('A', None), ('B', 'Red'), ('C', 'Red'), ('D', 'Red'), ('E', 'Red')]
+    network.INTERCHANGE_PENALTY = 2
+    network.route_cache.clear()
+    assert [line for _, line in network.find_route('A', 'E')] == [None, 'Blue', 'Green', 'Blue']
+
+
+def test_legs_details_and_minutes():
+    network = ToyNetwork()
+    route = network.find_route('A', 'W')
+    assert route[-1] == ('W', 'Walk')
+    assert network.get_route_legs(route) == [('Red', 'A', 'D', 3), ('Walk', 'D', 'W', 1)]
+    assert network.get_route_details(route) == ['Take Red Line from A to D (3 stops)', 'Walk from D to W (1 stops)']
+    assert network.get_route_minutes(route) == 7
+    assert network.get_route_legs([('A', None)]) == [] and network.get_route_minutes([('A', None)]) == 0
+
+
+def test_trivial_unknown_and_unreachable_queries():
+    network = ToyNetwork()
+    network._add_connection('P', 'Q', 'Purple', 2)
+    assert network.find_route('A', 'A') == [('A', None)]
+    assert network.find_route('A', 'Nowhere') is None
+    assert network.find_route('A', 'Q') is None
+
+
+@pytest.mark.parametrize('route, message', [
+    ([('A', None), ('Nowhere', 'Red')], "Unknown station 'Nowhere'"),
+    ([('A', None), ('B', 'Pink')], "Unknown line 'Pink'"),
+    ([('A', None), ('C', 'Red')], 'No open Red connection from A to C'),
+])
+def test_minutes_for_routes_that_cannot_be_priced(route, message):
+    with pytest.raises(ValueError, match=message):
+        ToyNetwork().get_route_minutes(route)
+
+
+def test_station_lookups():
+    network = TubeNetwork()
+    assert network.has_station('Bank') and not network.has_station('Nowhere')
+    assert 'Northern' in network.get_station_lines('Bank')
+    assert 'Walk' not in network.get_station_lines('Bank')
+    assert network.get_all_stations() == sorted(network.graph)
+    with pytest.raises(ValueError):
+        TubeNetwork(engine='teleport')
@@ -0,0 +1,53 @@
+from itertools import combinations
+import random
+
+import pytest
+
+from network_loader import FileTubeNetwork
+from walk_links import distance_metres, nearby_pairs, walk_minutes
+
+
+def brute_force(coordinates, max_metres):
+    pairs = []
+    for a, b in combinations(sorted(coordinates), 2):
+        metres = distance_metres(coordinates[a], coordinates[b])
+        if metres <= max_metres:
+            pairs.append((a, b, metres))
+    return pairs
+
+
+@pytest.mark.parametrize('centre', [(51.5, -0.12), (69.6, 18.9), (-33.9, 151.2), (0.0, 100.0)])
+@pytest.mark.parametrize('max_metres', [150, 500, 2000])
+def test_grid_finds_exactly_the_pairs_in_reach(centre, max_metres):
+    rnd = random.Random(hash((centre, max_metres)))
+    coordinates = {f'S{i:03}': (centre[0] + rnd.uniform(-0.03, 0.03), centre[1] + rnd.uniform(-0.05, 0.05))
+                   for i in range(300)}
+    found, expected = nearby_pairs(coordinates, max_metres), brute_force(coordinates, max_metres)
+    assert [(a, b) for a, b, _ in found] == [(a, b) for a, b, _ in expected]
+    assert all(abs(x[2] - y[2]) < 1e-6 for x, y in zip(found, expected))
+
+
+def test_distances_and_minutes():
+    # Bank to Monument: about 250 m apart as the crow flies.
+    assert 150 < distance_metres((51.5133, -0.0886), (51.5108, -0.0863)) < 400
+    assert walk_minutes(0) == 2
+    assert walk_minutes(400) == 9
+    assert nearby_pairs({}, 500) == []
+    with pytest.raises(ValueError):
+        nearby_pairs({'A': (51.5, 0.0)}, 0)
+
+
+def test_walk_radius_adds_links_once(tmp_path):
+    path = tmp_path / 'network.json'
+    path.write_text('{"lines": [{"name": "Central", "stations": ["Bank", "St Paul\'s", "Chancery Lane"]},'
+                    ' {"name": "District", "stations": ["Monument", "Cannon Street"]}],'
+                    ' "walks": [["Bank", "Monument", 4]],'
+                    ' "stations": {"Bank": [51.5133, -0.0886], "Monument": [51.5108, -0.0863],'
+                    ' "Cannon Street": [51.5113, -0.0904], "Chancery Lane": [51.5185, -0.1111]}}')
+    network = FileTubeNetwork(str(path), walk_radius=500)
+    walks = {(a, b, time) for a, edges in network.graph.items() for b, line, time in edges if line == 'Walk'}
+    # The listed Bank-Monument walk is kept; the nearby pairs without one get a derived walk.
+    assert ('Bank', 'Monument', 4) in walks and len([w for w in walks if w[:2] == ('Bank', 'Monument')]) == 1
+    assert any(w[:2] == ('Bank', 'Cannon Street') for w in walks)
+    assert not any('Chancery Lane' in w[:2] for w in walks)
+    assert network.add_walk_links(500) == 0
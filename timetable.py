@@ -0,0 +1,315 @@
+from array import array
+from bisect import bisect_left
+import csv
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from network_errors import NetworkDataError
+
+# Departure-time-aware routing over real services instead of static edge minutes.
+#
+# A Timetable is a day's worth of elementary connections — one train running
+# from one station to the next, with its departure and arrival time — sorted by
+# departure. Earliest-arrival queries use the Connection Scan Algorithm: a
+# single pass over the connections leaving at or after the requested time,
+# stopping as soon as nothing departing later can beat the best arrival found.
+# There is no priority queue and no time-expanded graph, so a query touches only
+# the connections inside its own travel window.
+#
+# Times are seconds after midnight of the service day; like GTFS, services running
+# past midnight keep counting (25:10 is 01:10 the next morning).
+#
+# Two file formats are read:
+#
+#   JSON, services given by frequency:
+#     {"services": [{"line": "Victoria", "stations": ["Brixton", "Stockwell", ...],
+#                    "times": [2, 3, ...], "first": "05:30", "last": "00:30",
+#                    "headway": 3, "both_directions": true}],
+#      "walks": [["Bank", "Monument", 5]],
+#      "min_change": 3, "change_times": {"Bank": 5}}
+#   `times` are minutes per segment (default 2), `headway` minutes between trains.
+#
+#   CSV, explicit trips: `trip,line,station,arrival,departure` rows, each trip's
+#   stops in order.
+
+DEFAULT_CHANGE_MINUTES = 2
+DEFAULT_SEGMENT_MINUTES = 2
+
+INFINITY = 1 << 40
+
+
+def parse_time(text: str) -> int:
+    """'HH:MM' or 'HH:MM:SS' (hours may exceed 23) to seconds after midnight."""
+    if not isinstance(text, str):
+        raise ValueError(f"invalid time {text!r}, expected HH:MM or HH:MM:SS")
+    parts = text.strip().split(':')
+    if len(parts) not in (2, 3) or not all(p.isdigit() for p in parts):
+        raise ValueError(f"invalid time {text!r}, expected HH:MM or HH:MM:SS")
+    hours, minutes, seconds = (int(p) for p in parts + ['0'] * (3 - len(parts)))
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def format_time(seconds: int) -> str:
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours % 24:02d}:{rest // 60:02d}"
+
+
+def _is_name(value) -> bool:
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _check_minutes(where: str, value, zero: bool = False) -> float:
+    """`value` as minutes, if it is a positive number (or zero, where `zero` allows it)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or (value == 0 and not zero):
+        expected = 'a non-negative' if zero else 'a positive'
+        raise NetworkDataError(f"{where}: expected {expected} number of minutes, got {value!r}")
+    return value
+
+
+class Journey(NamedTuple):
+    """An earliest-arrival journey. `legs` uses get_route_legs' (line, start_station,
+    end_station, stops) format; `leg_times` gives each leg's (departure, arrival)."""
+    origin: str
+    destination: str
+    departure: int
+    arrival: int
+    legs: List[Tuple[str, str, str, int]]
+    leg_times: List[Tuple[int, int]]
+
+    @property
+    def duration_minutes(self) -> int:
+        return (self.arrival - self.departure + 59) // 60
+
+    def describe(self) -> List[str]:
+        details = []
+        for (line, start, end, stops), (dep, arr) in zip(self.legs, self.leg_times):
+            if line == 'Walk':
+                details.append(f"{format_time(dep)} Walk from {start} to {end}, arrive {format_time(arr)}")
+            else:
+                details.append(f"{format_time(dep)} Take {line} Line from {start} to {end} "
+                               f"({stops} stops), arrive {format_time(arr)}")
+        return details
+
+
+class Timetable:
+    def __init__(self, trips: List[Tuple[str, List[Tuple[str, int, int]]]],
+                 walks: Optional[List[Tuple[str, str, int]]] = None,
+                 min_change: int = DEFAULT_CHANGE_MINUTES * 60,
+                 change_times: Optional[Dict[str, int]] = None):
+        """`trips` are (line, [(station, arrival, departure), ...]) in stop order;
+        `walks` are (station, station, seconds) links usable both ways; change
+        times are seconds needed to get from one train to another at a station."""
+        names = {station for _, stops in trips for station, _, _ in stops}
+        names.update(station for a, b, _ in walks or () for station in (a, b))
+        self.stations: List[str] = sorted(names)
+        self.station_ids: Dict[str, int] = {s: i for i, s in enumerate(self.stations)}
+        self.lines: List[str] = sorted({line for line, _ in trips})
+        line_ids = {line: i for i, line in enumerate(self.lines)}
+
+        connections = []
+        self.trip_lines = array('H')
+        for trip, (line, stops) in enumerate(trips):
+            self.trip_lines.append(line_ids[line])
+            for seq in range(len(stops) - 1):
+                (a, _, dep), (b, arr, _) = stops[seq], stops[seq + 1]
+                if arr < dep:
+                    raise NetworkDataError(f"{line} trip {trip}: arrives at {b} before leaving {a}")
+                connections.append((dep, arr, self.station_ids[a], self.station_ids[b], trip, seq))
+        connections.sort()
+
+        # Connections as parallel arrays, ordered by (departure, arrival).
+        self.dep_time = array('i', (c[0] for c in connections))
+        self.arr_time = array('i', (c[1] for c in connections))
+        self.dep_station = array('i', (c[2] for c in connections))
+        self.arr_station = array('i', (c[3] for c in connections))
+        self.trip = array('i', (c[4] for c in connections))
+        self.seq = array('i', (c[5] for c in connections))
+        self.trip_count = len(trips)
+
+        self.footpaths: Dict[int, List[Tuple[int, int]]] = {}
+        for a, b, seconds in walks or ():
+            ia, ib = self.station_ids[a], self.station_ids[b]
+            self.footpaths.setdefault(ia, []).append((ib, seconds))
+            self.footpaths.setdefault(ib, []).append((ia, seconds))
+
+        self.change_time = array('i', [min_change]) * len(self.stations)
+        for station, seconds in (change_times or {}).items():
+            if station in self.station_ids:
+                self.change_time[self.station_ids[station]] = seconds
+
+    def __len__(self) -> int:
+        return len(self.dep_time)
+
+    @classmethod
+    def load(cls, path: str) -> 'Timetable':
+        if path.lower().endswith('.json'):
+            return cls._load_services(path)
+        if path.lower().endswith('.csv'):
+            return cls._load_stop_times(path)
+        raise NetworkDataError(f"{path}: unsupported timetable file type (expected .json or .csv)")
+
+    @classmethod
+    def _load_services(cls, path: str) -> 'Timetable':
+        with open(path, encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise NetworkDataError(f"{path}: invalid JSON ({e})") from None
+
+        if not isinstance(data, dict):
+            raise NetworkDataError(f"{path}: expected an object with 'services'")
+        for key, kind, expected in (('services', list, 'a list'), ('walks', list, 'a list'),
+                                    ('change_times', dict, 'an object mapping stations to minutes')):
+            if not isinstance(data.get(key, kind()), kind):
+                raise NetworkDataError(f"{path}: '{key}' must be {expected}")
+
+        trips: List[Tuple[str, List[Tuple[str, int, int]]]] = []
+        for i, service in enumerate(data.get('services', [])):
+            where = f"{path}: services[{i}]"
+            if not isinstance(service, dict):
+                raise NetworkDataError(f"{where}: expected an object")
+            line, stations = service.get('line'), service.get('stations')
+            if not _is_name(line):
+                raise NetworkDataError(f"{where}: 'line' must be a non-empty string, got {line!r}")
+            if not isinstance(stations, list) or len(stations) < 2 or not all(_is_name(s) for s in stations):
+                raise NetworkDataError(f"{where}: 'stations' must list at least two station names")
+            times = service.get('times', [DEFAULT_SEGMENT_MINUTES] * (len(stations) - 1))
+            if not isinstance(times, list) or len(times) != len(stations) - 1:
+                raise NetworkDataError(f"{where}: 'times' must have one entry per segment ({len(stations) - 1})")
+            for j, minutes in enumerate(times):
+                _check_minutes(f"{where} times[{j}]", minutes)
+            headway = int(_check_minutes(f"{where} headway", service.get('headway')) * 60)
+            try:
+                first, last = parse_time(service.get('first')), parse_time(service.get('last'))
+            except ValueError as e:
+                raise NetworkDataError(f"{where}: {e}") from None
+            if last < first:
+                last += 24 * 3600  # runs past midnight
+
+            patterns = [(stations, times)]
+            if service.get('both_directions', True):
+                patterns.append((stations[::-1], times[::-1]))
+            for stops, segment_minutes in patterns:
+                offsets = [0]
+                for minutes in segment_minutes:
+                    offsets.append(offsets[-1] + int(minutes * 60))
+                for start in range(first, last + 1, headway):
+                    trips.append((line, [(s, start + o, start + o) for s, o in zip(stops, offsets)]))
+
+        walks = []
+        for i, entry in enumerate(data.get('walks', [])):
+            where = f"{path}: walks[{i}]"
+            if not isinstance(entry, list) or len(entry) != 3 or not _is_name(entry[0]) or not _is_name(entry[1]):
+                raise NetworkDataError(f"{where}: expected [station, station, minutes]")
+            walks.append((entry[0], entry[1], int(_check_minutes(where, entry[2]) * 60)))
+        change_times = {station: int(_check_minutes(f"{path}: change_times[{station!r}]", minutes, zero=True) * 60)
+                        for station, minutes in data.get('change_times', {}).items()}
+        min_change = _check_minutes(f"{path}: min_change", data.get('min_change', DEFAULT_CHANGE_MINUTES), zero=True)
+        return cls(trips, walks, int(min_change * 60), change_times)
+
+    @classmethod
+    def _load_stop_times(cls, path: str) -> 'Timetable':
+        trips: Dict[str, Tuple[str, List[Tuple[str, int, int]]]] = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            missing = {'trip', 'line', 'station', 'arrival', 'departure'} - set(reader.fieldnames or ())
+            if missing:
+                raise NetworkDataError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+            for row in reader:
+                where = f"{path}:{reader.line_num}"
+                for column in ('trip', 'line', 'station'):
+                    if not _is_name(row[column]):
+                        raise NetworkDataError(f"{where}: {column} must not be empty")
+                try:
+                    stop = (row['station'], parse_time(row['arrival']), parse_time(row['departure']))
+                except ValueError as e:
+                    raise NetworkDataError(f"{where}: {e}") from None
+                if stop[2] < stop[1]:
+                    raise NetworkDataError(f"{where}: trip {row['trip']} leaves {stop[0]} before arriving there")
+                line, stops = trips.setdefault(row['trip'], (row['line'], []))
+                if line != row['line']:
+                    raise NetworkDataError(f"{where}: trip {row['trip']} is on {line}, not {row['line']}")
+                if stops and stop[1] < stops[-1][2]:
+                    raise NetworkDataError(f"{where}: trip {row['trip']} arrives at "
+                                           f"{stop[0]} before leaving {stops[-1][0]}")
+                stops.append(stop)
+        return cls(list(trips.values()))
+
+    def earliest_arrival(self, origin: str, destination: str, depart_at: int) -> Optional[Journey]:
+        """The journey leaving `origin` no earlier than `depart_at` (seconds) that
+        reaches `destination` first, or None if no service gets there."""
+        if origin not in self.station_ids or destination not in self.station_ids:
+            return None
+        source, target = self.station_ids[origin], self.station_ids[destination]
+        if source == target:
+            return Journey(origin, destination, depart_at, depart_at, [], [])
+
+        dep_time, arr_time, dep_station, arr_station = self.dep_time, self.arr_time, self.dep_station, self.arr_station
+        trip_of, change_time, footpaths = self.trip, self.change_time, self.footpaths
+
+        # ready[s]: earliest time a new train can be boarded at s (arrival plus change
+        # time, or the walk's arrival). How each station was reached is kept in
+        # `reached_by` as (enter connection, exit connection) for a ride or
+        # (-1, from station, left at, walk seconds) for a walk.
+        ready = [INFINITY] * len(self.stations)
+        reached_by: Dict[int, tuple] = {}
+        boarded = [-1] * self.trip_count
+        best, best_by = INFINITY, None
+
+        ready[source] = depart_at
+        for neighbor, seconds in footpaths.get(source, ()):
+            if depart_at + seconds < ready[neighbor]:
+                ready[neighbor] = depart_at + seconds
+                reached_by[neighbor] = (-1, source, depart_at, seconds)
+                if neighbor == target:
+                    best, best_by = depart_at + seconds, reached_by[neighbor]
+
+        for c in range(bisect_left(dep_time, depart_at), len(dep_time)):
+            departs = dep_time[c]
+            if departs >= best:
+                break
+            trip = trip_of[c]
+            if boarded[trip] < 0:
+                if ready[dep_station[c]] > departs:
+                    continue
+                boarded[trip] = c
+            arrives, station = arr_time[c], arr_station[c]
+            if station == target and arrives < best:
+                best, best_by = arrives, (boarded[trip], c)
+            if arrives + change_time[station] < ready[station]:
+                ready[station] = arrives + change_time[station]
+                reached_by[station] = (boarded[trip], c)
+                for neighbor, seconds in footpaths.get(station, ()):
+                    walked = arrives + seconds
+                    if walked < ready[neighbor]:
+                        ready[neighbor] = walked
+                        reached_by[neighbor] = (-1, station, arrives, seconds)
+                        if neighbor == target and walked < best:
+                            best, best_by = walked, reached_by[neighbor]
+
+        if best_by is None:
+            return None
+        return self._unwind(origin, destination, source, target, reached_by, best_by)
+
+    def _unwind(self, origin: str, destination: str, source: int, target: int,
+                reached_by: Dict[int, tuple], entry: tuple) -> Journey:
+        legs: List[Tuple[str, str, str, int]] = []
+        leg_times: List[Tuple[int, int]] = []
+        at = target
+        while True:
+            if entry[0] < 0:
+                _, station, left, seconds = entry
+                legs.append(('Walk', self.stations[station], self.stations[at], 1))
+                leg_times.append((left, left + seconds))
+            else:
+                enter, exit_ = entry
+                station = self.dep_station[enter]
+                legs.append((self.lines[self.trip_lines[self.trip[enter]]], self.stations[station],
+                             self.stations[at], self.seq[exit_] - self.seq[enter] + 1))
+                leg_times.append((self.dep_time[enter], self.arr_time[exit_]))
+            if station == source:
+                break
+            at, entry = station, reached_by[station]
+        legs.reverse()
+        leg_times.reverse()
+        return Journey(origin, destination, leg_times[0][0], leg_times[-1][1], legs, leg_times)
@@ -1,13 +1,66 @@
-from typing import Dict, List, Tuple, Optional
-from collections import defaultdict, deque
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Sequence, Set, Tuple, Optional, Union
+from array import array
+from collections import defaultdict
+from time import perf_counter
+
+from compiled_graph import CompiledGraph, RouteConstraints
+from disruptions import DisruptionReport, Disruptions, EdgeChange
+from goal_directed import Landmarks, alt_search, bidirectional_search
+from instrumentation import QueryHook, QueryStats, SearchInstrumentation
+from route_cache import MISSING, RouteCache
+from station_index import StationIndex
+from walk_links import DEFAULT_WALK_RADIUS, nearby_pairs, walk_minutes
+
+# The process pool and the engines most queries never touch are imported where
+# they are used, so that importing this module (the GUI, batch_route.py) stays quick.
+if TYPE_CHECKING:
+    from alternatives import AlternativeRoute
+    from contraction import ContractionHierarchy
+    from isochrone import Isochrone
+    from pareto import ParetoRoute
+    from route_matrix import RouteMatrix
 
 # Simple representation of the London Underground network
 # This is a curated subset sufficient for demo purposes and can be expanded.
 # Structure: graph[station] = list of (neighbor_station, line_name, travel_time_minutes)
 
 class TubeNetwork:
-    def __init__(self):
+    # Search engines find_route can use. 'dijkstra', the default, is the only one
+    # whose routes are fixed, ties included. The others find a route of the same
+    # cost but, where several routes tie, not necessarily the same one, so they are
+    # an opt-in for services that accept any fastest route: the goal-directed ones
+    # settle fewer states on point-to-point queries, and 'ch' answers from a
+    # contraction hierarchy built once per graph version.
+    ENGINES = ('dijkstra', 'bidirectional', 'alt', 'ch')
+
+    def __init__(self, precompute: bool = False, cache_size: int = 1024, engine: str = 'dijkstra'):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(self.ENGINES)}")
         self.graph = defaultdict(list)  # type: Dict[str, List[Tuple[str, str, int]]]
+        # Bumped on every graph change so derived structures can tell they are stale.
+        self.graph_version = 0
+        # When set, find_route answers from the all-pairs `route_matrix` instead of searching.
+        self.precompute = precompute
+        self.engine = engine
+        # States the most recent searched find_route settled (cache and matrix hits don't search).
+        self.last_settled_states = 0
+        # (relaxed, frontier_peak, penalties) from the most recent search, None entries for
+        # engines that don't count them; None itself when the last find_route didn't search.
+        self.last_search_work: Optional[Tuple[Optional[int], Optional[int], Optional[int]]] = None
+        # Per-query statistics collector, off (None) unless enable_instrumentation is called.
+        self.instrumentation: Optional[SearchInstrumentation] = None
+        # Live closures, suspensions and re-timings; `graph` itself is never edited for them.
+        self.disruptions = Disruptions()
+        # (latitude, longitude) of each station whose position is known; see add_walk_links.
+        self.coordinates: Dict[str, Tuple[float, float]] = {}
+        self._compiled: Optional[CompiledGraph] = None
+        self._landmarks: Optional[Landmarks] = None
+        self._contraction_hierarchy: Optional['ContractionHierarchy'] = None
+        self._route_matrix: Optional['RouteMatrix'] = None
+        self._station_index: Optional[StationIndex] = None
+        # LRU of recent find_route answers keyed on (start, end, INTERCHANGE_PENALTY);
+        # cache_size=0 turns it off.
+        self.route_cache = RouteCache(cache_size)
         self.line_colors = {
             'Bakerloo': '#B36305',
             'Central': '#E32017',
@@ -26,11 +79,37 @@ class TubeNetwork:
         }
         
         self._build_network()
-        
+
+    def __getstate__(self):
+        # Copies (e.g. for process-pool workers) take the network and the indexes built
+        # from it, but not the per-process extras: the route cache starts empty, the
+        # all-pairs matrix is rebuilt on first use, and instrumentation — whose hooks
+        # may be lambdas or bound methods that can't be pickled — is left off.
+        state = self.__dict__.copy()
+        state['route_cache'] = RouteCache(self.route_cache.capacity)
+        state['instrumentation'] = None
+        state['_route_matrix'] = None
+        return state
+
     def _add_connection(self, a: str, b: str, line: str, time: int = 2):
         self.graph[a].append((b, line, time))
         self.graph[b].append((a, line, time))
-        
+        self.graph_version += 1
+
+    def add_walk_links(self, max_metres: float = DEFAULT_WALK_RADIUS) -> int:
+        """Join every two stations with known coordinates that are at most `max_metres`
+        apart by a Walk link timed from the distance, unless they already have one.
+        Returns how many links were added."""
+        walks = {(station, neighbor) for station, edges in self.graph.items()
+                 for neighbor, line, _ in edges if line == 'Walk'}
+        added = 0
+        placed = {station: point for station, point in self.coordinates.items() if station in self.graph}
+        for a, b, metres in nearby_pairs(placed, max_metres):
+            if (a, b) not in walks:
+                self._add_connection(a, b, 'Walk', walk_minutes(metres))
+                added += 1
+        return added
+
     def _build_network(self):
         # Minimal but useful network sample; can be extended without changing algorithm
         # Victoria Line
@@ -127,15 +206,23 @@ class TubeNetwork:
         self._add_connection('Bond Street','Oxford Circus','Walk', 4)
         
     def get_all_stations(self) -> List[str]:
-        return sorted(self.graph.keys())
-    
+        return list(self.station_index.stations)
+
+    def has_station(self, station: str) -> bool:
+        return station in self.graph
+
     def get_station_lines(self, station: str) -> List[str]:
-        return sorted({line for neighbor, line, time in self.graph.get(station, []) if line != 'Walk'})
+        return list(self.station_index.lines_at(station))
+
+    def search_stations(self, query: str, limit: int = 20) -> List[str]:
+        """Typeahead: stations matching what the user has typed so far."""
+        return self.station_index.search(query, limit)
 
     # Extra cost (minutes) applied whenever a route changes line at a station.
     INTERCHANGE_PENALTY = 5
 
-    def find_route(self, start: str, end: str) -> Optional[List[Tuple[str, Optional[str]]]]:
+    def find_route(self, start: str, end: str, avoid_lines: Iterable[str] = (), avoid_stations: Iterable[str] = (),
+                   no_walking: bool = False) -> Optional[List[Tuple[str, Optional[str]]]]:
         """Find the fastest route using Dijkstra over (station, arrival line) states,
         charging an interchange penalty whenever the line changes. Plain BFS on
         stations alone would treat line changes as free and could "optimize" a
@@ -146,65 +233,396 @@ class TubeNetwork:
         used for each hop, so leg-building never has to guess which line was
         used when several lines happen to connect the same pair of adjacent
         stations.
+
+        `avoid_lines`, `avoid_stations` and `no_walking` restrict this one query
+        without touching the network: the route found is the fastest that rides
+        none of those lines, passes through none of those stations and (with
+        `no_walking`) takes no Walk links. Unknown names, or avoiding the start or
+        end station itself, are a ValueError. The 'ch' engine and the route matrix
+        only know the whole network, so constrained queries fall back to Dijkstra.
         """
+        constraints = None
+        if avoid_lines or avoid_stations or no_walking:
+            # A single name is one line or station, not a collection of letters.
+            constraints = RouteConstraints(frozenset([avoid_lines] if isinstance(avoid_lines, str) else avoid_lines),
+                                           frozenset([avoid_stations] if isinstance(avoid_stations, str) else avoid_stations),
+                                           no_walking)
+            if start in constraints.avoid_stations or end in constraints.avoid_stations:
+                raise ValueError("A route cannot avoid its own start or end station")
+        if self.instrumentation is not None:
+            return self._find_route_instrumented(start, end, constraints)
+        return self._find_route(start, end, constraints)
+
+    def _find_route(self, start: str, end: str,
+                    constraints: Optional[RouteConstraints] = None) -> Optional[List[Tuple[str, Optional[str]]]]:
         if start not in self.graph or end not in self.graph:
             return None
         if start == end:
             return [(start, None)]
 
-        # `committed_line` is the last *real* line ridden (never 'Walk'), used only to
-        # decide whether boarding the next real line is a genuine interchange. Walking
-        # edges pass it through unchanged: their own time already prices in the
-        # transfer, so they neither trigger a penalty themselves nor shield a real
-        # line change on either side of them from being charged exactly once.
-        def key(station: str, committed_line: str) -> Tuple[str, str]:
-            return (station, committed_line)
-
-        dist: Dict[Tuple[str, str], int] = {key(start, ''): 0}
-        # Maps a state key to (predecessor state key, literal edge line used to arrive), or None for the start.
-        prev: Dict[Tuple[str, str], Optional[Tuple[Tuple[str, str], str]]] = {key(start, ''): None}
-        frontier: List[Tuple[str, str]] = [key(start, '')]
-        end_key: Optional[Tuple[str, str]] = None
-
-        while frontier:
-            min_idx = 0
-            for i in range(1, len(frontier)):
-                if dist.get(frontier[i], float('inf')) < dist.get(frontier[min_idx], float('inf')):
-                    min_idx = i
-            current_key = frontier.pop(min_idx)
-            current_dist = dist[current_key]
-            current_station, current_committed_line = current_key
-
-            if current_station == end:
-                end_key = current_key
-                break
-
-            for neighbor, line, time in self.graph[current_station]:
-                is_walk = line == 'Walk'
-                new_committed_line = current_committed_line if is_walk else line
-                is_real_change = (not is_walk) and current_committed_line != '' and line != current_committed_line
-                penalty = self.INTERCHANGE_PENALTY if is_real_change else 0
-                new_dist = current_dist + time + penalty
-                neighbor_key = key(neighbor, new_committed_line)
-                if new_dist < dist.get(neighbor_key, float('inf')):
-                    dist[neighbor_key] = new_dist
-                    prev[neighbor_key] = (current_key, line)
-                    frontier.append(neighbor_key)
-
-        if end_key is None:
+        # Constrained answers are cached beside unconstrained ones, under a longer key.
+        cache_key = (start, end, self.INTERCHANGE_PENALTY) + ((constraints,) if constraints else ())
+        if self.route_cache.enabled:
+            cached = self.route_cache.get(cache_key, self.graph_version)
+            if cached is not MISSING:
+                return list(cached) if cached is not None else None
+
+        route = self._compute_route(start, end, constraints)
+        self.route_cache.put(cache_key, tuple(route) if route is not None else None, self.graph_version)
+        return route
+
+    def _find_route_instrumented(self, start: str, end: str,
+                                 constraints: Optional[RouteConstraints]) -> Optional[List[Tuple[str, Optional[str]]]]:
+        hits = self.route_cache.hits
+        self.last_search_work = None
+        t0 = perf_counter()
+        route = self._find_route(start, end, constraints)
+        wall_ms = (perf_counter() - t0) * 1000
+        work = self.last_search_work
+        settled = self.last_settled_states if work is not None else 0
+        self.instrumentation.record(QueryStats(
+            start, end, self._query_engine(constraints), self.route_cache.hits != hits,
+            route is not None, settled, *(work or (0, 0, 0)), wall_ms))
+        return route
+
+    def enable_instrumentation(self, hook: Optional[QueryHook] = None) -> SearchInstrumentation:
+        """Start recording a QueryStats for every find_route call (batched and
+        find_routes_from queries are not included); `hook` is called with each one."""
+        if self.instrumentation is None:
+            self.instrumentation = SearchInstrumentation()
+        if hook is not None:
+            self.instrumentation.add_hook(hook)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        self.instrumentation = None
+
+    def _query_engine(self, constraints: Optional[RouteConstraints]) -> str:
+        """Which engine answers a find_route query ('matrix' for the route matrix)."""
+        if constraints is not None and (self.precompute or self.engine == 'ch'):
+            return 'dijkstra'
+        return 'matrix' if self.precompute else self.engine
+
+    def _compute_route(self, start: str, end: str,
+                       constraints: Optional[RouteConstraints] = None) -> Optional[List[Tuple[str, Optional[str]]]]:
+        engine = self._query_engine(constraints)
+        if engine == 'matrix':
+            return self.route_matrix.route(start, end)
+
+        compiled = self.compiled
+        mask = compiled.edge_mask(constraints) if constraints is not None else None
+        self.last_search_work = (None, None, None)
+        source, target = compiled.station_ids[start], compiled.station_ids[end]
+        if engine == 'bidirectional':
+            route, self.last_settled_states = bidirectional_search(compiled, source, target,
+                                                                   self.INTERCHANGE_PENALTY, mask)
+            return route
+        if engine == 'ch':
+            route, self.last_settled_states = self.contraction_hierarchy.route(source, target)
+            return route
+        if engine == 'alt':
+            route, self.last_settled_states = alt_search(compiled, self.landmarks, source, target,
+                                                         self.INTERCHANGE_PENALTY, mask)
+            return route
+
+        tree = compiled.search(source, target, self.INTERCHANGE_PENALTY, mask=mask)
+        self.last_settled_states = tree.settled
+        self.last_search_work = (tree.relaxed, tree.frontier_peak, tree.penalties)
+        end_state = tree.reached.get(target)
+        if end_state is None:
             return None
+        return compiled.unwind(tree.prev, end_state)
+
+    def find_pareto_routes(self, start: str, end: str,
+                           criteria: Sequence[str] = ('interchanges',)) -> List['ParetoRoute']:
+        """Every route that is not beaten on travel minutes and all of `criteria`
+        ('interchanges', 'walk') at once, fastest first — from the quickest journey
+        to the one with fewest changes, instead of the single trade-off the
+        interchange penalty picks. Each option's `route` works with get_route_legs."""
+        from pareto import ParetoRoute, pareto_search
+        if start not in self.graph or end not in self.graph:
+            return []
+        if start == end:
+            return [ParetoRoute([(start, None)], 0, 0, 0)]
+        compiled = self.compiled
+        # Landmark bounds find the fastest options early, and those prune everything else.
+        return pareto_search(compiled, compiled.station_ids[start], compiled.station_ids[end], criteria,
+                             self.landmarks)
+
+    def find_alternative_routes(self, start: str, end: str, k: int = 3) -> List['AlternativeRoute']:
+        """Up to `k` cheapest loopless routes, cheapest (find_route's) first, each with
+        its penalised minutes — e.g. the options left when a disruption hits the
+        usual one. Variants that differ only in a Walk link count once."""
+        from alternatives import AlternativeRoute, k_shortest_routes
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k!r}")
+        if start not in self.graph or end not in self.graph:
+            return []
+        if start == end:
+            return [AlternativeRoute([(start, None)], 0)]
+        compiled = self.compiled
+        return k_shortest_routes(compiled, compiled.station_ids[start], compiled.station_ids[end], k,
+                                 self.INTERCHANGE_PENALTY, first=self.find_route(start, end))
+
+    def find_routes_from(self, origin: str, destinations: Iterable[str]) -> Iterator[Tuple[str, Optional[List[Tuple[str, Optional[str]]]]]]:
+        """Route from one origin to many destinations with a single search, settling
+        states until every destination has been reached. Yields (destination, route)
+        in the order given; each route is exactly what find_route(origin, destination)
+        would return."""
+        destinations = list(destinations)
+        if origin not in self.graph or self.precompute:
+            for destination in destinations:
+                yield destination, self.find_route(origin, destination)
+            return
+
+        compiled = self.compiled
+        wanted = {compiled.station_ids[d] for d in destinations if d in self.graph and d != origin}
+        prev, reached = {}, {}
+        if wanted:
+            tree = compiled.search(compiled.station_ids[origin], penalty=self.INTERCHANGE_PENALTY, stop_at=wanted)
+            prev, reached = tree.prev, tree.reached
+
+        for destination in destinations:
+            if destination not in self.graph or destination == origin:
+                yield destination, self.find_route(origin, destination)
+                continue
+            end_state = reached.get(compiled.station_ids[destination])
+            yield destination, compiled.unwind(prev, end_state) if end_state is not None else None
+
+    def find_routes(self, pairs: Iterable[Tuple[str, str]], workers: int = 0) -> Iterator[Tuple[str, str, Optional[List[Tuple[str, Optional[str]]]]]]:
+        """Route many (start, end) pairs, running one search per distinct origin.
+
+        Yields (start, end, route) grouped by origin, origins in order of first
+        appearance. With `workers` > 1 the origins are spread across a process pool;
+        each worker receives a copy of this network once, when it starts, without its
+        route cache, route matrix or instrumentation (see __getstate__).
+        """
+        by_origin: Dict[str, List[str]] = {}
+        for start, end in pairs:
+            by_origin.setdefault(start, []).append(end)
+
+        if workers > 1 and len(by_origin) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            self.compiled  # build once here so workers inherit it instead of each rebuilding
+            with ProcessPoolExecutor(workers, initializer=_init_batch_worker, initargs=(self,)) as pool:
+                chunksize = max(1, len(by_origin) // (workers * 4))
+                for start, results in zip(by_origin, pool.map(_batch_worker, by_origin.items(), chunksize=chunksize)):
+                    for end, route in results:
+                        yield start, end, route
+        else:
+            for start, ends in by_origin.items():
+                for end, route in self.find_routes_from(start, ends):
+                    yield start, end, route
 
-        # Reconstruct path
-        path: List[Tuple[str, Optional[str]]] = []
-        cur_key: Optional[Tuple[str, str]] = end_key
-        while cur_key is not None:
-            station = cur_key[0]
-            entry = prev[cur_key]
-            edge_line = entry[1] if entry is not None else None
-            path.append((station, edge_line))
-            cur_key = entry[0] if entry is not None else None
-        path.reverse()
-        return path
+    def isochrone(self, origins: Union[str, Iterable[str]], budget_minutes: int) -> 'Isochrone':
+        """Every station reachable within `budget_minutes` (penalised, as find_route
+        counts them) of the origin, or of the nearest of several origins, from one
+        bounded search rather than a find_route per station."""
+        from isochrone import Isochrone
+        origins = (origins,) if isinstance(origins, str) else tuple(origins)
+        if not origins:
+            raise ValueError("isochrone needs at least one origin")
+        if budget_minutes < 0:
+            raise ValueError(f"Budget must not be negative, got {budget_minutes!r}")
+        for origin in origins:
+            self._check_station(origin)
+        compiled = self.compiled
+        return Isochrone(origins, budget_minutes, compiled.stations, compiled.station_ids,
+                         self._isochrone_minutes(origins, budget_minutes))
+
+    def isochrones(self, origins: Iterable[str], budget_minutes: int, workers: int = 0) -> Iterator[Tuple[str, 'Isochrone']]:
+        """One isochrone per origin, yielded in order as each is ready, so large
+        batches never hold more than a chunk of results. With `workers` > 1 the
+        origins are spread across a process pool, as in find_routes."""
+        from isochrone import Isochrone
+        origins = list(origins)
+        if budget_minutes < 0:
+            raise ValueError(f"Budget must not be negative, got {budget_minutes!r}")
+        for origin in origins:
+            self._check_station(origin)
+        compiled = self.compiled
+        if workers > 1 and len(origins) > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(workers, initializer=_init_batch_worker, initargs=(self,)) as pool:
+                chunksize = max(1, len(origins) // (workers * 4))
+                results = pool.map(_isochrone_worker, ((origin, budget_minutes) for origin in origins),
+                                   chunksize=chunksize)
+                for origin, minutes in zip(origins, results):
+                    yield origin, Isochrone((origin,), budget_minutes, compiled.stations, compiled.station_ids, minutes)
+        else:
+            for origin in origins:
+                yield origin, Isochrone((origin,), budget_minutes, compiled.stations, compiled.station_ids,
+                                        self._isochrone_minutes((origin,), budget_minutes))
+
+    def _isochrone_minutes(self, origins: Tuple[str, ...], budget_minutes: int) -> array:
+        from isochrone import UNREACHED, bounded_search
+        compiled = self.compiled
+        if self.precompute and len(origins) == 1:
+            # The matrix row already holds every distance from this origin.
+            matrix, n = self.route_matrix, len(compiled.stations)
+            row = compiled.station_ids[origins[0]] * n
+            return array('i', (d if 0 <= d <= budget_minutes else UNREACHED
+                               for d in matrix.distance[row:row + n]))
+        return bounded_search(compiled, (compiled.station_ids[o] for o in origins), budget_minutes,
+                              self.INTERCHANGE_PENALTY)
+
+    def close_station(self, station: str) -> DisruptionReport:
+        """Close a station: no route may start, end or pass through it."""
+        self._check_station(station)
+        return self._disrupt(self._with_neighbours(station), lambda d: d.closed_stations.add(station))
+
+    def reopen_station(self, station: str) -> DisruptionReport:
+        self._check_station(station)
+        return self._disrupt(self._with_neighbours(station), lambda d: d.closed_stations.discard(station))
+
+    def close_connection(self, a: str, b: str, line: Optional[str] = None) -> DisruptionReport:
+        """Close the link between two adjacent stations, in both directions, on one
+        line or (line=None) on every line that runs between them."""
+        keys = self._connection_keys(a, b, line)
+        return self._disrupt({a, b}, lambda d: d.closed_connections.update(keys))
+
+    def reopen_connection(self, a: str, b: str, line: Optional[str] = None) -> DisruptionReport:
+        keys = self._connection_keys(a, b, line)
+        return self._disrupt({a, b}, lambda d: d.closed_connections.difference_update(keys))
+
+    def suspend_line(self, line: str) -> DisruptionReport:
+        return self._disrupt(self._line_stations(line), lambda d: d.suspended_lines.add(line))
+
+    def resume_line(self, line: str) -> DisruptionReport:
+        return self._disrupt(self._line_stations(line), lambda d: d.suspended_lines.discard(line))
+
+    def set_travel_time(self, a: str, b: str, line: str, minutes: Optional[int]) -> DisruptionReport:
+        """Override the minutes between two adjacent stations on `line` (both ways);
+        None goes back to the timetabled time."""
+        if minutes is not None and (not isinstance(minutes, int) or minutes <= 0):
+            raise ValueError(f"Travel time must be a positive whole number of minutes, got {minutes!r}")
+        keys = self._connection_keys(a, b, line)
+
+        def retime(d: Disruptions):
+            for key in keys:
+                if minutes is None:
+                    d.travel_times.pop(key, None)
+                else:
+                    d.travel_times[key] = minutes
+        return self._disrupt({a, b}, retime)
+
+    def clear_disruptions(self) -> DisruptionReport:
+        def clear(d: Disruptions):
+            d.closed_stations.clear()
+            d.closed_connections.clear()
+            d.suspended_lines.clear()
+            d.travel_times.clear()
+        return self._disrupt(set(self.graph), clear)
+
+    def _check_station(self, station: str):
+        if station not in self.graph:
+            raise ValueError(f"Unknown station '{station}'")
+
+    def _with_neighbours(self, station: str) -> Set[str]:
+        return {station} | {neighbor for neighbor, _, _ in self.graph[station]}
+
+    def _connection_keys(self, a: str, b: str, line: Optional[str]) -> Set[Tuple[str, str, str]]:
+        self._check_station(a)
+        self._check_station(b)
+        lines = {l for neighbor, l, _ in self.graph[a] if neighbor == b and (line is None or l == line)}
+        if not lines:
+            raise ValueError(f"No {line + ' ' if line else ''}connection between '{a}' and '{b}'")
+        return {(a, b, l) for l in lines} | {(b, a, l) for l in lines}
+
+    def _line_stations(self, line: str) -> Set[str]:
+        stations = {station for station, edges in self.graph.items() if any(l == line for _, l, _ in edges)}
+        if not stations:
+            raise ValueError(f"Unknown line '{line}'")
+        return stations
+
+    def _disrupt(self, stations: Set[str], update: Callable[[Disruptions], None]) -> DisruptionReport:
+        """Apply a disruption change and bring derived structures up to date in place:
+        only `stations`' edges are rewritten, the route matrix (if built) repairs its
+        trees, and only cached routes the change can affect are dropped."""
+        compiled = self.compiled
+        update(self.disruptions)
+        changes = self.disruptions.apply(compiled, sorted(compiled.station_ids[s] for s in stations))
+        if not changes:
+            return DisruptionReport(0, 0, len(self.route_cache), 0, 0)
+        return self._after_edge_changes(compiled, changes)
+
+    def _after_edge_changes(self, compiled: CompiledGraph, changes: List[EdgeChange]) -> DisruptionReport:
+        names, lines = compiled.stations, compiled.lines
+        worsened = {(names[u], names[v], lines[line]) for u, v, line, old, new in changes
+                    if new is None or (old is not None and new > old)}
+        improved = any(new is not None and (old is None or new < old) for _, _, _, old, new in changes)
+
+        # Landmark bounds stay valid while edges only get slower; the contraction
+        # hierarchy bakes in every weight, so it is rebuilt on next use.
+        if improved:
+            self._landmarks = None
+        self._contraction_hierarchy = None
+
+        trees = states = 0
+        changed_pairs: Optional[Set[Tuple[str, str]]] = None
+        matrix = self._route_matrix
+        if matrix is not None and matrix.graph_version == self.graph_version:
+            trees, states, pairs = matrix.repair(compiled, changes, self.INTERCHANGE_PENALTY)
+            changed_pairs = {(names[a], names[b]) for a, b in pairs}
+
+        def stale(key, route) -> bool:
+            # A route that avoids every slowed or closed edge is still a fastest one unless
+            # something got faster; then only pairs whose distance dropped are suspect,
+            # and without the route matrix to say which, every entry is.
+            if route is not None and any((route[i - 1][0], route[i][0], route[i][1]) in worsened
+                                         for i in range(1, len(route))):
+                return True
+            # The matrix only tracks unconstrained distances, so it can't clear constrained keys.
+            return improved and (changed_pairs is None or len(key) > 3 or (key[0], key[1]) in changed_pairs)
+
+        invalidated = self.route_cache.discard_where(stale)
+        return DisruptionReport(len(changes), invalidated, len(self.route_cache), trees, states)
+
+    @property
+    def station_index(self) -> StationIndex:
+        """Sorted stations, line sets and typeahead index, rebuilt after any graph change."""
+        if self._station_index is None or self._station_index.graph_version != self.graph_version:
+            self._station_index = StationIndex(self.graph, self.graph_version)
+        return self._station_index
+
+    @property
+    def compiled(self) -> CompiledGraph:
+        """Integer CSR view of `graph` that searches run on, rebuilt after any graph change."""
+        if self._compiled is None or self._compiled.graph_version != self.graph_version:
+            self._compiled = CompiledGraph(self.graph, self.graph_version)
+            if self.disruptions:
+                self.disruptions.apply(self._compiled, range(len(self._compiled.stations)))
+        return self._compiled
+
+    @property
+    def landmarks(self) -> Landmarks:
+        """ALT landmark distances for the current graph, rebuilt after any graph change."""
+        if self._landmarks is None or self._landmarks.graph_version != self.graph_version:
+            self._landmarks = Landmarks(self.compiled)
+        return self._landmarks
+
+    @property
+    def contraction_hierarchy(self) -> 'ContractionHierarchy':
+        """Contraction-hierarchy index for the current graph, built on first use after any change."""
+        from contraction import ContractionHierarchy
+        ch = self._contraction_hierarchy
+        if ch is None or ch.graph_version != self.graph_version or ch.penalty != self.INTERCHANGE_PENALTY:
+            ch = self._contraction_hierarchy = ContractionHierarchy.build(self.compiled, self.INTERCHANGE_PENALTY)
+        return ch
+
+    def load_contraction_hierarchy(self, path: str):
+        """Use a previously saved index instead of building one; it must match this network."""
+        from contraction import ContractionHierarchy
+        self._contraction_hierarchy = ContractionHierarchy.load(path, self.compiled)
+
+    @property
+    def route_matrix(self) -> 'RouteMatrix':
+        """All-pairs journey table for the current graph, rebuilt on first use after
+        any `_add_connection` so it can never answer from a stale network."""
+        from route_matrix import RouteMatrix
+        if self._route_matrix is None or self._route_matrix.graph_version != self.graph_version:
+            self._route_matrix = RouteMatrix(self)
+        return self._route_matrix
 
     def get_route_details(self, route: List[Tuple[str, Optional[str]]]) -> List[str]:
         """Generate human-readable leg descriptions with line changes."""
@@ -221,6 +639,31 @@ class TubeNetwork:
                 details.append(f"Take {line} Line from {start} to {end} ({stops} stops)")
         return details
 
+    def get_route_minutes(self, route: List[Tuple[str, Optional[str]]]) -> int:
+        """Travel minutes along a route — every ride and walk at its current time,
+        without the interchange penalty find_route adds to its comparisons.
+        ValueError if a step names an unknown station or line, or a connection
+        that doesn't exist or is closed now (a route found before a disruption)."""
+        compiled = self.compiled
+        ids, line_ids = compiled.station_ids, compiled.line_ids
+        offsets, ends, targets, edge_lines, weights = (compiled.offsets, compiled.ends, compiled.targets,
+                                                       compiled.edge_lines, compiled.weights)
+        total = 0
+        for (a, _), (b, line) in zip(route, route[1:]):
+            for name, known in ((a, ids), (b, ids), (line, line_ids)):
+                if name not in known:
+                    raise ValueError(f"Unknown {'line' if known is line_ids else 'station'} '{name}' in route")
+            u, v, line_id = ids[a], ids[b], line_ids[line]
+            lo, hi = offsets[u], ends[u]
+            best = None
+            for to, edge_line, weight in zip(targets[lo:hi], edge_lines[lo:hi], weights[lo:hi]):
+                if to == v and edge_line == line_id and (best is None or weight < best):
+                    best = weight
+            if best is None:
+                raise ValueError(f"No open {line} connection from {a} to {b}")
+            total += best
+        return total
+
     def get_route_legs(self, route: List[Tuple[str, Optional[str]]]) -> List[Tuple[str, str, str, int]]:
         """Return a structured list of legs as (line, start_station, end_station, stops).
         Stops count is number of edges between start and end in that leg.
@@ -244,3 +687,23 @@ class TubeNetwork:
                 leg_start_idx = i - 1
 
         return legs
+
+
+# Process-pool state for TubeNetwork.find_routes: each worker process keeps the
+# network it was initialised with and answers whole origins from it.
+_batch_network = None
+
+
+def _init_batch_worker(network):
+    global _batch_network
+    _batch_network = network
+
+
+def _batch_worker(item):
+    origin, destinations = item
+    return list(_batch_network.find_routes_from(origin, destinations))
+
+
+def _isochrone_worker(item):
+    origin, budget_minutes = item
+    return _batch_network._isochrone_minutes((origin,), budget_minutes)
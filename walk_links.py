@@ -0,0 +1,79 @@
+from collections import defaultdict
+import math
+from typing import Dict, List, Mapping, Tuple
+
+# Walking transfers derived from station coordinates instead of listed by hand.
+#
+# Stations are bucketed into a grid of cells at least `max_metres` across, so any
+# pair within walking distance lies in the same cell or in adjacent ones. Each
+# cell is compared with itself and with four of its eight neighbours (the other
+# four compare with it in turn), which finds every pair once in roughly
+# O(n * stations per cell) instead of checking all n² pairs. Candidates are then
+# measured exactly with the haversine formula, comparing its inner term against
+# the radius's own so that only pairs within reach pay for the full distance.
+#
+# Cells are sized in degrees: a degree of latitude is the same length everywhere,
+# a degree of longitude shrinks with cos(latitude), so longitude cells are sized
+# for the network's most poleward station and are never too narrow.
+
+EARTH_RADIUS_METRES = 6_371_008.8
+METRES_PER_DEGREE = EARTH_RADIUS_METRES * math.pi / 180
+
+# Walk timing: a brisk 4.8 km/h along streets that run about a quarter longer than
+# the straight line, plus the minutes spent getting out of one station and into the other.
+WALK_METRES_PER_MINUTE = 80
+WALK_DETOUR = 1.25
+TRANSFER_MINUTES = 2
+
+DEFAULT_WALK_RADIUS = 500
+
+# The cell itself and the neighbours "after" it; each adjacent pair of cells is visited once.
+_FORWARD_CELLS = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def distance_metres(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    """Great-circle distance between two (latitude, longitude) points."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METRES * math.asin(min(1.0, math.sqrt(h)))
+
+
+def walk_minutes(metres: float) -> int:
+    """Whole minutes to walk between two stations `metres` apart as the crow flies."""
+    return math.ceil(TRANSFER_MINUTES + metres * WALK_DETOUR / WALK_METRES_PER_MINUTE)
+
+
+def nearby_pairs(coordinates: Mapping[str, Tuple[float, float]], max_metres: float) -> List[Tuple[str, str, float]]:
+    """Every pair of stations at most `max_metres` apart as (a, b, metres), a < b,
+    sorted by name."""
+    if max_metres <= 0:
+        raise ValueError(f"Walking distance must be positive, got {max_metres!r}")
+    if not coordinates:
+        return []
+    max_lat = min(89.0, max(abs(lat) for lat, _ in coordinates.values()))
+    cell_lat = max_metres / METRES_PER_DEGREE
+    cell_lon = cell_lat / math.cos(math.radians(max_lat))
+
+    grid: Dict[Tuple[int, int], List[Tuple[str, float, float, float]]] = defaultdict(list)
+    for name, (lat, lon) in coordinates.items():
+        phi = math.radians(lat)
+        grid[math.floor(lat / cell_lat), math.floor(lon / cell_lon)].append((name, phi, math.radians(lon), math.cos(phi)))
+
+    # haversine(d) = sin²(d / 2R) grows with d, so "within reach" is a bound on it alone.
+    reach = math.sin(min(math.pi / 2, max_metres / (2 * EARTH_RADIUS_METRES))) ** 2
+    sin = math.sin
+    pairs: List[Tuple[str, str, float]] = []
+    for (row, col), members in grid.items():
+        for d_row, d_col in _FORWARD_CELLS:
+            others = grid.get((row + d_row, col + d_col))
+            if others is None:
+                continue
+            same_cell = others is members
+            for i, (a, phi_a, lambda_a, cos_a) in enumerate(members):
+                for b, phi_b, lambda_b, cos_b in (others[i + 1:] if same_cell else others):
+                    h = sin((phi_b - phi_a) / 2) ** 2 + cos_a * cos_b * sin((lambda_b - lambda_a) / 2) ** 2
+                    if h <= reach:
+                        metres = 2 * EARTH_RADIUS_METRES * math.asin(min(1.0, math.sqrt(h)))
+                        pairs.append((a, b, metres) if a < b else (b, a, metres))
+    pairs.sort()
+    return pairs